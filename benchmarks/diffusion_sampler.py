@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Latency and quality of the VibeVoice diffusion sampler per step-count preset.
+
+Every generated speech token runs `sample_speech_tokens`. For each preset this times the
+`DPMSolverPlan` fast path and the scheduler reference loop, and reports the log-spectral distance
+(dB) of the decoded audio against a high-step reference sampled from the same noise and conditions.
+
+Without `--model` the acoustic tokenizer and prediction head use the production architecture with
+random weights: timings are representative, the distances only show how far each preset is from
+the converged sampler. With `--model` the pretrained head and tokenizer are used.
+
+    PYTHONPATH=external python -m benchmarks.diffusion_sampler
+    PYTHONPATH=external python -m benchmarks.diffusion_sampler --model aoi-ot/VibeVoice-7B --dtype bfloat16
+    PYTHONPATH=external python -m benchmarks.diffusion_sampler --tiny   # quick smoke run
+"""
+
+import argparse
+import time
+
+import torch
+
+from vibevoice.modular.configuration_vibevoice import VibeVoiceConfig
+from vibevoice.modular.modeling_vibevoice_inference import (
+    DIFFUSION_STEP_PRESETS,
+    VibeVoiceForConditionalGenerationInference,
+)
+
+
+def build_model(model_name, tiny: bool, device: str, dtype: torch.dtype):
+    if model_name:
+        model = VibeVoiceForConditionalGenerationInference.from_pretrained(model_name, torch_dtype=dtype)
+        return model.to(device).eval()
+
+    if tiny:
+        tokenizer_cfg = dict(vae_dim=8, encoder_n_filters=4, encoder_ratios=[2, 2], encoder_depths="1-1-1")
+        acoustic_cfg = dict(decoder_n_filters=4, **tokenizer_cfg)
+        semantic_cfg = tokenizer_cfg
+        hidden_size, head_cfg = 32, dict(head_layers=1, latent_size=8)
+    else:
+        # production acoustic tokenizer and prediction head; the LM is irrelevant here, keep it minimal
+        acoustic_cfg, semantic_cfg = dict(), dict(vae_dim=128)
+        hidden_size, head_cfg = 1536, dict()
+    config = VibeVoiceConfig(
+        acoustic_tokenizer_config=acoustic_cfg,
+        semantic_tokenizer_config=semantic_cfg,
+        decoder_config=dict(
+            model_type="qwen2",
+            vocab_size=64,
+            hidden_size=hidden_size,
+            intermediate_size=hidden_size,
+            num_hidden_layers=1,
+            num_attention_heads=4,
+            num_key_value_heads=2,
+        ),
+        diffusion_head_config=dict(hidden_size=hidden_size, **head_cfg),
+    )
+    model = VibeVoiceForConditionalGenerationInference(config)
+    # the output layers of the head are zero-initialized, give it something to predict
+    for param in model.model.prediction_head.parameters():
+        torch.nn.init.normal_(param, std=0.02 if not tiny else 0.2)
+    model.model.speech_scaling_factor.fill_(1.0)
+    model.model.speech_bias_factor.fill_(0.0)
+    return model.to(device=device, dtype=dtype).eval()
+
+
+def _sync(device: str) -> None:
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+@torch.no_grad()
+def sample(sampler, conditions, neg_conditions, cfg_scale: float, num_steps: int, seed: int, device: str):
+    """Sample one latent per condition row, token by token like generate(). Returns (latents, s/token)."""
+    latents, elapsed = [], 0.0
+    for i in range(conditions.shape[0]):
+        torch.manual_seed(seed + i)
+        _sync(device)
+        start = time.perf_counter()
+        latents.append(sampler(conditions[i : i + 1], neg_conditions[i : i + 1], cfg_scale, num_steps))
+        _sync(device)
+        elapsed += time.perf_counter() - start
+    return torch.cat(latents, dim=0), elapsed / conditions.shape[0]
+
+
+@torch.no_grad()
+def decode(model, latents: torch.Tensor) -> torch.Tensor:
+    """Decode a (tokens, vae_dim) latent sequence to a mono float32 waveform."""
+    scaled = latents / model.model.speech_scaling_factor - model.model.speech_bias_factor
+    audio = model.model.acoustic_tokenizer.decode(scaled.unsqueeze(0).to(model.model.acoustic_tokenizer.device))
+    return audio.reshape(-1).float().cpu()
+
+
+def log_spectral_distance(audio: torch.Tensor, reference: torch.Tensor, n_fft: int = 512) -> float:
+    """RMS difference of the log power spectra in dB, averaged over frames."""
+    n_fft = min(n_fft, audio.numel() // 2 // 2 * 2)  # short smoke-test audio
+    window = torch.hann_window(n_fft)
+    spec = lambda x: torch.stft(x, n_fft, hop_length=n_fft // 4, window=window, return_complex=True).abs() ** 2
+    diff = 10 * torch.log10(spec(audio) + 1e-10) - 10 * torch.log10(spec(reference) + 1e-10)
+    return diff.pow(2).mean(dim=0).sqrt().mean().item()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VibeVoice diffusion sampler presets")
+    parser.add_argument("--model", default=None, help="pretrained VibeVoice checkpoint (default: random weights)")
+    parser.add_argument("--tokens", type=int, default=32, help="speech tokens sampled per preset")
+    parser.add_argument("--reference-steps", type=int, default=50, help="steps of the quality reference")
+    parser.add_argument("--cfg-scale", type=float, default=1.3)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "bfloat16", "float16"])
+    parser.add_argument("--tiny", action="store_true", help="use a tiny random model (smoke test)")
+    args = parser.parse_args()
+
+    dtype = getattr(torch, args.dtype)
+    model = build_model(args.model, args.tiny, args.device, dtype)
+    hidden_size = model.config.decoder_config.hidden_size
+
+    torch.manual_seed(0)
+    conditions = torch.randn(args.tokens, hidden_size, device=args.device, dtype=dtype)
+    neg_conditions = torch.randn(args.tokens, hidden_size, device=args.device, dtype=dtype)
+
+    def fast(c, n, cfg_scale, num_steps):
+        return model.sample_speech_tokens(c, n, cfg_scale=cfg_scale, num_steps=num_steps)
+
+    reference_latents, _ = sample(
+        model._sample_speech_tokens_reference, conditions, neg_conditions, args.cfg_scale,
+        args.reference_steps, seed=1, device=args.device,
+    )
+    reference_audio = decode(model, reference_latents)
+
+    print(f"device={args.device} dtype={args.dtype} tokens={args.tokens} reference_steps={args.reference_steps}")
+    print(f"{'preset':>9} {'steps':>5} {'loop ms/tok':>12} {'fast ms/tok':>12} {'speedup':>8} {'LSD dB':>7}")
+    for name, steps in DIFFUSION_STEP_PRESETS.items():
+        # first call unrolls the schedule and caches the timestep embeddings; keep it out of the timing
+        fast(conditions[:1], neg_conditions[:1], args.cfg_scale, steps)
+        latents, fast_s = sample(fast, conditions, neg_conditions, args.cfg_scale, steps, 1, args.device)
+        _, loop_s = sample(
+            model._sample_speech_tokens_reference, conditions, neg_conditions, args.cfg_scale, steps, 1, args.device
+        )
+        lsd = log_spectral_distance(decode(model, latents), reference_audio)
+        print(f"{name:>9} {steps:>5} {loop_s * 1e3:>12.3f} {fast_s * 1e3:>12.3f} {loop_s / fast_s:>7.2f}x {lsd:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Offline stand-in backends for load tests and benchmarks of the service paths (executor, batching,
+caching, cancellation, streaming) without model downloads or a GPU.
+
+- `FakeTTSBackend` / `FakeSTTBackend`: deterministic output (audio or text derived from a hash of the
+  input) and simulated compute of `rtf` seconds per second of audio. A batch of n rows costs as much
+  as its longest row times `1 + batch_cost * (n - 1)`, so micro-batching pays off like on a GPU.
+- `TinyVibeVoiceBackend`: the real `VibeVoiceBackend` segmenting / batching / streaming code on top of
+  a tiny randomly initialized VibeVoice model (production frame rate, 7.5 tokens per second of
+  audio) that runs the actual generate loop on CPU. Its audio is noise; its timings are real.
+
+The services load them with `TTS_BACKEND=fake|tiny-vibevoice` and `STT_BACKEND=fake`.
+"""
+
+import hashlib
+import threading
+import time
+import types
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+
+from src.common import metrics, startup
+from src.common.cancellation import CancelToken, RequestCancelled, is_cancelled
+from src.tts.vibevoice_backend import VibeVoiceBackend
+from src.tts.voice import Voice, VoiceRegistry
+from src.tts.voice_cache import VoicePromptCache
+
+# same names and step counts as VibeVoice, compute scales with steps / 10
+DIFFUSION_STEP_PRESETS = {"fast": 5, "balanced": 10, "quality": 20}
+
+
+def _seed(*parts: str) -> int:
+    return int.from_bytes(hashlib.sha256("|".join(parts).encode("utf-8")).digest()[:4], "little")
+
+
+def _simulate(seconds: float, cancel_tokens: List[Optional[CancelToken]], step_s: float = 0.005) -> None:
+    """Sleep `seconds` in small steps; stop early once every token is cancelled."""
+    deadline = time.perf_counter() + seconds
+    while (remaining := deadline - time.perf_counter()) > 0:
+        if cancel_tokens and all(is_cancelled(t) for t in cancel_tokens):
+            return
+        time.sleep(min(step_s, remaining))
+
+
+@dataclass
+class FakeTTSConfig:
+    # compute seconds per second of generated audio, and extra cost of each additional batch row
+    rtf: float = 0.1
+    batch_cost: float = 0.15
+    # generated audio per character of text (~15 characters per second of speech)
+    seconds_per_char: float = 0.066
+    stream_chunk_s: float = 0.2
+
+
+class FakeTTSBackend:
+    """Deterministic TTS stand-in with the `VibeVoiceBackend` interface."""
+
+    sample_rate: int = 24000
+
+    def __init__(self, cfg: Optional[FakeTTSConfig] = None):
+        self.cfg = cfg or FakeTTSConfig()
+        self.diffusion_presets = dict(DIFFUSION_STEP_PRESETS)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._rows = 0
+        self.voices = VoiceRegistry().scan()
+
+    def resolve_diffusion_steps(self, quality: Optional[str]) -> Optional[int]:
+        if quality is None or quality == "":
+            return None
+        if quality in self.diffusion_presets:
+            return self.diffusion_presets[quality]
+        if str(quality).isdigit() and int(quality) > 0:
+            return int(quality)
+        presets = ", ".join(self.diffusion_presets)
+        raise ValueError(f"Unknown quality '{quality}', expected one of {presets} or a positive step count")
+
+    def cache_identity(self, voice: str, quality: Optional[str] = None) -> Tuple[Voice, Dict[str, Any]]:
+        return self.voices.get(voice), {
+            "model": "fake",
+            "diffusion_steps": self.resolve_diffusion_steps(quality),
+            "seconds_per_char": self.cfg.seconds_per_char,
+        }
+
+    def _duration_s(self, text: str) -> float:
+        return max(0.2, len(text) * self.cfg.seconds_per_char)
+
+    def _compute_s(self, text: str, quality: Optional[str]) -> float:
+        steps = self.resolve_diffusion_steps(quality) or 10
+        return self.cfg.rtf * self._duration_s(text) * steps / 10
+
+    def _audio(self, text: str, voice: str) -> torch.Tensor:
+        rng = np.random.default_rng(_seed(text, voice))
+        n = int(self._duration_s(text) * self.sample_rate)
+        t = np.arange(n) / self.sample_rate
+        pitch = 110 + _seed(voice) % 120
+        audio = 0.3 * np.sin(2 * np.pi * pitch * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+        audio += 0.01 * rng.standard_normal(n)
+        return torch.from_numpy(audio.astype(np.float32)).unsqueeze(0)
+
+    def synthesize_batch(self, requests: List[Tuple[str, ...]]) -> List[Union[torch.Tensor, Exception]]:
+        """(text, voice[, quality[, cancel_token]]) requests, generated together as one batch."""
+        start = time.perf_counter()
+        results: List[Union[torch.Tensor, Exception, None]] = [None] * len(requests)
+        rows, costs, tokens = [], [], []
+        for i, request in enumerate(requests):
+            text, voice = request[0], request[1]
+            quality = request[2] if len(request) > 2 else None
+            token = request[3] if len(request) > 3 else None
+            try:
+                costs.append(self._compute_s(text, quality))
+            except ValueError as e:
+                results[i] = e
+                continue
+            rows.append(i)
+            tokens.append(token)
+
+        if rows:
+            with metrics.stage("generate"):
+                _simulate(max(costs) * (1 + self.cfg.batch_cost * (len(rows) - 1)), tokens)
+            with self._lock:
+                self._calls += 1
+                self._rows += len(rows)
+        for i, token in zip(rows, tokens):
+            if is_cancelled(token):
+                results[i] = RequestCancelled("request was cancelled during generation")
+            else:
+                results[i] = self._audio(requests[i][0], requests[i][1])
+                metrics.observe_rtf(time.perf_counter() - start, results[i].shape[-1] / self.sample_rate)
+        return results
+
+    def synthesize(
+        self,
+        text: str,
+        voice: str = "default",
+        quality: Optional[str] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> torch.Tensor:
+        result = self.synthesize_batch([(text, voice, quality, cancel_token)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def synthesize_stream(self, text: str, voice: str, audio_streamer, quality: Optional[str] = None) -> None:
+        """Push the audio in `stream_chunk_s` chunks, each after its share of the compute time."""
+        try:
+            audio = self._audio(text, voice)[0]
+            chunk = int(self.cfg.stream_chunk_s * self.sample_rate)
+            chunk_compute_s = self._compute_s(text, quality) * chunk / audio.numel()
+            for i in range(0, audio.numel(), chunk):
+                _simulate(chunk_compute_s, [])
+                if audio_streamer.finished_flags[0]:
+                    raise RequestCancelled("stream was closed by the consumer")
+                audio_streamer.put(audio[i : i + chunk].view(1, 1, -1), torch.tensor([0]))
+        finally:
+            audio_streamer.end()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {"fake": {"generate_calls": self._calls, "rows": self._rows}}
+
+
+@dataclass
+class FakeSTTConfig:
+    # compute seconds per second of input audio, and extra cost of each additional batch row
+    rtf: float = 0.05
+    batch_cost: float = 0.1
+
+
+_WORDS = "the a voice agent hears short turns and answers quickly while users keep talking over it".split()
+
+
+class FakeSTTBackend:
+    """Deterministic STT stand-in with the `WhisperBackend` interface (text derived from the audio)."""
+
+    sample_rate: int = 16000
+
+    def __init__(self, cfg: Optional[FakeSTTConfig] = None):
+        self.cfg = cfg or FakeSTTConfig()
+
+    def _text(self, audio: np.ndarray) -> str:
+        digest = hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).tobytes()).digest()
+        n_words = max(1, int(len(audio) / self.sample_rate * 2.5))
+        return " ".join(_WORDS[digest[i % len(digest)] % len(_WORDS)] for i in range(n_words))
+
+    def transcribe(self, audio: np.ndarray, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        result = self.transcribe_batch([audio], [cancel_token])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def transcribe_batch(
+        self, audios: List[np.ndarray], cancel_tokens: Optional[List[Optional[CancelToken]]] = None
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        start = time.perf_counter()
+        tokens = cancel_tokens or [None] * len(audios)
+        longest_s = max(len(a) for a in audios) / self.sample_rate
+        with metrics.stage("transcribe"):
+            _simulate(self.cfg.rtf * longest_s * (1 + self.cfg.batch_cost * (len(audios) - 1)), tokens)
+        results: List[Union[Dict[str, Any], Exception]] = []
+        for audio, token in zip(audios, tokens):
+            if is_cancelled(token):
+                results.append(RequestCancelled("transcription was cancelled"))
+                continue
+            metrics.observe_rtf(time.perf_counter() - start, len(audio) / self.sample_rate)
+            results.append({"text": self._text(audio), "language": "en", "language_probability": 1.0})
+        return results
+
+
+# Special token ids of the tiny model
+TINY_TOKENIZER = types.SimpleNamespace(
+    bos_token_id=None,
+    pad_token_id=0,
+    speech_diffusion_id=1,
+    speech_start_id=2,
+    speech_end_id=3,
+    eos_token_id=4,
+)
+_FIRST_TEXT_ID = 5
+
+
+def build_tiny_vibevoice(seed: int = 0, hidden_size: int = 64, num_layers: int = 2):
+    """Randomly initialized VibeVoice with a 3200x downsampling tokenizer (7.5 speech tokens per second)."""
+    from vibevoice.modular.configuration_vibevoice import VibeVoiceConfig
+    from vibevoice.modular.modeling_vibevoice_inference import VibeVoiceForConditionalGenerationInference
+
+    tokenizer_cfg = dict(
+        vae_dim=16, encoder_n_filters=4, encoder_ratios=[8, 5, 5, 4, 2, 2], encoder_depths="1-1-1-1-1-1-1"
+    )
+    torch.manual_seed(seed)
+    config = VibeVoiceConfig(
+        acoustic_tokenizer_config=dict(decoder_n_filters=4, **tokenizer_cfg),
+        semantic_tokenizer_config=tokenizer_cfg,
+        decoder_config=dict(
+            model_type="qwen2",
+            vocab_size=64,
+            hidden_size=hidden_size,
+            intermediate_size=hidden_size * 2,
+            num_hidden_layers=num_layers,
+            num_attention_heads=4,
+            num_key_value_heads=2,
+            max_position_embeddings=4096,
+        ),
+        diffusion_head_config=dict(hidden_size=hidden_size, head_layers=1, latent_size=16, ddpm_num_inference_steps=10),
+    )
+    model = VibeVoiceForConditionalGenerationInference(config).eval()
+    for param in model.model.prediction_head.parameters():
+        torch.nn.init.normal_(param, std=0.2)
+    model.model.speech_scaling_factor.fill_(1.0)
+    model.model.speech_bias_factor.fill_(0.0)
+    # a constant head (zero weights, bias on the diffusion token): every row speaks until its length limit
+    head = torch.nn.Linear(hidden_size, model.lm_head.out_features, bias=True)
+    torch.nn.init.zeros_(head.weight)
+    torch.nn.init.zeros_(head.bias)
+    head.bias.data[TINY_TOKENIZER.speech_diffusion_id] = 1.0
+    model.lm_head = head
+    return model
+
+
+class TinyVibeVoiceBackend(VibeVoiceBackend):
+    """`VibeVoiceBackend` over `build_tiny_vibevoice`; text is mapped to token ids character by character.
+
+    A row generates about twice its prompt length in speech tokens (generate()'s length limit), and the
+    prompt holds one token per four characters, so the audio length follows the text like real speech.
+    """
+
+    def __init__(
+        self,
+        segment_max_chars: int = 300,
+        segment_batch_size: int = 4,
+        crossfade_ms: float = 30.0,
+        diffusion_preset: Optional[str] = None,
+    ):
+        from vibevoice.modular.modeling_vibevoice_inference import DIFFUSION_STEP_PRESETS as PRESETS
+        from vibevoice.modular.precision import apply_precision
+        from vibevoice.modular.prefix_cache import PrefixKVCache
+
+        self.device = "cpu"
+        self.model_name = "tiny-vibevoice"
+        self.model_revision = None
+        self.cfg_scale = 1.3
+        self.diffusion_presets = dict(PRESETS)
+        self.default_diffusion_steps = None
+        self.default_diffusion_steps = self.resolve_diffusion_steps(diffusion_preset)
+        self.segment_max_chars = segment_max_chars
+        self.segment_batch_size = max(1, segment_batch_size)
+        self.crossfade_samples = int(crossfade_ms * self.sample_rate / 1000)
+        self.processor = None
+        with startup.phase("weight_load", "tiny model (random init)"):
+            self.model = build_tiny_vibevoice()
+        self.precision = apply_precision(self.model, "fp32")
+        self.prepared_snapshot = None
+        self.weights_bytes = sum(p.numel() * p.element_size() for p in self.model.parameters())
+        # indexed only: generation uses the synthetic per-voice audio of `_voice`
+        self.voices = VoiceRegistry().scan()
+        self.voice_cache = VoicePromptCache(max_entries=0)
+        self.prefix_cache = PrefixKVCache(max_entries=0)
+        self._generate_lock = threading.Lock()
+        self._voice_speech: Dict[str, torch.Tensor] = {}
+
+    def _voice(self, voice: str) -> torch.Tensor:
+        # two frames of deterministic "reference audio" per voice
+        if voice not in self._voice_speech:
+            generator = torch.Generator().manual_seed(_seed(voice))
+            self._voice_speech[voice] = 0.1 * torch.randn(2 * 3200, generator=generator)
+        return self._voice_speech[voice]
+
+    def _generate_batch(
+        self,
+        requests: List[Tuple[str, str]],
+        audio_streamer=None,
+        diffusion_steps: Optional[int] = None,
+        cancel_tokens: Optional[List[Optional[CancelToken]]] = None,
+    ) -> List[Union[torch.Tensor, Exception]]:
+        results: List[Union[torch.Tensor, Exception, None]] = [None] * len(requests)
+        tokens = cancel_tokens or [None] * len(requests)
+        slots = [i for i in range(len(requests)) if not is_cancelled(tokens[i])]
+        for i in range(len(requests)):
+            if i not in slots:
+                results[i] = RequestCancelled("request was cancelled before generation")
+        if not slots:
+            return results
+
+        with metrics.stage("preprocess"):
+            prompts = []
+            for i in slots:
+                text, voice = requests[i][0], requests[i][1]
+                text_ids = [_FIRST_TEXT_ID + ord(c) % (64 - _FIRST_TEXT_ID) for c in text[::4]]
+                speech = [TINY_TOKENIZER.speech_start_id] + [TINY_TOKENIZER.speech_diffusion_id] * 2
+                prompts.append(speech + [TINY_TOKENIZER.speech_end_id] + text_ids + [TINY_TOKENIZER.speech_start_id])
+            length = max(len(p) for p in prompts)
+            input_ids = torch.full((len(prompts), length), TINY_TOKENIZER.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros_like(input_ids)
+            speech_input_mask = torch.zeros_like(input_ids, dtype=torch.bool)
+            for row, prompt in enumerate(prompts):
+                pad = length - len(prompt)
+                input_ids[row, pad:] = torch.tensor(prompt)
+                attention_mask[row, pad:] = 1
+                speech_input_mask[row, pad + 1 : pad + 3] = True
+            speech_tensors = torch.stack([self._voice(requests[i][1]) for i in slots])
+
+        row_tokens = [tokens[i] for i in slots]
+
+        def cancelled_rows() -> List[int]:
+            return [row for row, token in enumerate(row_tokens) if is_cancelled(token)]
+
+        torch.manual_seed(_seed(*(requests[i][0] for i in slots)))
+        with self._generate_lock, torch.no_grad():
+            start = time.perf_counter()
+            outputs = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                speech_tensors=speech_tensors,
+                speech_masks=torch.ones(len(slots), 2, dtype=torch.bool),
+                speech_input_mask=speech_input_mask,
+                audio_streamer=audio_streamer,
+                ddpm_inference_steps=diffusion_steps,
+                max_new_tokens=2 * length,
+                cfg_scale=self.cfg_scale,
+                tokenizer=TINY_TOKENIZER,
+                generation_config={"do_sample": False},
+                show_progress_bar=False,
+                sample_stop_fn=cancelled_rows if any(row_tokens) else None,
+                stage_observer=metrics.stage_observer(),
+            )
+            new_tokens = outputs.sequences[:, length:]
+            metrics.observe_tokens(int((new_tokens != TINY_TOKENIZER.eos_token_id).sum()), time.perf_counter() - start)
+
+        for slot, audio in zip(slots, outputs.speech_outputs):
+            if is_cancelled(tokens[slot]):
+                results[slot] = RequestCancelled("request was cancelled during generation")
+            elif audio is None:
+                results[slot] = RuntimeError("VibeVoice generated no speech output")
+            else:
+                results[slot] = audio
+        return results
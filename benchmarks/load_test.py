@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Load generator for the TTS (`/v1/tts`, `/v1/tts/stream`) and STT (`/v1/audio/transcriptions`) services.
+
+Each concurrency level runs a closed loop: `concurrency` clients send requests back to back until
+`--requests` have completed. Reported per level: p50/p95/p99 latency, throughput, time to first
+audio (TTS: first streamed chunk, or the whole response without `--stream`), real-time factor
+(latency / audio duration) and the HTTP status counts. The server's `/stats` after the run is
+included, so cache hit rates and batching counters are kept with the numbers.
+
+Results are written as JSON; `--compare` checks them against an earlier run and exits with 1 when
+p95 latency or throughput of a concurrency level regressed by more than `--max-regression`.
+With `--workers 1,2,4` the spawned service is started once per worker count (pre-forked workers,
+see src/common/prefork.py) and the throughput scaling relative to the first count is reported.
+
+    # against running services
+    python -m benchmarks.load_test tts --url http://127.0.0.1:5000 --concurrency 1,4,8 --requests 64
+    python -m benchmarks.load_test stt --url http://127.0.0.1:6000 --audio voices/jan_ref_mix.wav
+
+    # offline: start the service with a stand-in backend (see benchmarks/fake_backends.py)
+    PYTHONPATH=.:external python -m benchmarks.load_test tts --spawn fake --env TTS_MAX_BATCH_SIZE=4 \\
+        --output benchmarks/results/tts-fake.json --compare benchmarks/results/tts-fake-baseline.json
+    PYTHONPATH=.:external python -m benchmarks.load_test tts --spawn tiny-vibevoice --stream
+    PYTHONPATH=.:external python -m benchmarks.load_test tts --spawn tiny-vibevoice --workers 1,2,4 --concurrency 8
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import requests
+
+TEXTS = [
+    "Hello, how can I help you today?",
+    "Your appointment is confirmed for Tuesday at three in the afternoon.",
+    "I'm sorry, I didn't catch that. Could you repeat the last part?",
+    "The weather tomorrow will be mostly sunny with a light breeze from the west.",
+    "Sure, I can do that. Give me a second to look it up.",
+    "Thanks for calling. Is there anything else I can help you with before we finish?",
+    "Your order has shipped and should arrive within two to three business days.",
+    "Let me transfer you to a colleague who knows more about billing questions.",
+]
+
+# target -> (module, backend variable, host variable, port variable)
+SERVICES = {
+    "tts": ("src.tts.service", "TTS_BACKEND", "TTS_SERVICE_HOST", "TTS_SERVICE_PORT"),
+    "stt": ("src.stt.service", "STT_BACKEND", "AUDIO_SERVICE_HOST", "AUDIO_SERVICE_PORT"),
+}
+
+
+@dataclass
+class Sample:
+    status: int
+    latency_s: float
+    ttfa_s: Optional[float] = None
+    audio_s: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+
+def percentiles(values: List[float], scale: float = 1.0) -> Optional[Dict[str, float]]:
+    """p50/p95/p99, mean and max of `values` (nearest-rank), multiplied by `scale`; None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    stats = {"p50": rank(50), "p95": rank(95), "p99": rank(99), "mean": sum(ordered) / len(ordered), "max": ordered[-1]}
+    return {k: round(v * scale, 4) for k, v in stats.items()}
+
+
+def summarize(samples: List[Sample], concurrency: int, wall_s: float) -> Dict[str, Any]:
+    ok = [s for s in samples if s.ok]
+    status: Dict[str, int] = {}
+    for s in samples:
+        status[str(s.status)] = status.get(str(s.status), 0) + 1
+    audio_s = sum(s.audio_s or 0.0 for s in ok)
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "ok": len(ok),
+        "errors": len(samples) - len(ok),
+        "status": status,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(ok) / wall_s, 3) if wall_s > 0 else 0.0,
+        "audio_s_per_s": round(audio_s / wall_s, 3) if wall_s > 0 else 0.0,
+        "latency_ms": percentiles([s.latency_s for s in ok], 1000),
+        "ttfa_ms": percentiles([s.ttfa_s for s in ok if s.ttfa_s is not None], 1000),
+        "rtf": percentiles([s.latency_s / s.audio_s for s in ok if s.audio_s]),
+    }
+
+
+def run_level(send: Callable[[int], Sample], concurrency: int, total: int) -> Dict[str, Any]:
+    """Closed loop: `concurrency` workers send requests back to back until `total` are done."""
+    counter = iter(range(total))
+    lock = threading.Lock()
+    samples: List[Sample] = []
+
+    def worker() -> None:
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            try:
+                sample = send(i)
+            except requests.RequestException as e:
+                sample = Sample(status=0, latency_s=0.0, error=str(e))
+            with lock:
+                samples.append(sample)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return summarize(samples, concurrency, time.perf_counter() - start)
+
+
+def tts_sender(args, session: requests.Session) -> Callable[[int], Sample]:
+    texts = TEXTS[: args.unique_texts] if args.unique_texts else TEXTS
+    path = "/v1/tts/stream" if args.stream else "/v1/tts"
+
+    def send(i: int) -> Sample:
+        params = {"text": texts[i % len(texts)], "voice": args.voice}
+        if not args.stream:
+            params["response_format"] = "pcm"
+        if args.quality:
+            params["quality"] = args.quality
+        start = time.perf_counter()
+        ttfa, n_bytes = None, 0
+        with session.post(args.url + path, params=params, stream=True, timeout=args.timeout) as r:
+            for chunk in r.iter_content(chunk_size=None):
+                if ttfa is None and chunk:
+                    ttfa = time.perf_counter() - start
+                n_bytes += len(chunk)
+            latency = time.perf_counter() - start
+            if r.status_code != 200:
+                return Sample(status=r.status_code, latency_s=latency, error=r.text[:200])
+            sample_rate = int(r.headers.get("X-Sample-Rate", "24000"))
+        return Sample(status=200, latency_s=latency, ttfa_s=ttfa, audio_s=n_bytes / 2 / sample_rate)
+
+    return send
+
+
+def synthetic_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    """Deterministic speech-like test signal (modulated tones) as 16-bit WAV."""
+    import soundfile as sf
+
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = 0.3 * np.sin(2 * np.pi * 180 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    buf = io.BytesIO()
+    sf.write(buf, audio.astype(np.float32), sample_rate, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def stt_sender(args, session: requests.Session) -> Callable[[int], Sample]:
+    import soundfile as sf
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            data = f.read()
+    else:
+        data = synthetic_wav(args.audio_seconds)
+    audio_s = sf.info(io.BytesIO(data)).duration
+    name = os.path.basename(args.audio) if args.audio else "synthetic.wav"
+
+    def send(i: int) -> Sample:
+        start = time.perf_counter()
+        r = session.post(args.url + "/v1/audio/transcriptions", files={"file": (name, data)}, timeout=args.timeout)
+        latency = time.perf_counter() - start
+        if r.status_code != 200:
+            return Sample(status=r.status_code, latency_s=latency, error=r.text[:200])
+        return Sample(status=200, latency_s=latency, ttfa_s=None, audio_s=audio_s)
+
+    return send
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_service(target: str, backend: str, extra_env: List[str], timeout_s: float = 300.0):
+    """Start the service on a free local port with `backend`; returns (process, url)."""
+    module, backend_var, host_var, port_var = SERVICES[target]
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({backend_var: backend, host_var: "127.0.0.1", port_var: str(port)})
+    env["PYTHONPATH"] = os.pathsep.join(p for p in [".", "external", env.get("PYTHONPATH", "")] if p)
+    env.update(item.split("=", 1) for item in extra_env)
+    proc = subprocess.Popen([sys.executable, "-m", module], env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{module} exited with code {proc.returncode}")
+        try:
+            if requests.get(url + "/ready", timeout=1).status_code == 200:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit(f"{module} did not become ready within {timeout_s}s")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Levels of `result` whose p95 latency grew or throughput fell by more than `max_regression`."""
+    regressions = []
+    base_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    print(f"{'conc':>4} {'p95 ms':>10} {'base':>10} {'change':>8} {'req/s':>8} {'base':>8} {'change':>8}")
+    for level in result["levels"]:
+        base = base_levels.get(level["concurrency"])
+        if base is None or not level["latency_ms"] or not base["latency_ms"]:
+            continue
+        p95, base_p95 = level["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        rps, base_rps = level["throughput_rps"], base["throughput_rps"]
+        latency_change = p95 / base_p95 - 1 if base_p95 else 0.0
+        rps_change = rps / base_rps - 1 if base_rps else 0.0
+        print(
+            f"{level['concurrency']:>4} {p95:>10.1f} {base_p95:>10.1f} {latency_change:>+7.1%} "
+            f"{rps:>8.2f} {base_rps:>8.2f} {rps_change:>+7.1%}"
+        )
+        if latency_change > max_regression:
+            regressions.append(f"concurrency {level['concurrency']}: p95 latency {latency_change:+.1%}")
+        if rps_change < -max_regression:
+            regressions.append(f"concurrency {level['concurrency']}: throughput {rps_change:+.1%}")
+    return regressions
+
+
+def scaling(runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Throughput of every (workers, concurrency) run relative to the first worker count.
+
+    `efficiency` is the speedup divided by the growth in workers (1.0 = linear scaling).
+    """
+    base = {level["concurrency"]: level["throughput_rps"] for level in runs[0]["levels"]}
+    rows = []
+    for run in runs:
+        for level in run["levels"]:
+            base_rps = base.get(level["concurrency"])
+            speedup = level["throughput_rps"] / base_rps if base_rps else None
+            rows.append(
+                {
+                    "workers": run["workers"],
+                    "concurrency": level["concurrency"],
+                    "throughput_rps": level["throughput_rps"],
+                    "speedup": round(speedup, 3) if speedup is not None else None,
+                    "efficiency": (
+                        round(speedup * runs[0]["workers"] / run["workers"], 3) if speedup is not None else None
+                    ),
+                }
+            )
+    return rows
+
+
+def measure(args) -> Dict[str, Any]:
+    """Warm up, then run every concurrency level against `args.url`; returns the levels and the server's /stats."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(int(c) for c in args.concurrency.split(",")))
+    session.mount("http://", adapter)
+    send = tts_sender(args, session) if args.target == "tts" else stt_sender(args, session)
+    health = session.get(args.url + "/health", timeout=10).json()
+    for i in range(args.warmup):
+        send(i)
+
+    levels = []
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        level = run_level(send, concurrency, args.requests)
+        levels.append(level)
+        latency = level["latency_ms"] or {}
+        ttfa = level["ttfa_ms"] or {}
+        rtf = level["rtf"] or {}
+        print(
+            f"concurrency={concurrency:>3} ok={level['ok']}/{level['requests']} rps={level['throughput_rps']:.2f} "
+            f"p50={latency.get('p50', float('nan')):.1f}ms p95={latency.get('p95', float('nan')):.1f}ms "
+            f"p99={latency.get('p99', float('nan')):.1f}ms ttfa_p50={ttfa.get('p50', float('nan')):.1f}ms "
+            f"rtf_p50={rtf.get('p50', float('nan')):.3f}"
+        )
+    server_stats = session.get(args.url + "/stats", timeout=10).json()
+    return {"backend": health.get("backend"), "levels": levels, "server_stats": server_stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the TTS or STT service")
+    parser.add_argument("target", choices=sorted(SERVICES))
+    parser.add_argument("--url", default=None, help="service base URL (default: spawn or localhost default port)")
+    parser.add_argument("--spawn", metavar="BACKEND", default=None, help="start the service with this backend first")
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE for the spawned service (repeatable)")
+    parser.add_argument("--concurrency", default="1,4", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=2, help="requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--stream", action="store_true", help="TTS: use /v1/tts/stream (time to first audio)")
+    parser.add_argument("--voice", default="default")
+    parser.add_argument("--quality", default=None, help="TTS quality preset or diffusion steps")
+    parser.add_argument("--unique-texts", type=int, default=0, help="TTS: cycle through the first N texts only")
+    parser.add_argument("--audio", default=None, help="STT: audio file to upload (default: synthetic clip)")
+    parser.add_argument("--audio-seconds", type=float, default=3.0, help="STT: length of the synthetic clip")
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts to spawn (needs --spawn)")
+    parser.add_argument("--output", default=None, help="write the results as JSON")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+    if args.workers and not args.spawn:
+        parser.error("--workers needs --spawn")
+    url = args.url or ("http://127.0.0.1:5000" if args.target == "tts" else "http://127.0.0.1:6000")
+
+    runs = []
+    for workers in [int(w) for w in args.workers.split(",")] if args.workers else [None]:
+        proc = None
+        args.url = url.rstrip("/")
+        if args.spawn:
+            env = args.env + ([f"{args.target.upper()}_WORKERS={workers}"] if workers else [])
+            proc, args.url = spawn_service(args.target, args.spawn, env)
+        if workers:
+            print(f"workers={workers}")
+        try:
+            run = measure(args)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+        runs.append({"workers": workers, **run})
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    result = {
+        "target": args.target,
+        "backend": runs[-1]["backend"],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "params": params,
+        # the last (largest) worker count, so --compare checks that one
+        "levels": runs[-1]["levels"],
+        "server_stats": runs[-1]["server_stats"],
+    }
+    if len(runs) > 1:
+        result["runs"] = runs
+        result["scaling"] = scaling(runs)
+        print(f"{'workers':>7} {'conc':>4} {'req/s':>8} {'speedup':>8} {'eff':>6}")
+        for row in result["scaling"]:
+            speedup = row["speedup"] if row["speedup"] is not None else float("nan")
+            efficiency = row["efficiency"] if row["efficiency"] is not None else float("nan")
+            print(
+                f"{row['workers']:>7} {row['concurrency']:>4} {row['throughput_rps']:>8.2f} "
+                f"{speedup:>7.2f}x {efficiency:>6.2f}"
+            )
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.max_regression)
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Memory footprint, speed and audio similarity of VibeVoice per precision mode (fp32 / bf16 / int8).
+
+For each mode the same model is put through `apply_precision` and runs the speech-token loop of
+generate(): one LM decoding step, `sample_speech_tokens` and the acoustic connector per token,
+starting from a fixed random prompt. The latents are decoded to audio and compared with the fp32
+run: log-spectral distance (dB) and cosine similarity of the waveforms.
+
+Without `--model` a small random config is used (a few Qwen2.5-0.5B-sized layers, the production
+diffusion head, narrow tokenizers): the byte counts and relative speeds are meaningful, the
+similarity only shows how far each mode drifts from fp32 on the same weights. With `--model` the
+pretrained checkpoint is loaded once per mode.
+
+    PYTHONPATH=external python -m benchmarks.precision_modes
+    PYTHONPATH=external python -m benchmarks.precision_modes --model aoi-ot/VibeVoice-1.5B
+    PYTHONPATH=external python -m benchmarks.precision_modes --tiny   # quick smoke run
+"""
+
+import argparse
+import time
+
+import torch
+
+from benchmarks.diffusion_sampler import build_model, decode, log_spectral_distance
+from vibevoice.modular.configuration_vibevoice import VibeVoiceConfig
+from vibevoice.modular.modeling_vibevoice_inference import VibeVoiceForConditionalGenerationInference
+from vibevoice.modular.precision import PRECISION_MODES, apply_precision, module_nbytes
+
+
+def build_small_model(tiny: bool, lm_layers: int) -> VibeVoiceForConditionalGenerationInference:
+    if tiny:
+        tokenizer_cfg = dict(vae_dim=8, encoder_n_filters=4, encoder_ratios=[2, 2], encoder_depths="1-1-1")
+        acoustic_cfg, semantic_cfg = dict(decoder_n_filters=4, **tokenizer_cfg), tokenizer_cfg
+        hidden_size, head_cfg = 32, dict(head_layers=1, latent_size=8)
+    else:
+        # Qwen2.5-0.5B-sized layers and the production head; the tokenizers stay fp32 in every mode, a
+        # narrow one keeps decoding out of the way
+        tokenizer_cfg = dict(vae_dim=64, encoder_n_filters=8, encoder_ratios=[8, 5, 4, 2], encoder_depths="1-1-1-1-1")
+        acoustic_cfg, semantic_cfg = dict(decoder_n_filters=8, **tokenizer_cfg), dict(tokenizer_cfg, vae_dim=128)
+        hidden_size, head_cfg = 896, dict(latent_size=64)
+    config = VibeVoiceConfig(
+        acoustic_tokenizer_config=acoustic_cfg,
+        semantic_tokenizer_config=semantic_cfg,
+        decoder_config=dict(
+            model_type="qwen2",
+            vocab_size=1024,
+            hidden_size=hidden_size,
+            intermediate_size=hidden_size * 4,
+            num_hidden_layers=lm_layers,
+            num_attention_heads=4,
+            num_key_value_heads=2,
+        ),
+        diffusion_head_config=dict(hidden_size=hidden_size, **head_cfg),
+    )
+    torch.manual_seed(0)
+    model = VibeVoiceForConditionalGenerationInference(config)
+    # the output layers of the head are zero-initialized, give it something to predict
+    for param in model.model.prediction_head.parameters():
+        torch.nn.init.normal_(param, std=0.2 if tiny else 0.02)
+    model.model.speech_scaling_factor.fill_(1.0)
+    model.model.speech_bias_factor.fill_(0.0)
+    return model.eval()
+
+
+@torch.no_grad()
+def speech_loop(model, prompt_len: int, tokens: int, num_steps: int, cfg_scale: float, seed: int):
+    """Generate `tokens` speech latents the way generate() does after the prompt. Returns (latents, s)."""
+    lm = model.model.language_model
+    hidden_size = model.config.decoder_config.hidden_size
+    torch.manual_seed(seed)
+    prompt = torch.randn(1, prompt_len, hidden_size) * 0.02
+    neg_condition = torch.zeros(1, hidden_size)
+
+    start = time.perf_counter()
+    out = lm(inputs_embeds=prompt.to(lm.dtype), use_cache=True)
+    past, latents = out.past_key_values, []
+    for _ in range(tokens):
+        condition = out.last_hidden_state[:, -1, :]
+        latent = model.sample_speech_tokens(condition, neg_condition, cfg_scale=cfg_scale, num_steps=num_steps)
+        latents.append(latent)
+        next_embeds = model.model.acoustic_connector(latent.unsqueeze(1))
+        out = lm(inputs_embeds=next_embeds.to(lm.dtype), past_key_values=past, use_cache=True)
+        past = out.past_key_values
+    return torch.cat(latents, dim=0), time.perf_counter() - start
+
+
+def cosine_similarity(audio: torch.Tensor, reference: torch.Tensor) -> float:
+    return torch.nn.functional.cosine_similarity(audio, reference, dim=0).item()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VibeVoice precision modes on CPU")
+    parser.add_argument("--model", default=None, help="pretrained VibeVoice checkpoint (default: small random model)")
+    parser.add_argument("--modes", default=",".join(PRECISION_MODES), help="comma-separated precision modes")
+    parser.add_argument("--tokens", type=int, default=24, help="speech tokens generated per mode")
+    parser.add_argument("--prompt-len", type=int, default=64, help="prefilled prompt length")
+    parser.add_argument("--steps", type=int, default=10, help="diffusion steps per speech token")
+    parser.add_argument("--cfg-scale", type=float, default=1.3)
+    parser.add_argument("--lm-layers", type=int, default=4, help="Qwen layers of the random model")
+    parser.add_argument("--tiny", action="store_true", help="use a tiny random model (smoke test)")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    reference_audio = None
+    print(f"tokens={args.tokens} prompt_len={args.prompt_len} steps={args.steps} threads={torch.get_num_threads()}")
+    print(f"{'mode':>5} {'weights MB':>10} {'tokens/s':>9} {'LSD dB':>7} {'cosine':>7}")
+    for mode in ["fp32"] + [m for m in modes if m != "fp32"]:
+        if args.model:
+            model = build_model(args.model, tiny=False, device="cpu", dtype=torch.float32)
+        else:
+            model = build_small_model(args.tiny, args.lm_layers)
+        plan = apply_precision(model, mode)
+        with plan.autocast():
+            # warm up kernels and the sampler's schedule cache
+            speech_loop(model, args.prompt_len, 1, args.steps, args.cfg_scale, seed=0)
+            latents, elapsed = speech_loop(model, args.prompt_len, args.tokens, args.steps, args.cfg_scale, seed=0)
+        audio = decode(model, latents)
+        if reference_audio is None:
+            reference_audio = audio
+        if mode not in modes:
+            continue
+        lsd = log_spectral_distance(audio, reference_audio)
+        cosine = cosine_similarity(audio, reference_audio)
+        megabytes = module_nbytes(model) / 2**20
+        print(f"{mode:>5} {megabytes:>10.1f} {args.tokens / elapsed:>9.1f} {lsd:>7.2f} {cosine:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+STT throughput of the per-request path against micro-batched transcription.
+
+Cuts the given recordings into short clips (voice-agent sized utterances), then transcribes them
+once request by request via `backend.transcribe` and once submitted concurrently through the
+`MicroBatcher` used by the service, for each batch size. Reports clips/s.
+
+    PYTHONPATH=external python -m benchmarks.stt_batching --backend moonshine --model fidoriel/moonshine-tiny-de
+    PYTHONPATH=external python -m benchmarks.stt_batching --backend whisper --model small --compute-type int8
+"""
+
+import argparse
+import glob
+import time
+
+from src.common.batching import MicroBatcher
+from src.stt.audio import decode_audio
+
+
+def load_backend(args):
+    if args.backend == "whisper":
+        from src.stt.whisper_backend import WhisperBackend, WhisperConfig
+
+        cfg = WhisperConfig(model_name=args.model, compute_type=args.compute_type, batch_size=max(args.batch_sizes))
+        return WhisperBackend(cfg)
+    from src.stt.moonshine_backend import MoonshineBackend, MoonshineConfig
+
+    return MoonshineBackend(MoonshineConfig(model_name=args.model))
+
+
+def load_clips(paths, sample_rate: int, clip_seconds: float, num_clips: int):
+    clip_len = int(clip_seconds * sample_rate)
+    clips = []
+    for path in paths:
+        with open(path, "rb") as f:
+            audio = decode_audio(f.read(), sample_rate=sample_rate)
+        clips.extend(audio[i : i + clip_len] for i in range(0, len(audio) - clip_len + 1, clip_len))
+    if not clips:
+        raise SystemExit(f"no {clip_seconds}s clips in {paths}")
+    return [clips[i % len(clips)] for i in range(num_clips)]
+
+
+def per_request(backend, clips) -> float:
+    start = time.perf_counter()
+    for clip in clips:
+        backend.transcribe(clip)
+    return len(clips) / (time.perf_counter() - start)
+
+
+def micro_batched(backend, clips, batch_size: int, window_ms: float) -> float:
+    batcher = MicroBatcher(backend.transcribe_batch, max_batch_size=batch_size, window_ms=window_ms, name="bench")
+    try:
+        start = time.perf_counter()
+        futures = [batcher.submit(clip) for clip in clips]
+        for fut in futures:
+            fut.result()
+        return len(clips) / (time.perf_counter() - start)
+    finally:
+        batcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched STT throughput")
+    parser.add_argument("--backend", choices=["moonshine", "whisper"], default="moonshine")
+    parser.add_argument("--model", default="fidoriel/moonshine-tiny-de")
+    parser.add_argument("--compute-type", default="float16", help="faster-whisper compute type")
+    parser.add_argument("--audio", nargs="+", default=sorted(glob.glob("voices/*.wav")))
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--clips", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--window-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    backend = load_backend(args)
+    clips = load_clips(args.audio, backend.sample_rate, args.clip_seconds, args.clips)
+    # warm up kernels and allocator before timing
+    backend.transcribe(clips[0])
+    backend.transcribe_batch(clips[:2])
+
+    baseline = per_request(backend, clips)
+    print(f"backend={args.backend} model={args.model} clips={len(clips)} clip_seconds={args.clip_seconds}")
+    print(f"{'mode':>12} {'clips/s':>9} {'speedup':>8}")
+    print(f"{'per-request':>12} {baseline:>9.2f} {1.0:>7.2f}x")
+    for batch_size in args.batch_sizes:
+        throughput = micro_batched(backend, clips, batch_size, args.window_ms)
+        print(f"{f'batch={batch_size}':>12} {throughput:>9.2f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
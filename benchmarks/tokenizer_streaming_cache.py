@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Per-token cost of the streaming tokenizer caches used by VibeVoice generate().
+
+Every generated speech token runs one acoustic `decode` and one semantic `encode` in streaming mode.
+This compares the dict-based `VibeVoiceTokenizerStreamingCache` against the preallocated
+`VibeVoiceTokenizerTensorCache` on randomly initialized tokenizers (weights do not matter for timing).
+
+    PYTHONPATH=external python -m benchmarks.tokenizer_streaming_cache --batch-sizes 1 4 8
+    PYTHONPATH=external python -m benchmarks.tokenizer_streaming_cache --tiny   # quick smoke run
+"""
+
+import argparse
+import time
+
+import torch
+
+from vibevoice.modular.configuration_vibevoice import (
+    VibeVoiceAcousticTokenizerConfig,
+    VibeVoiceSemanticTokenizerConfig,
+)
+from vibevoice.modular.modular_vibevoice_tokenizer import (
+    VibeVoiceAcousticTokenizerModel,
+    VibeVoiceSemanticTokenizerModel,
+    VibeVoiceTokenizerStreamingCache,
+    VibeVoiceTokenizerTensorCache,
+)
+
+
+def build_tokenizers(tiny: bool, device: str):
+    if tiny:
+        overrides = dict(vae_dim=8, encoder_n_filters=4, encoder_ratios=[2, 2], encoder_depths="1-1-1")
+        acoustic_cfg = VibeVoiceAcousticTokenizerConfig(decoder_n_filters=4, **overrides)
+        semantic_cfg = VibeVoiceSemanticTokenizerConfig(**overrides)
+    else:
+        # production architecture (24 kHz, 3200x compression), random weights
+        acoustic_cfg = VibeVoiceAcousticTokenizerConfig()
+        semantic_cfg = VibeVoiceSemanticTokenizerConfig(vae_dim=128)
+    acoustic = VibeVoiceAcousticTokenizerModel(acoustic_cfg).to(device).eval()
+    semantic = VibeVoiceSemanticTokenizerModel(semantic_cfg).to(device).eval()
+    return acoustic, semantic
+
+
+def _sync(device: str) -> None:
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+@torch.no_grad()
+def time_per_token(cache_factory, acoustic, semantic, batch_size: int, steps: int, warmup: int, device: str) -> float:
+    """Mean seconds per generated token (decode + semantic encode) over `steps` tokens."""
+    acoustic_cache = cache_factory(batch_size)
+    semantic_cache = cache_factory(batch_size)
+    sample_indices = torch.arange(batch_size, device=device)
+    vae_dim = acoustic.config.vae_dim
+
+    elapsed = 0.0
+    for step in range(warmup + steps):
+        latent = torch.randn(batch_size, 1, vae_dim, device=device)
+        _sync(device)
+        start = time.perf_counter()
+        audio = acoustic.decode(latent, cache=acoustic_cache, sample_indices=sample_indices, use_cache=True)
+        semantic.encode(audio, cache=semantic_cache, sample_indices=sample_indices, use_cache=True)
+        _sync(device)
+        if step >= warmup:
+            elapsed += time.perf_counter() - start
+    return elapsed / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VibeVoice streaming tokenizer caches")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--steps", type=int, default=50, help="timed tokens per run")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--tiny", action="store_true", help="use a tiny tokenizer config (smoke test)")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    acoustic, semantic = build_tokenizers(args.tiny, args.device)
+    caches = {
+        "dict": lambda batch_size: VibeVoiceTokenizerStreamingCache(),
+        "tensor": VibeVoiceTokenizerTensorCache,
+    }
+
+    print(f"device={args.device} steps={args.steps} tiny={args.tiny}")
+    print(f"{'batch':>5} {'dict ms/tok':>12} {'tensor ms/tok':>14} {'speedup':>8}")
+    for batch_size in args.batch_sizes:
+        results = {
+            name: time_per_token(factory, acoustic, semantic, batch_size, args.steps, args.warmup, args.device)
+            for name, factory in caches.items()
+        }
+        print(
+            f"{batch_size:>5} {results['dict'] * 1e3:>12.3f} {results['tensor'] * 1e3:>14.3f} "
+            f"{results['dict'] / results['tensor']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -55,48 +55,55 @@ class VibeVoiceDataset:
         data["text"] = item[self.text_column]
         data["audio"] = item[self.audio_column]
 
-        user_provided_prompt = None
-        if self.voice_prompts_column and self.voice_prompts_column in item:
-            user_provided_prompt = item[self.voice_prompts_column]
-
+        user_provided_prompt = self.user_voice_prompts(item)
         if user_provided_prompt:
             # A prompt was provided in the dataset, so we use it.
-            if not isinstance(user_provided_prompt, list):
-                data["voice_prompts"] = [user_provided_prompt]
-            else:
-                data["voice_prompts"] = user_provided_prompt
+            data["voice_prompts"] = user_provided_prompt
         else:
             # FALLBACK: No prompt provided, so we auto-generate one from the target audio.
             try:
                 target_sr = 24000
                 wav_array = _load_audio_to_24k(item[self.audio_column], target_sr=target_sr)
-                audio_len_seconds = len(wav_array) / target_sr
-
-                min_len_sec = min(5.0, audio_len_seconds / 4.0)
-                max_len_sec = min(15.0, audio_len_seconds / 2.0)
-                
-                if min_len_sec > max_len_sec:
-                    min_len_sec = max_len_sec
-                max_len_sec = min(max_len_sec, audio_len_seconds)
-
-                if max_len_sec > 0.1:
-                    prompt_len_sec = random.uniform(min_len_sec, max_len_sec)
-                    prompt_len_samples = int(prompt_len_sec * target_sr)
-
-                    max_start_sample = len(wav_array) - prompt_len_samples
-                    start_sample = random.randint(0, max_start_sample)
-                    
-                    prompt_crop = wav_array[start_sample : start_sample + prompt_len_samples]
-                    
-                    data["voice_prompts"] = [prompt_crop]
-                else:
-                    data["voice_prompts"] = None
-
+                prompt_crop = auto_voice_prompt(wav_array, target_sr)
+                data["voice_prompts"] = [prompt_crop] if prompt_crop is not None else None
             except Exception as e:
                 warnings.warn(f"Could not create voice prompt for item {idx}: {e}")
                 data["voice_prompts"] = None            
         return data
 
+    def user_voice_prompts(self, item: Dict[str, Any]) -> Optional[List[Any]]:
+        """The voice prompts given in the dataset row (as a list), or None."""
+        if not self.voice_prompts_column or self.voice_prompts_column not in item:
+            return None
+        prompts = item[self.voice_prompts_column]
+        if not prompts:
+            return None
+        return prompts if isinstance(prompts, list) else [prompts]
+
+
+def auto_voice_prompt(
+    wav_array: np.ndarray, target_sr: int = 24000, rng: Optional[random.Random] = None
+) -> Optional[np.ndarray]:
+    """Random crop of the target audio (5-15 s, at most half of it) used as voice prompt; None if too short."""
+    rng = rng or random
+    audio_len_seconds = len(wav_array) / target_sr
+
+    min_len_sec = min(5.0, audio_len_seconds / 4.0)
+    max_len_sec = min(15.0, audio_len_seconds / 2.0)
+    
+    if min_len_sec > max_len_sec:
+        min_len_sec = max_len_sec
+    max_len_sec = min(max_len_sec, audio_len_seconds)
+
+    if max_len_sec <= 0.1:
+        return None
+    prompt_len_sec = rng.uniform(min_len_sec, max_len_sec)
+    prompt_len_samples = int(prompt_len_sec * target_sr)
+
+    max_start_sample = len(wav_array) - prompt_len_samples
+    start_sample = rng.randint(0, max_start_sample)
+    
+    return wav_array[start_sample : start_sample + prompt_len_samples]
 
 
 def _apply_silence_with_crossfade(
@@ -207,6 +214,9 @@ class VibeVoiceCollator:
     voice_prompt_drop_rate: float = 0.0
 
     def __call__(self, features: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        if features and "target_latents" in features[0]:
+            # Rows of a FeatureStore (feature_store.py): token ids and tokenizer latents were computed offline
+            return self._collate_precomputed(features)
         batch_size = len(features)
 
         sample_input_ids: List[List[int]] = []
@@ -277,48 +287,9 @@ class VibeVoiceCollator:
             if target_latent_len is None:
                 target_latent_len = max(1, int(math.ceil(len(wav_target) / float(self.speech_compress_ratio))))
 
-            speech_diff_id = self.processor.tokenizer.speech_diffusion_id
-            target_placeholders = [speech_diff_id] * target_latent_len
-
-            ids_extended = ids + target_placeholders
-            attn_extended = attn + [1] * target_latent_len
-
-            acoustic_input_mask = speech_input_mask_list + [True] * target_latent_len
-            acoustic_loss_mask = ([False] * len(speech_input_mask_list)) + [True] * target_latent_len
-
-            speech_end_id = self.processor.tokenizer.speech_end_id
-            ids_extended.append(speech_end_id)
-            attn_extended.append(1)
-            acoustic_input_mask.append(False)
-            acoustic_loss_mask.append(False)
-
-            # Ensure text decoding sees an explicit end-of-sequence token after speech output.
-            eos_token_id = getattr(self.processor.tokenizer, "eos_id", None)
-            if eos_token_id is None:
-                eos_token_id = getattr(self.processor.tokenizer, "eos_token_id", None)
-            if eos_token_id is not None and eos_token_id >= 0:
-                ids_extended.append(eos_token_id)
-                attn_extended.append(1)
-                acoustic_input_mask.append(False)
-                acoustic_loss_mask.append(False)
-
-            if self.max_length is not None and len(ids_extended) > self.max_length:
-                cut = len(ids_extended) - int(self.max_length)
-                leading_non_acoustic = 0
-                for v in acoustic_input_mask:
-                    if v:
-                        break
-                    leading_non_acoustic += 1
-                if cut > leading_non_acoustic:
-                    raise ValueError(
-                        f"--max_length={self.max_length} would truncate into acoustic tokens. "
-                        f"Needed cut={cut}, but only {leading_non_acoustic} leading non-acoustic tokens available. "
-                        "Increase max_length or shorten text/voice-prompt preamble."
-                    )
-                ids_extended = ids_extended[cut:]
-                attn_extended = attn_extended[cut:]
-                acoustic_input_mask = acoustic_input_mask[cut:]
-                acoustic_loss_mask = acoustic_loss_mask[cut:]
+            ids_extended, attn_extended, acoustic_input_mask, acoustic_loss_mask = self._append_target(
+                ids, attn, speech_input_mask_list, target_latent_len
+            )
 
             sample_input_ids.append(ids_extended)
             sample_attention_masks.append(attn_extended)
@@ -342,32 +313,14 @@ class VibeVoiceCollator:
             all_speech_latent_lengths.append(target_latent_len)
             per_segment_is_target.append(True)
 
-        max_seq_len = max(len(x) for x in sample_input_ids)
-        padded_input_ids = []
-        padded_attention_masks = []
-        padded_acoustic_input_masks = []
-        padded_acoustic_loss_masks = []
-        tok = self.processor.tokenizer
-        pad_token_id = getattr(tok, "pad_token_id", None)
-        if pad_token_id is None or pad_token_id < 0:
-            pad_token_id = getattr(tok, "eos_token_id", None)
-            if pad_token_id is None or pad_token_id < 0:
-                raise ValueError(
-                    "Tokenizer has no pad_token_id or eos_token_id; please set one or pass a valid pad id."
-                )
-        for ids, attn, ain_mask, aloss_mask in zip(
+        (
+            input_ids_tensor,
+            attention_mask_tensor,
+            acoustic_input_mask_tensor,
+            acoustic_loss_mask_tensor,
+        ) = self._pad_tokens(
             sample_input_ids, sample_attention_masks, sample_acoustic_input_masks, sample_acoustic_loss_masks
-        ):
-            pad_len = max_seq_len - len(ids)
-            padded_input_ids.append(ids + [pad_token_id] * pad_len)
-            padded_attention_masks.append(attn + [0] * pad_len)
-            padded_acoustic_input_masks.append(ain_mask + [False] * pad_len)
-            padded_acoustic_loss_masks.append(aloss_mask + [False] * pad_len)
-
-        input_ids_tensor = torch.tensor(padded_input_ids, dtype=torch.long)
-        attention_mask_tensor = torch.tensor(padded_attention_masks, dtype=torch.long)
-        acoustic_input_mask_tensor = torch.tensor(padded_acoustic_input_masks, dtype=torch.bool)
-        acoustic_loss_mask_tensor = torch.tensor(padded_acoustic_loss_masks, dtype=torch.bool)
+        )
 
         if all_speech_waveforms:
             max_wave_len = max(w.shape[0] for w in all_speech_waveforms)
@@ -444,4 +397,167 @@ class VibeVoiceCollator:
             "acoustic_input_mask": acoustic_input_mask_tensor,
             "acoustic_loss_mask": acoustic_loss_mask_tensor,
             "speeches_loss_input": speeches_loss_input_tensor,
-        }
\ No newline at end of file
+        }
+
+    def _append_target(
+        self, ids: List[int], attn: List[int], speech_input_mask_list: List[bool], target_latent_len: int
+    ) -> Tuple[List[int], List[int], List[bool], List[bool]]:
+        """Prompt tokens + target speech placeholders + speech end (+ eos), left-truncated to max_length."""
+        speech_diff_id = self.processor.tokenizer.speech_diffusion_id
+        target_placeholders = [speech_diff_id] * target_latent_len
+
+        ids_extended = ids + target_placeholders
+        attn_extended = attn + [1] * target_latent_len
+
+        acoustic_input_mask = speech_input_mask_list + [True] * target_latent_len
+        acoustic_loss_mask = ([False] * len(speech_input_mask_list)) + [True] * target_latent_len
+
+        speech_end_id = self.processor.tokenizer.speech_end_id
+        ids_extended.append(speech_end_id)
+        attn_extended.append(1)
+        acoustic_input_mask.append(False)
+        acoustic_loss_mask.append(False)
+
+        # Ensure text decoding sees an explicit end-of-sequence token after speech output.
+        eos_token_id = getattr(self.processor.tokenizer, "eos_id", None)
+        if eos_token_id is None:
+            eos_token_id = getattr(self.processor.tokenizer, "eos_token_id", None)
+        if eos_token_id is not None and eos_token_id >= 0:
+            ids_extended.append(eos_token_id)
+            attn_extended.append(1)
+            acoustic_input_mask.append(False)
+            acoustic_loss_mask.append(False)
+
+        if self.max_length is not None and len(ids_extended) > self.max_length:
+            cut = len(ids_extended) - int(self.max_length)
+            leading_non_acoustic = 0
+            for v in acoustic_input_mask:
+                if v:
+                    break
+                leading_non_acoustic += 1
+            if cut > leading_non_acoustic:
+                raise ValueError(
+                    f"--max_length={self.max_length} would truncate into acoustic tokens. "
+                    f"Needed cut={cut}, but only {leading_non_acoustic} leading non-acoustic tokens available. "
+                    "Increase max_length or shorten text/voice-prompt preamble."
+                )
+            ids_extended = ids_extended[cut:]
+            attn_extended = attn_extended[cut:]
+            acoustic_input_mask = acoustic_input_mask[cut:]
+            acoustic_loss_mask = acoustic_loss_mask[cut:]
+
+        return ids_extended, attn_extended, acoustic_input_mask, acoustic_loss_mask
+
+    def _pad_tokens(
+        self,
+        sample_input_ids: List[List[int]],
+        sample_attention_masks: List[List[int]],
+        sample_acoustic_input_masks: List[List[bool]],
+        sample_acoustic_loss_masks: List[List[bool]],
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        max_seq_len = max(len(x) for x in sample_input_ids)
+        padded_input_ids = []
+        padded_attention_masks = []
+        padded_acoustic_input_masks = []
+        padded_acoustic_loss_masks = []
+        tok = self.processor.tokenizer
+        pad_token_id = getattr(tok, "pad_token_id", None)
+        if pad_token_id is None or pad_token_id < 0:
+            pad_token_id = getattr(tok, "eos_token_id", None)
+            if pad_token_id is None or pad_token_id < 0:
+                raise ValueError(
+                    "Tokenizer has no pad_token_id or eos_token_id; please set one or pass a valid pad id."
+                )
+        for ids, attn, ain_mask, aloss_mask in zip(
+            sample_input_ids, sample_attention_masks, sample_acoustic_input_masks, sample_acoustic_loss_masks
+        ):
+            pad_len = max_seq_len - len(ids)
+            padded_input_ids.append(ids + [pad_token_id] * pad_len)
+            padded_attention_masks.append(attn + [0] * pad_len)
+            padded_acoustic_input_masks.append(ain_mask + [False] * pad_len)
+            padded_acoustic_loss_masks.append(aloss_mask + [False] * pad_len)
+
+        input_ids_tensor = torch.tensor(padded_input_ids, dtype=torch.long)
+        attention_mask_tensor = torch.tensor(padded_attention_masks, dtype=torch.long)
+        acoustic_input_mask_tensor = torch.tensor(padded_acoustic_input_masks, dtype=torch.bool)
+        acoustic_loss_mask_tensor = torch.tensor(padded_acoustic_loss_masks, dtype=torch.bool)
+
+        return input_ids_tensor, attention_mask_tensor, acoustic_input_mask_tensor, acoustic_loss_mask_tensor
+
+    def _collate_precomputed(self, features: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """Batch precomputed rows: no audio decode, processor call or tokenizer forward.
+
+        Returns `speech_latents` (acoustic tokenizer means, [segments, frames, vae_dim]) instead of
+        `speech_tensors`; the trainer samples and connects them like latents encoded from audio.
+        """
+        _drop_rate = min(max(self.voice_prompt_drop_rate, 0.0), 1.0)
+        speech_diff_id = self.processor.tokenizer.speech_diffusion_id
+
+        sample_input_ids: List[List[int]] = []
+        sample_attention_masks: List[List[int]] = []
+        sample_acoustic_input_masks: List[List[bool]] = []
+        sample_acoustic_loss_masks: List[List[bool]] = []
+        all_latents: List[np.ndarray] = []
+        all_semantics: List[np.ndarray] = []
+        per_segment_is_target: List[bool] = []
+
+        for ex in features:
+            variants = ex.get("voice_prompt_variants") or []
+            if variants and random.random() >= _drop_rate:
+                variant = variants[random.randrange(len(variants))] if len(variants) > 1 else variants[0]
+            else:
+                variant = ex["unprompted"]
+
+            ids = [int(t) for t in variant["input_ids"]]
+            # the processor marks exactly the voice prompt's speech placeholders as acoustic inputs
+            speech_input_mask_list = [t == speech_diff_id for t in ids]
+            target_latents = ex["target_latents"]
+            ids_extended, attn_extended, acoustic_input_mask, acoustic_loss_mask = self._append_target(
+                ids, [1] * len(ids), speech_input_mask_list, int(target_latents.shape[0])
+            )
+            sample_input_ids.append(ids_extended)
+            sample_attention_masks.append(attn_extended)
+            sample_acoustic_input_masks.append(acoustic_input_mask)
+            sample_acoustic_loss_masks.append(acoustic_loss_mask)
+
+            all_latents.extend(variant["latents"])
+            all_semantics.extend(variant["semantics"])
+            per_segment_is_target.extend([False] * len(variant["latents"]))
+            all_latents.append(target_latents)
+            all_semantics.append(ex["target_semantics"])
+            per_segment_is_target.append(True)
+
+        (
+            input_ids_tensor,
+            attention_mask_tensor,
+            acoustic_input_mask_tensor,
+            acoustic_loss_mask_tensor,
+        ) = self._pad_tokens(
+            sample_input_ids, sample_attention_masks, sample_acoustic_input_masks, sample_acoustic_loss_masks
+        )
+
+        max_latent_len = max(lat.shape[0] for lat in all_latents)
+        speech_latents = np.zeros((len(all_latents), max_latent_len, all_latents[0].shape[1]), dtype=np.float32)
+        speech_semantics = np.zeros((len(all_latents), max_latent_len, self.semantic_vae_dim), dtype=np.float32)
+        speech_masks_np = np.zeros((len(all_latents), max_latent_len), dtype=np.bool_)
+        for i, (lat, sem) in enumerate(zip(all_latents, all_semantics)):
+            L = lat.shape[0]
+            speech_latents[i, :L] = lat
+            speech_semantics[i, :L, : sem.shape[1]] = sem[:, : self.semantic_vae_dim]
+            speech_masks_np[i, :L] = True
+        speeches_loss_input_np = speech_masks_np & np.asarray(per_segment_is_target, dtype=np.bool_)[:, None]
+
+        if self.debug_checks:
+            assert int(acoustic_input_mask_tensor.sum()) == int(speech_masks_np.sum()), "latent/placeholder mismatch"
+
+        return {
+            "input_ids": input_ids_tensor,
+            "attention_mask": attention_mask_tensor,
+            "speech_tensors": None,
+            "speech_latents": torch.from_numpy(speech_latents),
+            "speech_masks": torch.from_numpy(speech_masks_np),
+            "speech_semantic_tensors": torch.from_numpy(speech_semantics),
+            "acoustic_input_mask": acoustic_input_mask_tensor,
+            "acoustic_loss_mask": acoustic_loss_mask_tensor,
+            "speeches_loss_input": torch.from_numpy(speeches_loss_input_np),
+        }
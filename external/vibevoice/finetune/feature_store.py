@@ -0,0 +1,293 @@
+"""Precomputed fine-tuning features: token ids and frozen tokenizer latents, memory-mapped from disk.
+
+`VibeVoiceDataset` + `VibeVoiceCollator` decode and resample every clip, run the processor and (in the
+trainer) the acoustic tokenizer again in every epoch, although the tokenizers are frozen. `build_feature_store`
+does that work once: per example it stores the processor's token ids (with and without voice prompt) and,
+for the voice prompts and the target audio, the acoustic tokenizer means and semantic tokenizer features.
+
+Layout of a store directory::
+
+    index.json                  metadata + per example: text and (shard, offset, length) references
+    shard-00000.ids.npy         int32, token ids of all examples in the shard, concatenated
+    shard-00000.acoustic.npy    float32 [frames, acoustic vae_dim], one row per latent frame
+    shard-00000.semantic.npy    float32 [frames, semantic vae_dim], rows aligned with acoustic
+
+`FeatureStore` memory-maps the shards (pages are read on first access, shared between dataloader workers)
+and yields rows that `VibeVoiceCollator` batches without any audio work; the trainer then only samples
+the stored means (the acoustic tokenizer's Gaussian) instead of encoding audio.
+
+Auto-generated voice prompts (random crops of the target) are drawn once per example and variant
+(`prompt_variants`, seeded); the collator picks one variant at random per step.
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from vibevoice.finetune.data_vibevoice import (
+    VibeVoiceDataset,
+    _apply_silence_with_crossfade,
+    _load_audio_to_24k,
+    auto_voice_prompt,
+)
+
+logger = logging.getLogger(__name__)
+
+FEATURE_STORE_VERSION = 1
+INDEX_FILE = "index.json"
+SAMPLE_RATE = 24000
+
+
+def _tokenizer_means(tokenizer: torch.nn.Module, speech: torch.Tensor) -> torch.Tensor:
+    """[segments, samples] audio -> [segments, frames, vae_dim] encoder means (no sampling)."""
+    param = next(tokenizer.parameters())
+    out = tokenizer.encode(speech.unsqueeze(1).to(device=param.device, dtype=param.dtype))
+    # the trainer wraps acoustic_tokenizer.encode to return [[output]] (see train_vibevoice.py)
+    while isinstance(out, (list, tuple)):
+        out = out[0]
+    return out.mean.float().cpu()
+
+
+class _ShardWriter:
+    def __init__(self, path: str, shard_bytes: int) -> None:
+        self.path = path
+        self.shard_bytes = shard_bytes
+        self.shards: List[str] = []
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ids: List[np.ndarray] = []
+        self._acoustic: List[np.ndarray] = []
+        self._semantic: List[np.ndarray] = []
+        self._num_ids = 0
+        self._rows = 0
+        self._bytes = 0
+
+    def add_ids(self, ids: Sequence[int]) -> List[int]:
+        arr = np.asarray(ids, dtype=np.int32)
+        ref = [len(self.shards), self._num_ids, int(arr.shape[0])]
+        self._ids.append(arr)
+        self._num_ids += arr.shape[0]
+        self._bytes += arr.nbytes
+        return ref
+
+    def add_segment(self, acoustic: np.ndarray, semantic: np.ndarray) -> List[int]:
+        ref = [len(self.shards), self._rows, int(acoustic.shape[0])]
+        self._acoustic.append(acoustic)
+        self._semantic.append(semantic)
+        self._rows += acoustic.shape[0]
+        self._bytes += acoustic.nbytes + semantic.nbytes
+        return ref
+
+    def end_example(self) -> None:
+        # examples never straddle shards, so a shard is complete once it is over budget
+        if self._bytes >= self.shard_bytes:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._ids:
+            return
+        name = f"shard-{len(self.shards):05d}"
+        np.save(os.path.join(self.path, f"{name}.ids.npy"), np.concatenate(self._ids))
+        np.save(os.path.join(self.path, f"{name}.acoustic.npy"), np.concatenate(self._acoustic).astype(np.float32))
+        np.save(os.path.join(self.path, f"{name}.semantic.npy"), np.concatenate(self._semantic).astype(np.float32))
+        self.shards.append(name)
+        self._reset()
+
+
+def build_feature_store(
+    dataset: VibeVoiceDataset,
+    processor: Any,
+    model: Any,
+    path: str,
+    *,
+    prompt_variants: int = 1,
+    seed: int = 0,
+    shard_bytes: int = 256 << 20,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> "FeatureStore":
+    """Run the processor and the frozen acoustic/semantic tokenizers once over `dataset` into `path`.
+
+    The store is written to a temporary directory and renamed into place, so an interrupted build leaves
+    nothing behind. `metadata` is saved in the index (e.g. the model and dataset it was built from).
+    """
+    acoustic_tok = model.model.acoustic_tokenizer
+    semantic_tok = model.model.semantic_tokenizer
+    ratio = int(getattr(processor, "speech_tok_compress_ratio", 3200))
+
+    tmp_path = f"{path.rstrip(os.sep)}.tmp.{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    writer = _ShardWriter(tmp_path, shard_bytes)
+    items: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    frames = 0
+
+    def encode(speech: torch.Tensor, lengths: List[int]) -> List[List[int]]:
+        acoustic = _tokenizer_means(acoustic_tok, speech)
+        semantic = _tokenizer_means(semantic_tok, speech)
+        refs = []
+        for i, n in enumerate(lengths):
+            if acoustic.shape[1] < n or semantic.shape[1] < n:
+                raise RuntimeError(f"Tokenizer returned {acoustic.shape[1]} frames, {n} expected")
+            refs.append(writer.add_segment(acoustic[i, :n].numpy(), semantic[i, :n].numpy()))
+        return refs
+
+    try:
+        with torch.inference_mode():
+            for idx in range(len(dataset)):
+                item = dataset.dataset[idx]
+                text = item[dataset.text_column]
+                wav = _load_audio_to_24k(item[dataset.audio_column], target_sr=SAMPLE_RATE)
+
+                user_prompts = dataset.user_voice_prompts(item)
+                if user_prompts:
+                    prompt_sets = [user_prompts]
+                else:
+                    rng = random.Random(f"{seed}:{idx}")
+                    crops = [auto_voice_prompt(wav, SAMPLE_RATE, rng) for _ in range(max(1, prompt_variants))]
+                    prompt_sets = [[crop] for crop in crops if crop is not None]
+
+                unprompted = processor(text=[text], voice_samples=None, padding=False, return_tensors="pt")
+                entry: Dict[str, Any] = {
+                    "text": text,
+                    "unprompted": {"ids": writer.add_ids(unprompted["input_ids"][0].tolist()), "segments": []},
+                    "variants": [],
+                }
+                for prompts in prompt_sets:
+                    proc = processor(text=[text], voice_samples=[prompts], padding=False, return_tensors="pt")
+                    lengths = proc["speech_masks"].sum(dim=1).tolist()
+                    entry["variants"].append(
+                        {
+                            "ids": writer.add_ids(proc["input_ids"][0].tolist()),
+                            "segments": encode(proc["speech_tensors"], lengths),
+                        }
+                    )
+
+                target = _apply_silence_with_crossfade(wav, sample_rate=SAMPLE_RATE)
+                target_len = max(1, int(math.ceil(len(target) / float(ratio))))
+                entry["target"] = encode(torch.from_numpy(target)[None], [target_len])[0]
+                frames += target_len
+                writer.end_example()
+                items.append(entry)
+                if (idx + 1) % 100 == 0:
+                    logger.info(f"Feature store: {idx + 1}/{len(dataset)} examples")
+        writer.flush()
+
+        index = {
+            "version": FEATURE_STORE_VERSION,
+            "sample_rate": SAMPLE_RATE,
+            "speech_tok_compress_ratio": ratio,
+            "acoustic_vae_dim": int(acoustic_tok.config.vae_dim),
+            "semantic_vae_dim": int(semantic_tok.config.vae_dim),
+            "prompt_variants": prompt_variants,
+            "seed": seed,
+            **(metadata or {}),
+            "shards": writer.shards,
+            "items": items,
+        }
+        with open(os.path.join(tmp_path, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    logger.info(
+        f"Feature store {path}: {len(items)} examples, {frames} target frames, {len(writer.shards)} shards "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    return FeatureStore(path)
+
+
+class FeatureStore:
+    """Dataset over a directory written by `build_feature_store`; rows feed `VibeVoiceCollator` directly."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), "r", encoding="utf-8") as f:
+            self.index: Dict[str, Any] = json.load(f)
+        if self.index.get("version") != FEATURE_STORE_VERSION:
+            raise ValueError(
+                f"Feature store {path} has version {self.index.get('version')}, expected {FEATURE_STORE_VERSION}"
+            )
+        self.items: List[Dict[str, Any]] = self.index["items"]
+        self._shards: Dict[Tuple[int, str], np.ndarray] = {}
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, INDEX_FILE))
+
+    def matches(self, **expected: Any) -> bool:
+        """True if the index was built with these metadata values (model, dataset, prompt variants, ...)."""
+        return all(self.index.get(k) == v for k, v in expected.items())
+
+    def _array(self, shard: int, kind: str) -> np.ndarray:
+        key = (shard, kind)
+        arr = self._shards.get(key)
+        if arr is None:
+            name = self.index["shards"][shard]
+            arr = np.load(os.path.join(self.path, f"{name}.{kind}.npy"), mmap_mode="r")
+            self._shards[key] = arr
+        return arr
+
+    def _ids(self, ref: Sequence[int]) -> np.ndarray:
+        shard, offset, length = ref
+        return self._array(shard, "ids")[offset : offset + length]
+
+    def _segment(self, ref: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        shard, row, frames = ref
+        return self._array(shard, "acoustic")[row : row + frames], self._array(shard, "semantic")[row : row + frames]
+
+    def _prompt(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        segments = [self._segment(ref) for ref in entry["segments"]]
+        return {
+            "input_ids": self._ids(entry["ids"]),
+            "latents": [acoustic for acoustic, _ in segments],
+            "semantics": [semantic for _, semantic in segments],
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # spawned dataloader workers map the shards themselves instead of receiving copies of them
+        return {**self.__dict__, "_shards": {}}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        item = self.items[idx]
+        target_latents, target_semantics = self._segment(item["target"])
+        return {
+            "text": item["text"],
+            "unprompted": self._prompt(item["unprompted"]),
+            "voice_prompt_variants": [self._prompt(v) for v in item["variants"]],
+            "target_latents": target_latents,
+            "target_semantics": target_semantics,
+        }
+
+
+def open_or_build_feature_store(
+    dataset: VibeVoiceDataset, processor: Any, model: Any, path: str, **kwargs: Any
+) -> FeatureStore:
+    """The store at `path` if it was built from the same inputs (`metadata`, `prompt_variants`, `seed`), else a
+    fresh build."""
+    if FeatureStore.exists(path):
+        store = FeatureStore(path)
+        expected = {
+            **kwargs.get("metadata", {}),
+            "prompt_variants": kwargs.get("prompt_variants", 1),
+            "seed": kwargs.get("seed", 0),
+        }
+        if store.matches(**expected) and len(store) == len(dataset):
+            logger.info(f"Using feature store {path} ({len(store)} examples)")
+            return store
+        logger.warning(f"Feature store {path} was built from different inputs, rebuilding it")
+    return build_feature_store(dataset, processor, model, path, **kwargs)
@@ -24,6 +24,7 @@ from vibevoice.modular.configuration_vibevoice import VibeVoiceConfig
 from vibevoice.processor.vibevoice_processor import VibeVoiceProcessor
 
 from vibevoice.finetune.data_vibevoice import VibeVoiceDataset, VibeVoiceCollator
+from vibevoice.finetune.feature_store import open_or_build_feature_store
 
 logger = logging.getLogger(__name__)
 
@@ -139,6 +140,16 @@ class DataArguments:
         default=0.0,
         metadata={"help": "Probability to drop conditioning voice prompt during training (0.0 keep always, 1.0 drop always)."},
     )
+    feature_store_dir: Optional[str] = field(
+        default=None,
+        metadata={"help": "Precompute token ids and frozen tokenizer latents once into this directory (built on the first run, "
+                          "rebuilt if model/dataset change) and train from the memory-mapped features instead of audio."},
+    )
+    feature_store_prompt_variants: int = field(
+        default=1,
+        metadata={"help": "Auto-generated voice prompt crops stored per example; one is picked at random per step."},
+    )
+    feature_store_only: bool = field(default=False, metadata={"help": "Build the feature store and exit"})
 
 @dataclass
 class CustomTrainingArguments(HfTrainingArguments):
@@ -521,6 +532,35 @@ def main() -> None:
             voice_prompts_column=data_args.voice_prompts_column_name,
         )
 
+    if data_args.feature_store_dir:
+        # Decode audio, run the processor and the frozen tokenizers once; later epochs read memory-mapped features
+        for tokenizer_module in (model.model.acoustic_tokenizer, model.model.semantic_tokenizer):
+            tokenizer_module.to(training_args.device)
+
+        def _feature_store(dataset: VibeVoiceDataset, split: str, source: Optional[str]):
+            metadata = {
+                "model": model_args.model_name_or_path,
+                "dataset": getattr(dataset.dataset, "_fingerprint", None) or source,
+                "split": split,
+            }
+            with training_args.main_process_first(desc=f"feature store ({split})"):
+                return open_or_build_feature_store(
+                    dataset,
+                    processor,
+                    model,
+                    os.path.join(data_args.feature_store_dir, split),
+                    prompt_variants=data_args.feature_store_prompt_variants,
+                    seed=training_args.seed,
+                    metadata=metadata,
+                )
+
+        train_dataset = _feature_store(train_dataset, "train", data_args.train_jsonl or data_args.dataset_name)
+        if eval_dataset is not None:
+            eval_dataset = _feature_store(eval_dataset, "eval", data_args.validation_jsonl or data_args.dataset_name)
+        if data_args.feature_store_only:
+            logger.info(f"Feature store ready in {data_args.feature_store_dir} (--feature_store_only)")
+            return
+
     # Ratios/dims from processor+model
     speech_compress_ratio = getattr(processor, "speech_tok_compress_ratio", 3200)
     semantic_dim = getattr(model.config, "semantic_vae_dim", None)
@@ -619,6 +659,10 @@ def main() -> None:
             
             # Speech-related inputs
             speech_tensors = inputs.get("speech_tensors")
+            speech_type = "audio"
+            if inputs.get("speech_latents") is not None:
+                # acoustic tokenizer means from the feature store: sampled and connected, no tokenizer forward
+                speech_tensors, speech_type = inputs["speech_latents"], "latents"
             speech_masks = inputs.get("speech_masks")
             speeches_loss_input = inputs.get("speeches_loss_input")
             speech_semantic_tensors = inputs.get("speech_semantic_tensors")
@@ -636,7 +680,7 @@ def main() -> None:
                 speech_all_features, speech_all_connect_features = model.forward_speech_features(
                         speech_tensors=speech_tensors.type_as(x) if speech_tensors is not None else None,
                         speech_masks=speech_masks,
-                        speech_type=kwargs.get("speech_type", "audio"),
+                        speech_type=speech_type,
                         return_unmask=True
                     )
                 if speech_tensors is not None:
@@ -658,7 +702,7 @@ def main() -> None:
                 speech_features, speech_connect_features = model.forward_speech_features(
                         speech_tensors=speech_tensors.type_as(x) if speech_tensors is not None else None,
                         speech_masks=speech_masks,
-                        speech_type=kwargs.get("speech_type", "audio"),
+                        speech_type=speech_type,
                     )
                 if speech_tensors is not None:
                     x[acoustic_input_mask] = speech_connect_features
@@ -174,3 +174,22 @@ def load_lora_assets(model, checkpoint_dir: str, device: Optional[torch.device]
         )
 
     return report
+
+
+def merge_lora_adapters(model) -> None:
+    """Fold PEFT adapters loaded by `load_lora_assets` into the base weights and drop the PEFT wrappers.
+
+    Afterwards the model is a plain `VibeVoiceForConditionalGenerationInference` again: no adapter
+    overhead per forward pass, and its state dict has the original parameter names (so it can be saved
+    and reloaded without peft).
+    """
+
+    language_model = model.model.language_model
+    if hasattr(language_model, "merge_and_unload"):
+        model.model.language_model = language_model.merge_and_unload()
+    prediction_head = model.model.prediction_head
+    if hasattr(prediction_head, "merge_and_unload"):
+        merged = prediction_head.merge_and_unload()
+        model.model.prediction_head = merged.base if isinstance(merged, _DiffusionHeadForwardShim) else merged
+    if hasattr(model, "tie_weights"):
+        model.tie_weights()
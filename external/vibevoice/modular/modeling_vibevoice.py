@@ -17,7 +17,7 @@ from transformers.modeling_flash_attention_utils import FlashAttentionKwargs
 from transformers.utils import logging
 
 
-from .modular_vibevoice_tokenizer import VibeVoiceTokenizerStreamingCache, VibeVoiceAcousticTokenizerModel, VibeVoiceSemanticTokenizerModel
+from .modular_vibevoice_tokenizer import VibeVoiceTokenizerStreamingCache, VibeVoiceAcousticTokenizerModel, VibeVoiceSemanticTokenizerModel, VibeVoiceTokenizerEncoderOutput
 from .modular_vibevoice_diffusion_head import VibeVoiceDiffusionHead
 from vibevoice.schedule.dpm_solver import DPMSolverMultistepScheduler
 
@@ -290,6 +290,11 @@ class VibeVoiceForConditionalGeneration(VibeVoicePreTrainedModel):
                         frames = self.model.acoustic_tokenizer.encode(speech_tensors.unsqueeze(1))[0][0]
                     audio_tokens = frames.sample(self.model.acoustic_tokenizer.std_dist_type)[0]
 
+                elif speech_type == "latents":
+                    # acoustic tokenizer means precomputed offline (finetune/feature_store.py), sampled like "audio"
+                    frames = VibeVoiceTokenizerEncoderOutput(mean=speech_tensors, std=self.model.acoustic_tokenizer.fix_std)
+                    audio_tokens = frames.sample(self.model.acoustic_tokenizer.std_dist_type)[0]
+
                 elif speech_type == "vae":
                     # Use config to get vae_dim instead of non-existent self.args
                     vae_dim = self.config.acoustic_tokenizer_config.vae_dim
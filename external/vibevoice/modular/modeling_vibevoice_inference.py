@@ -1,3 +1,5 @@
+import contextlib
+import time
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple, Union, Callable
 from tqdm import tqdm
@@ -15,9 +17,10 @@ from transformers.utils import logging
 
 
 # from .modular_vibevoice_tokenizer import VibeVoiceTokenizerStreamingCache, VibeVoiceAcousticTokenizerModel, VibeVoiceSemanticTokenizerModel
-from .modular_vibevoice_tokenizer import VibeVoiceTokenizerStreamingCache, VibeVoiceTokenizerEncoderOutput
+from .modular_vibevoice_tokenizer import VibeVoiceTokenizerTensorCache, VibeVoiceTokenizerEncoderOutput
 from .modular_vibevoice_diffusion_head import VibeVoiceDiffusionHead
 from vibevoice.schedule.dpm_solver import DPMSolverMultistepScheduler
+from vibevoice.schedule.dpm_solver_plan import DPMSolverPlan
 
 from .configuration_vibevoice import VibeVoiceConfig
 
@@ -25,12 +28,48 @@ from .modular_vibevoice_text_tokenizer import VibeVoiceTextTokenizer, VibeVoiceT
 
 from .modeling_vibevoice import VibeVoiceModel, VibeVoicePreTrainedModel
 from .streamer import AudioStreamer, AsyncAudioStreamer
+from .prefix_cache import PrefixKVCache, _cache_kv_pairs
 
 logger = logging.get_logger(__name__)
 
 if not hasattr(modeling_utils, "ALL_PARALLEL_STYLES") or modeling_utils.ALL_PARALLEL_STYLES is None:
     modeling_utils.ALL_PARALLEL_STYLES = ["tp", "none", "colwise", "rowwise"]
 
+# Named diffusion step counts for `generate(ddpm_inference_steps=...)`
+DIFFUSION_STEP_PRESETS = {
+    "fast": 5,
+    "balanced": 10,
+    "quality": 20,
+}
+
+_NO_TIMING = contextlib.nullcontext()
+
+
+class _StageTimer:
+    """
+    Reports the wall time of generate() stages to `observer(stage, seconds)`. Without an observer
+    `timer(stage)` is a shared no-op context. On CUDA the device is synchronized around each timed
+    stage so that kernels are attributed to the stage that launched them (only while observing).
+    """
+
+    def __init__(self, observer: Optional[Callable[[str, float], None]], device: torch.device):
+        self.observer = observer
+        self.sync = observer is not None and device.type == "cuda"
+
+    @contextlib.contextmanager
+    def _timed(self, stage: str):
+        if self.sync:
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        yield
+        if self.sync:
+            torch.cuda.synchronize()
+        self.observer(stage, time.perf_counter() - start)
+
+    def __call__(self, stage: str):
+        return _NO_TIMING if self.observer is None else self._timed(stage)
+
+
 @dataclass
 class VibeVoiceCausalLMOutputWithPast(BaseModelOutputWithPast):
     logits: Optional[torch.FloatTensor] = None
@@ -65,6 +104,56 @@ class VibeVoiceTokenConstraintProcessor(LogitsProcessor):
         scores = scores + mask
         return scores
     
+def _shift_right_index(start_indices: torch.LongTensor, length: int) -> torch.LongTensor:
+    """
+    Gather index of shape `(len(start_indices), length)` that moves positions `start + 1:` one step right
+    (i.e. `x[start + 1:] = x[start:-1]`). Rows with `start + 1 >= length - 1` are left as the identity.
+    """
+    positions = torch.arange(length, device=start_indices.device)
+    start = start_indices[:, None]
+    shift = (positions[None, :] > start) & (start + 1 < length - 1)
+    return positions[None, :] - shift.long()
+
+
+def _reset_negative_cache_for_speech_start(
+    negative_model_kwargs: Dict, negative_input_ids: torch.LongTensor, sample_indices: torch.LongTensor, speech_start_id: int
+) -> None:
+    """Restart the negative (unconditional) branch of the given samples at a new speech_start, in place."""
+    attention_mask = negative_model_kwargs['attention_mask']
+    attention_mask[sample_indices] = 0
+    attention_mask[sample_indices, -1] = 1
+    for k_cache, v_cache in _cache_kv_pairs(negative_model_kwargs['past_key_values']):
+        k_cache[sample_indices, :, -1, :] = k_cache[sample_indices, :, 0, :]
+        v_cache[sample_indices, :, -1, :] = v_cache[sample_indices, :, 0, :]
+    negative_input_ids[sample_indices, -1] = speech_start_id
+
+
+def _drop_negative_step_for_samples(
+    negative_model_kwargs: Dict, negative_input_ids: torch.LongTensor, sample_indices: torch.LongTensor, start_indices: torch.LongTensor
+) -> None:
+    """
+    Undo the negative-branch step for samples that were forwarded only to keep the batch aligned: shift their
+    cache / ids right by one from `start_indices` and mask the freed slot, in place. One gather per tensor.
+    """
+    attention_mask = negative_model_kwargs['attention_mask']
+    index = _shift_right_index(start_indices, attention_mask.shape[1])
+    attention_mask[sample_indices] = attention_mask[sample_indices[:, None], index]
+    attention_mask[sample_indices, start_indices] = 0
+
+    index_maps = {}
+    for k_cache, v_cache in _cache_kv_pairs(negative_model_kwargs['past_key_values']):
+        length = k_cache.shape[2]
+        if length not in index_maps:
+            index_maps[length] = _shift_right_index(start_indices, length)
+        index = index_maps[length]
+        # advanced indexing puts the (sample, position) dims first: [n, L, heads, dim] -> [n, heads, L, dim]
+        k_cache[sample_indices] = k_cache[sample_indices[:, None], :, index].transpose(1, 2)
+        v_cache[sample_indices] = v_cache[sample_indices[:, None], :, index].transpose(1, 2)
+
+    index = _shift_right_index(start_indices, negative_input_ids.shape[1])
+    negative_input_ids[sample_indices] = negative_input_ids[sample_indices[:, None], index]
+
+
 class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, GenerationMixin):
     _tied_weights_keys = ["lm_head.weight"]
     _tp_plan = {"lm_head": "colwise_rep"}
@@ -80,6 +169,10 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
         
         # inference configuration
         self.ddpm_inference_steps = config.diffusion_head_config.ddpm_num_inference_steps
+        # Unrolled scheduler + timestep embeddings per step count, see `sample_speech_tokens`
+        self.use_fast_sampler = True
+        self._sampler_plans: Dict[int, Optional[DPMSolverPlan]] = {}
+        self._timestep_embeds: Dict[Tuple[int, torch.device, torch.dtype], torch.Tensor] = {}
 
         # Initialize weights and apply final processing
         self.post_init()
@@ -146,6 +239,11 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
     def set_ddpm_inference_steps(self, num_steps=None):
         self.ddpm_inference_steps = num_steps or self.config.diffusion_head_config.ddpm_num_inference_steps
 
+    def clear_sampler_cache(self):
+        """Drop cached timestep embeddings; call after changing the prediction head weights."""
+        self._sampler_plans.clear()
+        self._timestep_embeds.clear()
+
     def _process_speech_inputs(self, speech_tensors, speech_masks, speech_type="audio"):
         """Process speech inputs through tokenizers and connectors."""
         with torch.no_grad():
@@ -174,6 +272,25 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
                 return acoustic_features, acoustic_connected
             else:
                 raise NotImplementedError(f"Speech type {speech_type} not implemented")
+
+    @torch.no_grad()
+    def encode_voice_prompt(self, speech: torch.FloatTensor) -> Tuple[torch.FloatTensor, torch.FloatTensor]:
+        """
+        Encode a single (already normalized) reference waveform for reuse across requests.
+
+        Args:
+            speech (`torch.FloatTensor` of shape `(num_samples,)`): 24 kHz mono waveform.
+
+        Returns:
+            `(acoustic_features, speech_embeds)` of shapes `(frames, vae_dim)` and `(frames, hidden_size)`.
+            `speech_embeds` can be passed to `generate(speech_embeds=...)` in place of `speech_tensors`.
+        """
+        speech = speech.to(device=self.device, dtype=self.dtype).reshape(1, -1)
+        hop_length = int(self.model.acoustic_tokenizer.encoder.hop_length)
+        num_frames = -(-speech.shape[-1] // hop_length)
+        speech_masks = torch.ones(1, num_frames, dtype=torch.bool)
+        acoustic_features, speech_embeds = self._process_speech_inputs(speech, speech_masks)
+        return acoustic_features[0], speech_embeds
     
     # @can_return_tuple
     def forward(
@@ -192,6 +309,7 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
         speech_tensors: Optional[torch.FloatTensor] = None,
         speech_masks: Optional[torch.BoolTensor] = None,
         speech_input_mask: Optional[torch.BoolTensor] = None,
+        speech_embeds: Optional[torch.FloatTensor] = None,
         logits_to_keep: Union[int, slice] = 0,
         **kwargs,
     ) -> Union[Tuple, VibeVoiceCausalLMOutputWithPast]:
@@ -207,6 +325,9 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
                 Masks indicating valid speech frames.
             speech_input_mask (`torch.BoolTensor`, *optional*):
                 Positions in the input sequence where speech embeddings should be inserted.
+            speech_embeds (`torch.FloatTensor` of shape `(num_speech_tokens, hidden_size)`, *optional*):
+                Precomputed connector outputs for the speech positions (see `encode_voice_prompt`).
+                Takes precedence over `speech_tensors`.
         
         Returns:
             `VibeVoiceCausalLMOutputWithPast` or tuple
@@ -218,10 +339,10 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
             inputs_embeds = self.model.get_input_embeddings()(input_ids)
         
         # Process speech inputs if provided
-        if speech_tensors is not None and speech_masks is not None:
+        if speech_embeds is None and speech_tensors is not None and speech_masks is not None:
             acoustic_features, speech_embeds = self._process_speech_inputs(speech_tensors.to(self.dtype), speech_masks)
-            if speech_input_mask is not None:
-                inputs_embeds[speech_input_mask] = speech_embeds
+        if speech_embeds is not None and speech_input_mask is not None:
+            inputs_embeds[speech_input_mask] = speech_embeds.to(inputs_embeds.dtype)
 
         outputs = self.model(
             inputs_embeds=inputs_embeds,
@@ -339,11 +460,17 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
         speech_tensors: Optional[torch.FloatTensor] = None,
         speech_masks: Optional[torch.BoolTensor] = None,
         speech_input_mask: Optional[torch.BoolTensor] = None,
+        speech_embeds: Optional[torch.FloatTensor] = None,
         is_prefill: bool = True,
         return_speech: bool = True,
         cfg_scale: float = 1.0,
         stop_check_fn: Optional[Callable[[], bool]] = None,
+        sample_stop_fn: Optional[Callable[[], List[int]]] = None,
         tqdm_class: Optional[type] = None,
+        prefix_cache: Optional[PrefixKVCache] = None,
+        prefix_cache_key: Optional[str] = None,
+        ddpm_inference_steps: Optional[int] = None,
+        stage_observer: Optional[Callable[[str, float], None]] = None,
         **kwargs,
     ) -> Union[torch.LongTensor, VibeVoiceGenerationOutput]:
         """
@@ -356,9 +483,18 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
             speech_tensors: Input speech for voice cloning
             speech_masks: Masks for speech tensors  
             speech_input_mask: Positions to insert speech embeddings
+            speech_embeds: Precomputed speech embeddings (see `encode_voice_prompt`), used instead of speech_tensors
             return_speech: Whether to decode and return speech outputs
             cfg_scale: CFG scale for speech generation
             stop_check_fn: Optional callable that returns True if generation should stop
+            sample_stop_fn: Optional callable returning batch indices to stop (e.g. cancelled requests); the
+                other samples keep generating and stopped samples return no speech output
+            prefix_cache: Optional store of prefilled KV caches for the shared system + voice prompt
+            prefix_cache_key: Key into `prefix_cache` identifying the prefix (e.g. voice + model); batch size 1 only
+            ddpm_inference_steps: Diffusion steps per speech token for this call (see `DIFFUSION_STEP_PRESETS`),
+                defaults to `self.ddpm_inference_steps`
+            stage_observer: Optional callable receiving `(stage, seconds)` for `prefill`, `lm_forward`,
+                `lm_negative_forward`, `diffusion`, `acoustic_decode` and `semantic_encode`
  
         Returns:
             Generated token sequences and optionally speech outputs
@@ -368,6 +504,7 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
         parsed_scripts = kwargs.pop("parsed_scripts", None)
         all_speakers_list = kwargs.pop("all_speakers_list", None)
         max_length_times = kwargs.pop("max_length_times", 2)
+        prefix_lengths = kwargs.pop("prefix_lengths", None)
 
         if kwargs.get('max_new_tokens', None) is None:
             kwargs['max_new_tokens'] = self.config.decoder_config.max_position_embeddings - kwargs['input_ids'].shape[-1]
@@ -385,11 +522,12 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
             None, None, tokenizer, return_processors=False, **negative_kwargs
         )
 
-        acoustic_cache = VibeVoiceTokenizerStreamingCache()
-        semantic_cache = VibeVoiceTokenizerStreamingCache()
-        
         batch_size = input_ids.shape[0]
+        acoustic_cache = VibeVoiceTokenizerTensorCache(batch_size)
+        semantic_cache = VibeVoiceTokenizerTensorCache(batch_size)
+        
         device = input_ids.device
+        timed = _StageTimer(stage_observer, device)
         finished_tags = torch.zeros(batch_size, dtype=torch.bool, device=device)
         correct_cnt = torch.zeros(batch_size, dtype=torch.long, device=device)
         inputs_embeds = None
@@ -401,6 +539,24 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
         initial_length = input_ids.shape[-1]
         initial_length_per_sample = model_kwargs['attention_mask'].sum(dim=-1)
 
+        # Prefix KV cache: the system prompt + voice section is identical for a given voice, so its
+        # prefill can be reused. Only valid when every speech position lies inside the prefix.
+        prefix_length = 0
+        prefix_hit = False
+        if prefix_cache is not None and prefix_cache_key is not None and prefix_lengths and batch_size == 1 and is_prefill:
+            prefix_length = int(prefix_lengths[0])
+            if not 0 < prefix_length < initial_length or (
+                speech_input_mask is not None and speech_input_mask[:, prefix_length:].any()
+            ):
+                prefix_length = 0
+        if prefix_length:
+            prefix_entry = prefix_cache.get(prefix_cache_key, input_ids[0, :prefix_length])
+            if prefix_entry is not None:
+                model_kwargs['past_key_values'] = prefix_entry.clone_past_key_values()
+                model_kwargs['cache_position'] = torch.arange(prefix_length, initial_length, device=device, dtype=torch.long)
+                prefix_hit = True
+            prefix_cache.record_prefill(initial_length - prefix_length if prefix_hit else initial_length)
+
        # Define all valid tokens that can be generated
         valid_tokens = [
             generation_config.speech_start_id,
@@ -439,6 +595,21 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
                     audio_streamer.end()
                 break
             
+            # Drop individual samples that were stopped externally
+            if sample_stop_fn is not None:
+                stopped = [i for i in sample_stop_fn() if not finished_tags[i]]
+                if stopped:
+                    stopped_indices = torch.tensor(stopped, device=device, dtype=torch.long)
+                    finished_tags[stopped_indices] = True
+                    for i in stopped:
+                        audio_chunks[i] = []
+                    if verbose:
+                        print(f"Samples {stopped} stopped externally at step {step + 1}")
+                    if audio_streamer is not None:
+                        audio_streamer.end(stopped_indices)
+                    if finished_tags.all():
+                        break
+
             # Check if audio_streamer has been ended (stopped externally)
             if audio_streamer is not None and hasattr(audio_streamer, 'finished_flags'):
                 if any(audio_streamer.finished_flags):
@@ -464,22 +635,36 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
                 progress_bar.set_description(f"Generating (active: {active_samples}/{batch_size})")
 
             model_inputs = self.prepare_inputs_for_generation(input_ids, **model_kwargs)
+            stage = "prefill" if is_prefill else "lm_forward"
             if is_prefill:
                 # we process the speech inputs only during the first generation step
-                prefill_inputs = {
-                    "speech_tensors": speech_tensors.to(device=device),
-                    "speech_masks": speech_masks.to(device),
-                    "speech_input_mask": speech_input_mask.to(device),
-                }
+                if prefix_hit:
+                    # all speech positions are already in the cached prefix
+                    prefill_inputs = {}
+                elif speech_embeds is not None:
+                    prefill_inputs = {
+                        "speech_embeds": speech_embeds.to(device),
+                        "speech_input_mask": speech_input_mask.to(device),
+                    }
+                else:
+                    prefill_inputs = {
+                        "speech_tensors": speech_tensors.to(device=device),
+                        "speech_masks": speech_masks.to(device),
+                        "speech_input_mask": speech_input_mask.to(device),
+                    }
                 is_prefill = False
             else:
                 _ = model_inputs.pop('inputs_embeds', None)
                 prefill_inputs = {'inputs_embeds': inputs_embeds}
 
             # Forward pass through the model
-            outputs = self(
-                **model_inputs, **prefill_inputs, logits_to_keep=1, return_dict=True, output_attentions=False, output_hidden_states=False,
-            )
+            with timed(stage):
+                outputs = self(
+                    **model_inputs, **prefill_inputs, logits_to_keep=1, return_dict=True, output_attentions=False, output_hidden_states=False,
+                )
+            if prefix_length and not prefix_hit:
+                prefix_cache.put(prefix_cache_key, input_ids[0, :prefix_length], outputs.past_key_values)
+                prefix_length = 0
             model_kwargs = self._update_model_kwargs_for_generation(
                 outputs, model_kwargs, is_encoder_decoder=False,
             )
@@ -507,9 +692,10 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
                     negative_model_inputs['inputs_embeds'] = inputs_embeds
                     negative_model_inputs['input_ids'] = None
 
-                negative_outputs = self(
-                    **negative_model_inputs, logits_to_keep=0, return_dict=True, output_attentions=False, output_hidden_states=False,
-                )
+                with timed("lm_negative_forward"):
+                    negative_outputs = self(
+                        **negative_model_inputs, logits_to_keep=0, return_dict=True, output_attentions=False, output_hidden_states=False,
+                    )
                 negative_model_kwargs = self._update_model_kwargs_for_generation(
                     negative_outputs, negative_model_kwargs, is_encoder_decoder=False,
                 )
@@ -548,21 +734,10 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
             # speech_begin
             diffusion_start_indices = torch.arange(batch_size, device=device)[~finished_tags & (next_tokens == generation_config.speech_start_id)]
             if diffusion_start_indices.numel() > 0 and kwargs.get('refresh_negative', True):
-                # update attention mask
-                for i, sample_idx in enumerate(diffusion_start_indices.tolist()):
-                    negative_model_kwargs['attention_mask'][sample_idx, :] = 0
-                    negative_model_kwargs['attention_mask'][sample_idx, -1] = 1
-                # update past key values
-                for layer_idx, (k_cache, v_cache) in enumerate(zip(negative_model_kwargs['past_key_values'].key_cache, 
-                                                                        negative_model_kwargs['past_key_values'].value_cache)):
-                    # Process each non-diffusion sample
-                    for sample_idx in diffusion_start_indices.tolist():
-                        # Shift cache for this sample
-                        k_cache[sample_idx, :, -1, :] = k_cache[sample_idx, :, 0, :].clone()
-                        v_cache[sample_idx, :, -1, :] = v_cache[sample_idx, :, 0, :].clone()
-                # update negative_input_ids
-                for sample_idx in diffusion_start_indices.tolist():
-                    negative_input_ids[sample_idx, -1] = generation_config.speech_start_id
+                # update attention mask, past key values and negative_input_ids
+                _reset_negative_cache_for_speech_start(
+                    negative_model_kwargs, negative_input_ids, diffusion_start_indices, generation_config.speech_start_id
+                )
             
             # Prepare inputs_embeds for next iteration
             # Initialize with default embeddings for all tokens
@@ -580,9 +755,10 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
                         negative_model_inputs['inputs_embeds'] = inputs_embeds
                         negative_model_inputs['input_ids'] = None
 
-                    negative_outputs = self(
-                        **negative_model_inputs, logits_to_keep=0, return_dict=True, output_attentions=False, output_hidden_states=False,
-                    )
+                    with timed("lm_negative_forward"):
+                        negative_outputs = self(
+                            **negative_model_inputs, logits_to_keep=0, return_dict=True, output_attentions=False, output_hidden_states=False,
+                        )
                     negative_model_kwargs = self._update_model_kwargs_for_generation(
                         negative_outputs, negative_model_kwargs, is_encoder_decoder=False,
                     )
@@ -596,51 +772,33 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
                     non_diffusion_indices = torch.arange(batch_size, device=device)[non_diffusion_mask]
                     start_indices = correct_cnt[non_diffusion_indices]
 
-                    # 1. Update attention_mask - need to handle each sample separately
-                    seq_len = negative_model_kwargs['attention_mask'].shape[1]
-                    for i, (sample_idx, start_idx) in enumerate(zip(non_diffusion_indices.tolist(), start_indices.tolist())):
-                        # Shift the attention mask for this sample
-                        if start_idx + 1 < seq_len - 1:
-                            negative_model_kwargs['attention_mask'][sample_idx, start_idx+1:] = \
-                                negative_model_kwargs['attention_mask'][sample_idx, start_idx:-1].clone()
-                        negative_model_kwargs['attention_mask'][sample_idx, start_idx] = 0
-
-                    # 2. Update past_key_values
-                    for layer_idx, (k_cache, v_cache) in enumerate(zip(negative_model_kwargs['past_key_values'].key_cache, 
-                                                                        negative_model_kwargs['past_key_values'].value_cache)):
-                        # Process each non-diffusion sample
-                        for sample_idx, start_idx in zip(non_diffusion_indices.tolist(), start_indices.tolist()):
-                            if start_idx + 1 < k_cache.shape[2] - 1:
-                                # Shift cache for this sample
-                                k_cache[sample_idx, :, start_idx+1:, :] = k_cache[sample_idx, :, start_idx:-1, :].clone()
-                                v_cache[sample_idx, :, start_idx+1:, :] = v_cache[sample_idx, :, start_idx:-1, :].clone()
-                    
-                    # 3. Update negative_input_ids
-                    for sample_idx, start_idx in zip(non_diffusion_indices.tolist(), start_indices.tolist()):
-                        if start_idx + 1 < negative_input_ids.shape[1] - 1:
-                            negative_input_ids[sample_idx, start_idx+1:] = \
-                                negative_input_ids[sample_idx, start_idx:-1].clone()
-                                
+                    # Shift attention_mask, past_key_values and negative_input_ids of these samples
+                    _drop_negative_step_for_samples(
+                        negative_model_kwargs, negative_input_ids, non_diffusion_indices, start_indices
+                    )
                     correct_cnt[non_diffusion_indices] += 1
 
                 positive_condition = outputs.last_hidden_state[diffusion_indices, -1, :]
                 negative_condition = negative_outputs.last_hidden_state[diffusion_indices, -1, :]
                 
-                speech_latent = self.sample_speech_tokens(
-                    positive_condition,
-                    negative_condition,
-                    cfg_scale=cfg_scale,
-                ).unsqueeze(1)
+                with timed("diffusion"):
+                    speech_latent = self.sample_speech_tokens(
+                        positive_condition,
+                        negative_condition,
+                        cfg_scale=cfg_scale,
+                        num_steps=ddpm_inference_steps,
+                    ).unsqueeze(1)
                                 
                 # Decode acoustic latent to audio using acoustic streaming cache
                 scaled_latent = speech_latent / self.model.speech_scaling_factor.to(speech_latent.device) - self.model.speech_bias_factor.to(speech_latent.device)
-                audio_chunk = self.model.acoustic_tokenizer.decode(
-                    scaled_latent.to(self.model.acoustic_tokenizer.device),
-                    cache=acoustic_cache,  # Use acoustic-specific cache
-                    sample_indices=diffusion_indices.to(self.model.acoustic_tokenizer.device),
-                    use_cache=True,
-                    debug=False
-                )
+                with timed("acoustic_decode"):
+                    audio_chunk = self.model.acoustic_tokenizer.decode(
+                        scaled_latent.to(self.model.acoustic_tokenizer.device),
+                        cache=acoustic_cache,  # Use acoustic-specific cache
+                        sample_indices=diffusion_indices.to(self.model.acoustic_tokenizer.device),
+                        use_cache=True,
+                        debug=False
+                    )
                 
                 # Store audio chunks for each sample
                 for i, sample_idx in enumerate(diffusion_indices):
@@ -655,13 +813,14 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
                     audio_streamer.put(audio_chunk, diffusion_indices)
                     
                 # Encode audio to semantic features using semantic streaming cache
-                semantic_features = self.model.semantic_tokenizer.encode(
-                    audio_chunk,
-                    cache=semantic_cache,  # Use semantic-specific cache
-                    sample_indices=diffusion_indices,
-                    use_cache=True,
-                    debug=False
-                ).mean # semantic tokenizer has no VAE.
+                with timed("semantic_encode"):
+                    semantic_features = self.model.semantic_tokenizer.encode(
+                        audio_chunk,
+                        cache=semantic_cache,  # Use semantic-specific cache
+                        sample_indices=diffusion_indices,
+                        use_cache=True,
+                        debug=False
+                    ).mean # semantic tokenizer has no VAE.
                 
                 # Combine acoustic and semantic features for next input
                 acoustic_embed = self.model.acoustic_connector(speech_latent)
@@ -694,9 +853,62 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
             reach_max_step_sample=reach_max_step_sample,
         )
     
+    def _get_sampler_plan(self, num_steps: int) -> Optional[DPMSolverPlan]:
+        if num_steps not in self._sampler_plans:
+            plan = DPMSolverPlan.from_scheduler(self.model.noise_scheduler, num_steps)
+            if plan is None:
+                logger.warning("Noise scheduler config not supported by the fast sampler, using the scheduler loop")
+            self._sampler_plans[num_steps] = plan
+        return self._sampler_plans[num_steps]
+
+    def _get_timestep_embeds(self, plan: DPMSolverPlan, device, dtype) -> torch.Tensor:
+        key = (plan.num_inference_steps, device, dtype)
+        if key not in self._timestep_embeds:
+            # same float cast of the timesteps as the reference loop
+            timesteps = plan.timesteps.to(device=device, dtype=dtype)
+            self._timestep_embeds[key] = self.model.prediction_head.t_embedder(timesteps)
+        return self._timestep_embeds[key]
+
+    @torch.no_grad()
+    def sample_speech_tokens(self, condition, neg_condition, cfg_scale=3.0, num_steps=None):
+        """
+        Sample one acoustic latent per condition row with classifier-free guidance.
+
+        The fast path runs the prediction head once per step on `[x; x]` against the positive and negative
+        conditions (only on `x` when `cfg_scale == 1`), with the solver coefficients and timestep embeddings
+        computed once per step count. Falls back to the scheduler loop when `use_fast_sampler` is off or the
+        scheduler configuration is not covered by `DPMSolverPlan`.
+        """
+        num_steps = num_steps or self.ddpm_inference_steps
+        plan = self._get_sampler_plan(num_steps) if self.use_fast_sampler else None
+        if plan is None:
+            return self._sample_speech_tokens_reference(condition, neg_condition, cfg_scale, num_steps)
+
+        head = self.model.prediction_head
+        batch_size = condition.shape[0]
+        use_cfg = cfg_scale != 1.0
+        if use_cfg:
+            condition = torch.cat([condition, neg_condition], dim=0)
+        condition = head.cond_proj(condition.to(head.device))
+        t_embeds = self._get_timestep_embeds(plan, condition.device, condition.dtype)
+
+        # the solver state stays in float32 like DPMSolverMultistepScheduler.step()
+        speech = torch.randn(batch_size, self.config.acoustic_vae_dim, device=condition.device, dtype=torch.float32)
+        prev_x0 = None
+        for i in range(plan.num_inference_steps):
+            x = speech.to(condition.dtype)
+            if use_cfg:
+                x = torch.cat([x, x], dim=0)
+            eps = head.forward_with_embeddings(x, condition + t_embeds[i])
+            if use_cfg:
+                cond_eps, uncond_eps = torch.split(eps, batch_size, dim=0)
+                eps = uncond_eps + cfg_scale * (cond_eps - uncond_eps)
+            speech, prev_x0 = plan.step(i, eps.to(torch.float32), speech, prev_x0)
+        return speech.to(condition.dtype)
+
     @torch.no_grad()
-    def sample_speech_tokens(self, condition, neg_condition, cfg_scale=3.0):
-        self.model.noise_scheduler.set_timesteps(self.ddpm_inference_steps)
+    def _sample_speech_tokens_reference(self, condition, neg_condition, cfg_scale=3.0, num_steps=None):
+        self.model.noise_scheduler.set_timesteps(num_steps or self.ddpm_inference_steps)
         condition = torch.cat([condition, neg_condition], dim=0).to(self.model.prediction_head.device)
         speech = torch.randn(condition.shape[0], self.config.acoustic_vae_dim).to(condition)
         for t in self.model.noise_scheduler.timesteps:
@@ -713,5 +925,6 @@ class VibeVoiceForConditionalGenerationInference(VibeVoicePreTrainedModel, Gener
 AutoModelForCausalLM.register(VibeVoiceConfig, VibeVoiceForConditionalGenerationInference)
 
 __all__ = [
+    "DIFFUSION_STEP_PRESETS",
     "VibeVoiceForConditionalGenerationInference",
 ]
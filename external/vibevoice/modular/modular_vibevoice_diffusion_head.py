@@ -268,11 +268,25 @@ class VibeVoiceDiffusionHead(PreTrainedModel):
         Returns:
             `torch.Tensor`: The predicted noise/velocity
         """
-        x = self.noisy_images_proj(noisy_images)
         t = self.t_embedder(timesteps)
         condition = self.cond_proj(condition)
-        c = condition + t
-        
+        return self.forward_with_embeddings(noisy_images, condition + t)
+
+    def forward_with_embeddings(self, noisy_images, c):
+        """
+        Forward pass with a precomputed conditioning vector.
+
+        Lets a sampler compute `cond_proj(condition)` once per token and `t_embedder(timesteps)` once per
+        schedule instead of on every diffusion step.
+
+        Args:
+            noisy_images (`torch.Tensor`): Noisy images/latents to denoise
+            c (`torch.Tensor`): `cond_proj(condition) + t_embedder(timesteps)`, broadcastable to the batch
+
+        Returns:
+            `torch.Tensor`: The predicted noise/velocity
+        """
+        x = self.noisy_images_proj(noisy_images)
         for layer in self.layers:
             x = layer(x, c)
             
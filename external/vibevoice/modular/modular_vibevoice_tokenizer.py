@@ -255,6 +255,68 @@ class VibeVoiceTokenizerStreamingCache:
                 key = (layer_id, idx)
                 self.cache.pop(key, None)
 
+class VibeVoiceTokenizerTensorCache:
+    """
+    Drop-in replacement for `VibeVoiceTokenizerStreamingCache` that keeps one preallocated
+    `[batch_size, C, context]` buffer per layer instead of one tensor per (layer, sample).
+
+    `get`/`set`/`set_to_zero` become a single `index_select`/`index_copy_`/`index_fill_` per layer.
+    Histories are right-aligned and zero-filled on the left; for the causal (transposed) convolutions
+    a zero history is equivalent to no history, so samples that have not been written yet simply see
+    zeros. (The dict cache returned `None` for the whole batch as soon as one sample was missing, which
+    also reset the history of the other samples.)
+
+    Args:
+        batch_size (`int`): Number of samples addressed by `sample_indices` (the generation batch size).
+    """
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.cache = {}  # Dict mapping layer_id to state buffer [batch_size, C, context]
+
+    def _index(self, sample_indices: torch.Tensor, buffer: torch.Tensor) -> torch.Tensor:
+        return sample_indices.to(device=buffer.device, dtype=torch.long)
+
+    def get(self, layer_id: str, sample_indices: torch.Tensor) -> Optional[torch.Tensor]:
+        """Get cached states for given layer and sample indices"""
+        buffer = self.cache.get(layer_id)
+        if buffer is None:
+            return None
+        return buffer.index_select(0, self._index(sample_indices, buffer))
+
+    def set(self, layer_id: str, sample_indices: torch.Tensor, states: torch.Tensor):
+        """Set cached states for given layer and sample indices"""
+        states = states.detach()
+        buffer = self.cache.get(layer_id)
+        if buffer is None:
+            buffer = states.new_zeros(self.batch_size, *states.shape[1:])
+            self.cache[layer_id] = buffer
+        elif states.shape[-1] > buffer.shape[-1]:
+            # history still growing towards the layer's context size (transposed conv)
+            buffer = F.pad(buffer, (states.shape[-1] - buffer.shape[-1], 0))
+            self.cache[layer_id] = buffer
+
+        if states.shape[-1] < buffer.shape[-1]:
+            states = F.pad(states, (buffer.shape[-1] - states.shape[-1], 0))
+        buffer.index_copy_(0, self._index(sample_indices, buffer), states.to(buffer.dtype))
+
+    def set_to_zero(self, sample_indices: torch.Tensor):
+        """Set all cached states to zero for given sample indices"""
+        for buffer in self.cache.values():
+            buffer.index_fill_(0, self._index(sample_indices, buffer), 0)
+
+    def clear(self, layer_id: Optional[str] = None, sample_indices: Optional[torch.Tensor] = None):
+        """Clear cache for specific layer/samples or everything"""
+        if layer_id is None and sample_indices is None:
+            self.cache.clear()
+        elif layer_id is not None and sample_indices is None:
+            self.cache.pop(layer_id, None)
+        elif layer_id is not None and sample_indices is not None:
+            buffer = self.cache.get(layer_id)
+            if buffer is not None:
+                buffer.index_fill_(0, self._index(sample_indices, buffer), 0)
+        else:
+            self.set_to_zero(sample_indices)
+
 class SConv1d(nn.Module):
     """Conv1d with built-in handling of asymmetric or causal padding and normalization."""
     def __init__(self, in_channels: int, out_channels: int,
@@ -1190,6 +1252,7 @@ AutoModel.register(VibeVoiceSemanticTokenizerConfig, VibeVoiceSemanticTokenizerM
 
 __all__ = [
     "VibeVoiceTokenizerStreamingCache",
+    "VibeVoiceTokenizerTensorCache",
     "VibeVoiceAcousticTokenizerModel",
     "VibeVoiceSemanticTokenizerModel",
 ]
\ No newline at end of file
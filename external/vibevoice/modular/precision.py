@@ -0,0 +1,149 @@
+import contextlib
+import functools
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Sequence
+
+import torch
+from torch import nn
+
+from transformers.utils import logging
+
+logger = logging.get_logger(__name__)
+
+PRECISION_MODES = ("fp32", "bf16", "int8")
+
+# Modules that run in reduced precision. `lm_head` is tied to the LM input embeddings, so it always
+# follows `model.language_model` in bf16; in int8 only the Linear layers are quantized.
+LOW_PRECISION_MODULES = (
+    "model.language_model",
+    "lm_head",
+    "model.prediction_head",
+    "model.acoustic_connector",
+    "model.semantic_connector",
+)
+# The tokenizers' conv stacks turn latents into the waveform (and back); their errors are directly audible.
+FP32_MODULES = ("model.acoustic_tokenizer", "model.semantic_tokenizer")
+
+
+@dataclass
+class PrecisionPlan:
+    """
+    Result of `apply_precision`.
+
+    Args:
+        mode (`str`): one of `PRECISION_MODES`.
+        device_type (`str`): `"cpu"` or `"cuda"`, for the autocast context.
+        modules (`Dict[str, str]`): precision each configured module ended up in (`fp32`, `bf16` or `int8`).
+    """
+    mode: str
+    device_type: str
+    modules: Dict[str, str] = field(default_factory=dict)
+
+    def autocast(self):
+        """Context for generation: bf16 autocast in `bf16` mode, a no-op otherwise."""
+        if self.mode != "bf16":
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=self.device_type, dtype=torch.bfloat16)
+
+
+def _fp32_call(fn, device_type: str):
+    """Run `fn` outside autocast with its floating point tensor arguments cast to fp32."""
+
+    def cast(value):
+        if torch.is_tensor(value) and value.is_floating_point() and value.dtype != torch.float32:
+            return value.float()
+        return value
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with torch.autocast(device_type=device_type, enabled=False):
+            return fn(*[cast(a) for a in args], **{k: cast(v) for k, v in kwargs.items()})
+
+    wrapper._fp32_wrapped = True
+    return wrapper
+
+
+def keep_fp32(module: nn.Module) -> None:
+    """Cast `module` to fp32 and make its entry points (`forward`, `encode`, `decode`) immune to autocast."""
+    module.float()
+    device_type = next(module.parameters()).device.type
+    for name in ("forward", "encode", "decode"):
+        fn = getattr(module, name, None)
+        if fn is not None and not getattr(fn, "_fp32_wrapped", False):
+            setattr(module, name, _fp32_call(fn, device_type))
+
+
+def apply_precision(
+    model: nn.Module,
+    mode: str,
+    low_precision_modules: Sequence[str] = LOW_PRECISION_MODULES,
+    fp32_modules: Iterable[str] = FP32_MODULES,
+) -> PrecisionPlan:
+    """
+    Put a VibeVoice model into a precision mode, module by module.
+
+    - `fp32`: nothing changes.
+    - `bf16`: `low_precision_modules` are cast to bfloat16 and generation runs under bf16 autocast.
+    - `int8`: the Linear layers of `low_precision_modules` are replaced by dynamically quantized int8
+      Linears (weights int8, activations quantized per call). CPU only.
+
+    Modules listed in `fp32_modules` always stay in fp32 (and are left out of `low_precision_modules`),
+    with autocast disabled inside them.
+    """
+    if mode not in PRECISION_MODES:
+        raise ValueError(f"Unknown precision '{mode}', expected one of {', '.join(PRECISION_MODES)}")
+    device_type = next(model.parameters()).device.type
+    fp32_modules = [name for name in fp32_modules if name]
+    targets = [name for name in low_precision_modules if name not in fp32_modules]
+    plan = PrecisionPlan(mode=mode, device_type=device_type)
+
+    if mode == "int8" and device_type != "cpu":
+        raise ValueError("int8 dynamic quantization only runs on CPU, use bf16 on GPU")
+
+    if mode == "bf16":
+        for name in targets:
+            model.get_submodule(name).to(torch.bfloat16)
+            plan.modules[name] = "bf16"
+    elif mode == "int8":
+        # int8 kernels take fp32 activations, so everything around them stays fp32
+        model.float()
+        qconfig = torch.ao.quantization.default_dynamic_qconfig
+        torch.ao.quantization.quantize_dynamic(
+            model,
+            qconfig_spec={name: qconfig for name in targets},
+            dtype=torch.qint8,
+            mapping={nn.Linear: torch.ao.nn.quantized.dynamic.Linear},
+            inplace=True,
+        )
+        plan.modules.update({name: "int8" for name in targets})
+
+    for name in fp32_modules:
+        if mode != "fp32":
+            keep_fp32(model.get_submodule(name))
+        plan.modules[name] = "fp32"
+    if mode == "fp32":
+        plan.modules.update({name: "fp32" for name in targets})
+
+    logger.info(f"Precision {mode}: {plan.modules}")
+    return plan
+
+
+def module_nbytes(module: nn.Module) -> int:
+    """Bytes held by the parameters and buffers of `module`, counting quantized packed weights and tied
+    tensors once."""
+    seen, total = set(), 0
+
+    def add(value):
+        nonlocal total
+        if isinstance(value, (tuple, list)):
+            for v in value:
+                add(v)
+        elif torch.is_tensor(value):
+            key = (value.untyped_storage().data_ptr(), value.storage_offset(), value.dtype)
+            if key not in seen:
+                seen.add(key)
+                total += value.numel() * value.element_size()
+
+    for value in module.state_dict(keep_vars=True).values():
+        add(value)
+    return total
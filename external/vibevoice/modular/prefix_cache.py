@@ -0,0 +1,130 @@
+import copy
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import torch
+
+from transformers.cache_utils import Cache, DynamicCache
+from transformers.utils import logging
+
+logger = logging.get_logger(__name__)
+
+
+def _cache_kv_pairs(past_key_values) -> List[Tuple[torch.Tensor, torch.Tensor]]:
+    """(key, value) tensors of every initialized layer of a `DynamicCache`, for in-place edits."""
+    if hasattr(past_key_values, "layers"):
+        pairs = [(layer.keys, layer.values) for layer in past_key_values.layers]
+    else:
+        pairs = zip(past_key_values.key_cache, past_key_values.value_cache)
+    return [(k, v) for k, v in pairs if torch.is_tensor(k) and k.numel() > 0]
+
+
+@dataclass
+class PrefixCacheEntry:
+    """
+    Language-model KV cache for a shared prompt prefix.
+
+    Args:
+        input_ids (`torch.LongTensor` of shape `(prefix_length,)`):
+            The prefix tokens the cache was computed for; used to validate hits.
+        past_key_values (`Cache`):
+            Cache cropped to `prefix_length`. Never handed out directly, see `clone_past_key_values`.
+    """
+    input_ids: torch.LongTensor
+    past_key_values: Cache
+
+    @property
+    def length(self) -> int:
+        return self.input_ids.shape[0]
+
+    def clone_past_key_values(self) -> Cache:
+        # generation appends to (and for CFG, edits) the cache, so every request gets its own copy
+        return copy.deepcopy(self.past_key_values)
+
+
+class PrefixKVCache:
+    """
+    Bounded LRU store of `PrefixCacheEntry`s, keyed by the caller (e.g. voice + model).
+
+    `VibeVoiceForConditionalGenerationInference.generate(prefix_cache=..., prefix_cache_key=...)` looks the
+    key up before prefill: on a hit only the tokens after the prefix are prefilled, on a miss the full
+    prefill runs and its cache is snapshotted here.
+
+    Args:
+        max_entries (`int`, *optional*, defaults to 4):
+            Maximum number of prefixes kept. `0` disables the cache.
+    """
+
+    def __init__(self, max_entries: int = 4):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, PrefixCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+        self.prefilled_tokens = 0
+
+    def get(self, key: str, input_ids: torch.LongTensor) -> Optional[PrefixCacheEntry]:
+        """Return the entry for `key` if it was computed for exactly `input_ids`, counting a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry.length != input_ids.shape[0]
+                or not torch.equal(entry.input_ids, input_ids.to(entry.input_ids.device))
+            ):
+                # same key but a different prompt layout (e.g. system prompt changed): treat as stale
+                logger.info(f"Prefix cache entry {key} does not match the prompt, recomputing")
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.reused_tokens += entry.length
+            return entry
+
+    def put(self, key: str, input_ids: torch.LongTensor, past_key_values: Cache) -> None:
+        """Snapshot the first `len(input_ids)` positions of `past_key_values` under `key`."""
+        if self.max_entries <= 0:
+            return
+        # only the prefix positions are copied, not the request's text after them
+        length = input_ids.shape[0]
+        snapshot = DynamicCache()
+        for layer_idx, (k, v) in enumerate(_cache_kv_pairs(past_key_values)):
+            snapshot.update(k[..., :length, :].clone(), v[..., :length, :].clone(), layer_idx)
+        entry = PrefixCacheEntry(input_ids=input_ids.detach().clone(), past_key_values=snapshot)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_prefill(self, num_tokens: int) -> None:
+        with self._lock:
+            self.prefilled_tokens += num_tokens
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reused_tokens": self.reused_tokens,
+                "prefilled_tokens": self.prefilled_tokens,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+__all__ = [
+    "PrefixCacheEntry",
+    "PrefixKVCache",
+]
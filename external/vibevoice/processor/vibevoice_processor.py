@@ -281,6 +281,8 @@ class VibeVoiceProcessor:
         # Build full token sequence
         full_tokens = system_tokens + voice_tokens
         speech_input_mask = [False] * len(system_tokens) + voice_speech_masks
+        # Everything up to here only depends on the voice samples, so its KV cache can be shared
+        prefix_length = len(full_tokens)
         
         # Add text input section
         full_tokens += self.tokenizer.encode(' Text input:\n', add_special_tokens=False)
@@ -301,6 +303,7 @@ class VibeVoiceProcessor:
             "speech_input_mask": speech_input_mask,
             "parsed_script": parsed_lines,
             "all_speakers": all_speakers,
+            "prefix_length": prefix_length,
         }
     
     def _batch_encode(
@@ -316,6 +319,7 @@ class VibeVoiceProcessor:
         # Extract input_ids and create attention_mask
         input_ids_list = [enc["input_ids"] for enc in encodings]
         speech_input_masks_list = [enc["speech_input_mask"] for enc in encodings]
+        prefix_lengths = [enc["prefix_length"] for enc in encodings]
         
         # Determine padding strategy
         if isinstance(padding, bool):
@@ -338,8 +342,9 @@ class VibeVoiceProcessor:
             padded_input_ids = []
             attention_masks = []
             padded_speech_input_masks = []
+            padded_prefix_lengths = []
             
-            for input_ids, speech_mask in zip(input_ids_list, speech_input_masks_list):
+            for input_ids, speech_mask, prefix_length in zip(input_ids_list, speech_input_masks_list, prefix_lengths):
                 # Truncate if needed
                 if truncation and len(input_ids) > max_len:
                     input_ids = input_ids[:max_len]
@@ -355,9 +360,11 @@ class VibeVoiceProcessor:
                 padded_input_ids.append(padded_ids)
                 attention_masks.append(attention_mask)
                 padded_speech_input_masks.append(padded_speech_mask)
+                padded_prefix_lengths.append(min(padding_length + prefix_length, len(padded_ids)))
                 
             input_ids_list = padded_input_ids
             speech_input_masks_list = padded_speech_input_masks
+            prefix_lengths = padded_prefix_lengths
         else:
             # No padding, just create attention masks
             attention_masks = [[1] * len(ids) for ids in input_ids_list] if return_attention_mask else None
@@ -400,6 +407,7 @@ class VibeVoiceProcessor:
         # Add metadata
         batch_encoding["parsed_scripts"] = [enc["parsed_script"] for enc in encodings]
         batch_encoding["all_speakers_list"] = [enc["all_speakers"] for enc in encodings]
+        batch_encoding["prefix_lengths"] = prefix_lengths
         
         return batch_encoding
 
@@ -423,6 +431,7 @@ class VibeVoiceProcessor:
             prefix_tokens = self.tokenizer.encode(f" Speaker {speaker_id}:", add_special_tokens=False)
             
             # Process audio
+            already_normalized = False
             if isinstance(speaker_audio, str):
                 # Load audio from file
                 wav = self.audio_processor._load_audio_from_path(speaker_audio)
@@ -434,11 +443,13 @@ class VibeVoiceProcessor:
                     wav = np.array(speaker_audio['audio'], dtype=np.float32)
                 else:
                     raise ValueError(f"Dictionary audio input must have 'array' or 'audio' key, got: {speaker_audio.keys()}")
+                # e.g. waveforms taken from a voice-prompt cache, which were normalized when first loaded
+                already_normalized = bool(speaker_audio.get('normalized', False))
             else:
                 wav = np.array(speaker_audio, dtype=np.float32)
             
             # Apply normalization if needed
-            if self.db_normalize and self.audio_normalizer:
+            if self.db_normalize and self.audio_normalizer and not already_normalized:
                 wav = self.audio_normalizer(wav)
             
             # Calculate token length based on compression ratio
@@ -0,0 +1,137 @@
+import copy
+from dataclasses import dataclass
+from typing import List, Optional
+
+import torch
+
+from .dpm_solver import DPMSolverMultistepScheduler
+
+
+@dataclass
+class DPMSolverPlan:
+    """
+    The deterministic `DPMSolverMultistepScheduler` (dpmsolver++, order <= 2) unrolled for a fixed step count.
+
+    For a fixed number of inference steps every scheduler update is a linear combination with constant
+    coefficients, so they can be computed once instead of on every `step()` call:
+
+        x0_i     = x0_sample_coefs[i] * x_i + x0_output_coefs[i] * model_output_i
+        x_{i+1}  = sample_coefs[i] * x_i + x0_coefs[i] * x0_i + prev_x0_coefs[i] * x0_{i-1}
+
+    Args:
+        timesteps (`torch.LongTensor` of shape `(num_inference_steps,)`):
+            The discrete timesteps the diffusion model is evaluated at, in order.
+        x0_sample_coefs, x0_output_coefs (`List[float]`):
+            Conversion of the model output to the data prediction (depends on `prediction_type`).
+        sample_coefs, x0_coefs, prev_x0_coefs (`List[float]`):
+            Solver update; `prev_x0_coefs[i]` is 0 for first-order steps.
+    """
+    timesteps: torch.LongTensor
+    x0_sample_coefs: List[float]
+    x0_output_coefs: List[float]
+    sample_coefs: List[float]
+    x0_coefs: List[float]
+    prev_x0_coefs: List[float]
+
+    @property
+    def num_inference_steps(self) -> int:
+        return len(self.x0_sample_coefs)
+
+    @staticmethod
+    def is_supported(scheduler: DPMSolverMultistepScheduler) -> bool:
+        config = scheduler.config
+        return (
+            config.algorithm_type == "dpmsolver++"
+            and config.solver_order <= 2
+            and config.solver_type in ("midpoint", "heun")
+            and config.prediction_type in ("epsilon", "v_prediction", "sample")
+            and not config.thresholding
+            and config.variance_type not in ("learned", "learned_range")
+        )
+
+    @classmethod
+    def from_scheduler(
+        cls, scheduler: DPMSolverMultistepScheduler, num_inference_steps: int
+    ) -> Optional["DPMSolverPlan"]:
+        """Unroll `scheduler` for `num_inference_steps`; returns `None` for configurations the plan cannot express."""
+        if not cls.is_supported(scheduler):
+            return None
+
+        # work on a copy, the model's scheduler may be in use by the reference sampler
+        scheduler = copy.deepcopy(scheduler)
+        scheduler.set_timesteps(num_inference_steps)
+        config = scheduler.config
+        num_steps = len(scheduler.timesteps)
+
+        sigmas = scheduler.sigmas.to(torch.float64)
+        alphas, sigma_ts = scheduler._sigma_to_alpha_sigma_t(sigmas)
+        # lambda is +inf for a final sigma of zero, which the first-order update handles (exp(-inf) = 0)
+        lambdas = torch.log(alphas) - torch.log(sigma_ts)
+
+        plan = cls(
+            timesteps=scheduler.timesteps.clone(),
+            x0_sample_coefs=[],
+            x0_output_coefs=[],
+            sample_coefs=[],
+            x0_coefs=[],
+            prev_x0_coefs=[],
+        )
+        for i in range(num_steps):
+            alpha_s, sigma_s = alphas[i].item(), sigma_ts[i].item()
+            if config.prediction_type == "epsilon":
+                plan.x0_sample_coefs.append(1.0 / alpha_s)
+                plan.x0_output_coefs.append(-sigma_s / alpha_s)
+            elif config.prediction_type == "v_prediction":
+                plan.x0_sample_coefs.append(alpha_s)
+                plan.x0_output_coefs.append(-sigma_s)
+            else:
+                plan.x0_sample_coefs.append(0.0)
+                plan.x0_output_coefs.append(1.0)
+
+            # same order selection as DPMSolverMultistepScheduler.step()
+            lower_order_final = (i == num_steps - 1) and (
+                config.euler_at_final
+                or (config.lower_order_final and num_steps < 15)
+                or config.final_sigmas_type == "zero"
+            )
+            first_order = config.solver_order == 1 or i == 0 or lower_order_final
+
+            alpha_t, sigma_t = alphas[i + 1], sigma_ts[i + 1]
+            h = lambdas[i + 1] - lambdas[i]
+            sample_coef = (sigma_t / sigma_ts[i]).item()
+            x0_coef = (-alpha_t * (torch.exp(-h) - 1.0)).item()
+            if first_order:
+                plan.sample_coefs.append(sample_coef)
+                plan.x0_coefs.append(x0_coef)
+                plan.prev_x0_coefs.append(0.0)
+                continue
+
+            # D0 = x0_i, D1 = (x0_i - x0_{i-1}) / r0
+            r0 = ((lambdas[i] - lambdas[i - 1]) / h).item()
+            if config.solver_type == "midpoint":
+                d1_coef = 0.5 * x0_coef
+            else:
+                d1_coef = (alpha_t * ((torch.exp(-h) - 1.0) / h + 1.0)).item()
+            plan.sample_coefs.append(sample_coef)
+            plan.x0_coefs.append(x0_coef + d1_coef / r0)
+            plan.prev_x0_coefs.append(-d1_coef / r0)
+        return plan
+
+    def step(
+        self,
+        step_index: int,
+        model_output: torch.Tensor,
+        sample: torch.Tensor,
+        prev_x0: Optional[torch.Tensor],
+    ):
+        """One solver update. Returns `(prev_sample, x0_pred)`; pass `x0_pred` as `prev_x0` to the next step."""
+        x0_pred = self.x0_sample_coefs[step_index] * sample + self.x0_output_coefs[step_index] * model_output
+        prev_sample = self.sample_coefs[step_index] * sample + self.x0_coefs[step_index] * x0_pred
+        if self.prev_x0_coefs[step_index] != 0.0:
+            prev_sample = prev_sample + self.prev_x0_coefs[step_index] * prev_x0
+        return prev_sample, x0_pred
+
+
+__all__ = [
+    "DPMSolverPlan",
+]
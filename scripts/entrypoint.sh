@@ -25,7 +25,8 @@ bash scripts/start_stt.sh &
 echo ">>> Starting TTS service..."
 bash scripts/start_tts.sh &
 
-# Give them a moment to start
+# Give them a moment to bind their ports; their models keep loading in the background
+# while vLLM starts (poll GET /ready on ports 6000 and 5000 before routing traffic)
 sleep 2
 
 # Start LLM in foreground
@@ -0,0 +1 @@
+"""Shared serving utilities for the tts/stt services."""
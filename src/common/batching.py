@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence
+
+from src.common import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collects concurrent requests into batches and runs them on a single worker thread.
+
+    The first request opens a window of `window_ms`; everything that arrives before it closes (up to
+    `max_batch_size` items) is handed to `process_batch` in one call. `process_batch` must return one
+    result per item, in order; a result that is an exception instance fails only that item's future.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 4,
+        window_ms: float = 20.0,
+        name: str = "batcher",
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.name = name
+
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        if self._closed:
+            raise RuntimeError(f"{self.name} is closed")
+        fut: Future = Future()
+        self._queue.put((item, fut, time.monotonic()))
+        return fut
+
+    async def run(self, item: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(item))
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _collect(self, first: tuple) -> List[tuple]:
+        batch = [first]
+        deadline = time.monotonic() + self.window_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is None:
+                # close() sentinel: finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(nxt)
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            # drop requests whose caller already gave up
+            batch = [(item, fut, submitted) for item, fut, submitted in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.monotonic()
+            for _, _, submitted in batch:
+                metrics.observe_stage("queue_wait", started - submitted)
+
+            items = [item for item, _, _ in batch]
+            logger.debug(f"[{self.name}] running batch of {len(items)}")
+            try:
+                results = list(self.process_batch(items))
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: expected {len(items)} results, got {len(results)}")
+            except Exception as e:
+                logger.exception(f"[{self.name}] batch failed")
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                continue
+
+            for (_, fut, _), result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
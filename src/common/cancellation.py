@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import threading
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCancelled(Exception):
+    """The client went away or cancelled the request, its result is no longer wanted."""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag of one request, polled by the inference code between steps."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], Any]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception(f"[Cancel] callback for request {self.request_id} failed")
+
+    def add_callback(self, callback: Callable[[], Any]) -> None:
+        """Call `callback` on cancellation (right away if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise RequestCancelled(f"request {self.request_id} was cancelled")
+
+
+def is_cancelled(token: Optional[CancelToken]) -> bool:
+    return token is not None and token.cancelled
+
+
+class CancellationRegistry:
+    """Tokens of the requests in flight, by request id.
+
+    `run` awaits a request's work while watching for the client to disconnect; `cancel` lets another
+    connection (e.g. a voice agent on barge-in) cancel a request by id. Either way the token is set,
+    so running inference stops at its next check, and the awaiting handler gets `RequestCancelled`.
+    """
+
+    def __init__(self, poll_interval_s: float = 0.1):
+        self.poll_interval_s = poll_interval_s
+        self._tokens: Dict[str, CancelToken] = {}
+        self._lock = threading.Lock()
+        self.cancelled = 0
+        self.disconnected = 0
+
+    def register(self, request_id: Optional[str] = None) -> CancelToken:
+        """New token for `request_id` (generated if empty); raises ValueError if the id is in flight."""
+        request_id = request_id or uuid.uuid4().hex
+        with self._lock:
+            if request_id in self._tokens:
+                raise ValueError(f"request id {request_id} is already in flight")
+            token = self._tokens[request_id] = CancelToken(request_id)
+        return token
+
+    def release(self, token: CancelToken) -> None:
+        with self._lock:
+            if self._tokens.get(token.request_id) is token:
+                del self._tokens[token.request_id]
+            if token.cancelled:
+                self.cancelled += 1
+
+    def cancel(self, request_id: str) -> bool:
+        """Cancel an in-flight request; False if no such request is running."""
+        with self._lock:
+            token = self._tokens.get(request_id)
+        if token is None:
+            return False
+        token.cancel()
+        return True
+
+    async def run(self, request, token: CancelToken, awaitable: Awaitable[Any]) -> Any:
+        """Await `awaitable` unless `request`'s client disconnects or `token` is cancelled first.
+
+        In that case the work is cancelled (a queued job never starts; running inference sees the
+        token) and `RequestCancelled` is raised without waiting for the worker to wind down.
+        """
+        task = asyncio.ensure_future(awaitable)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.poll_interval_s)
+                if done:
+                    return task.result()
+                if token.cancelled:
+                    break
+                if await request.is_disconnected():
+                    with self._lock:
+                        self.disconnected += 1
+                    logger.info(f"[Cancel] client of request {token.request_id} disconnected")
+                    break
+        except asyncio.CancelledError:
+            token.cancel()
+            task.cancel()
+            raise
+
+        token.cancel()
+        task.cancel()
+        # the work may still finish or fail on its own; nobody is interested in the outcome anymore
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        raise RequestCancelled(f"request {token.request_id} was cancelled")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._tokens),
+                "cancelled": self.cancelled,
+                "disconnected": self.disconnected,
+            }
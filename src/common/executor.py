@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict
+
+from src.common import metrics
+from src.common.cancellation import RequestCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised on submit when `max_concurrency` jobs are running and `max_queue` more are waiting."""
+
+
+class InferenceExecutor:
+    """Runs blocking inference calls on worker threads so the event loop stays responsive.
+
+    At most `max_concurrency` calls run at once; up to `max_queue` more wait for a free worker.
+    Anything beyond that is rejected with `ExecutorBusyError` instead of piling up, which the
+    services map to HTTP 503. Queue-wait and run times are tracked for `/stats`, as is the time
+    spent on jobs that were cancelled (`RequestCancelled`, or cancelled while still queued).
+    """
+
+    def __init__(self, max_concurrency: int = 1, max_queue: int = 16, name: str = "inference"):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.name = name
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._cancelled_queued = 0
+        self._cancelled_run_s = 0.0
+        self._queue_wait_s = 0.0
+        self._max_queue_wait_s = 0.0
+        self._run_s = 0.0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._queued + self._running >= self.max_concurrency + self.max_queue:
+                self._rejected += 1
+                raise ExecutorBusyError(
+                    f"{self.name}: {self._running} running and {self._queued} queued, try again later"
+                )
+            self._queued += 1
+
+    def _start(self, submitted: float) -> float:
+        started = time.monotonic()
+        wait = started - submitted
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._queue_wait_s += wait
+            self._max_queue_wait_s = max(self._max_queue_wait_s, wait)
+        return started
+
+    def _finish(self, started: float, outcome: str) -> None:
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._running -= 1
+            self._run_s += elapsed
+            if outcome == "ok":
+                self._completed += 1
+            elif outcome == "cancelled":
+                self._cancelled += 1
+                self._cancelled_run_s += elapsed
+            else:
+                self._failed += 1
+
+    def _call(self, submitted: float, fn: Callable[..., Any], args, kwargs) -> Any:
+        started = self._start(submitted)
+        metrics.observe_stage("queue_wait", started - submitted)
+        outcome = "failed"
+        try:
+            result = fn(*args, **kwargs)
+            outcome = "ok"
+            return result
+        except RequestCancelled:
+            outcome = "cancelled"
+            raise
+        finally:
+            self._finish(started, outcome)
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue `fn(*args, **kwargs)` on a worker thread; raises `ExecutorBusyError` when full."""
+        self._admit()
+        try:
+            fut = self._pool.submit(self._call, time.monotonic(), fn, args, kwargs)
+        except Exception:
+            self._dequeue()
+            raise
+        # a job cancelled while waiting (e.g. the client went away) never reaches _call
+        fut.add_done_callback(lambda f: self._dequeue(cancelled=True) if f.cancelled() else None)
+        return fut
+
+    def _dequeue(self, cancelled: bool = False) -> None:
+        with self._lock:
+            self._queued -= 1
+            if cancelled:
+                self._cancelled_queued += 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def run_async(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Apply the same admission limit and metrics to a coroutine that schedules its own work
+        (e.g. `MicroBatcher.run`), without occupying a worker thread."""
+        self._admit()
+        started = self._start(time.monotonic())
+        outcome = "failed"
+        try:
+            result = await fn(*args, **kwargs)
+            outcome = "ok"
+            return result
+        except (RequestCancelled, asyncio.CancelledError):
+            outcome = "cancelled"
+            raise
+        finally:
+            self._finish(started, outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._completed + self._failed + self._cancelled
+            started = finished + self._running
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "cancelled": self._cancelled + self._cancelled_queued,
+                "cancelled_work_s": round(self._cancelled_run_s, 3),
+                "avg_queue_wait_ms": round(1000 * self._queue_wait_s / started, 3) if started else 0.0,
+                "max_queue_wait_ms": round(1000 * self._max_queue_wait_s, 3),
+                "avg_run_ms": round(1000 * self._run_s / finished, 3) if finished else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
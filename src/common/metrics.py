@@ -0,0 +1,237 @@
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# seconds; covers a single LM step (~ms) up to a long generation
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# processing time / audio duration; < 1 is faster than real time
+RTF_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NO_TIMING = nullcontext()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self, const_labels: List[Tuple[str, str]]) -> List[str]:
+        raise NotImplementedError
+
+    def render(self, const_labels: List[Tuple[str, str]]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return lines + self._samples(const_labels)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self, const_labels):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(const_labels + list(zip(self.labelnames, key)))} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # per label set: [bucket counts (not cumulative)..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self, **labels: str) -> Dict[str, float]:
+        """`count` and `sum` of one label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+        return {"count": state[-1], "sum": state[-2]} if state else {"count": 0, "sum": 0.0}
+
+    def _samples(self, const_labels):
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in values:
+            labels = const_labels + list(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                bucket_labels = _format_labels(labels + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(state[-1])}")
+        return lines
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+
+class MetricsRegistry:
+    """Metrics of one service process, rendered in the Prometheus text exposition format.
+
+    `const_labels` (e.g. service and backend) are added to every sample. While `enabled` is False the
+    module-level hooks return before touching any metric, so instrumented code costs a flag check.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.const_labels: Dict[str, str] = {}
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        const_labels = sorted(self.const_labels.items())
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render(const_labels))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "inference_stage_seconds",
+    "Time spent per request processing stage (queue wait, decode, prefill, LM step, diffusion, ...)",
+    ("stage",),
+)
+REAL_TIME_FACTOR = REGISTRY.histogram(
+    "inference_real_time_factor",
+    "Processing time of a request divided by the duration of its input or output audio",
+    buckets=RTF_BUCKETS,
+)
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "inference_tokens_per_second",
+    "Tokens generated per second of a generate call",
+    buckets=TOKENS_PER_SECOND_BUCKETS,
+)
+GENERATED_TOKENS = REGISTRY.counter("inference_generated_tokens_total", "Tokens generated by the backend")
+GENERATION_SECONDS = REGISTRY.counter("inference_generation_seconds_total", "Time spent in generate calls")
+
+
+def configure(enabled: bool = True, **const_labels: str) -> None:
+    """Enable or disable metrics for this process and set the labels added to every sample."""
+    REGISTRY.enabled = enabled
+    REGISTRY.const_labels = {k: str(v) for k, v in const_labels.items()}
+
+
+def enabled() -> bool:
+    return REGISTRY.enabled
+
+
+def stage(name: str):
+    """Context manager timing one stage into `inference_stage_seconds`; a shared no-op when disabled."""
+    if not REGISTRY.enabled:
+        return _NO_TIMING
+    return _StageTimer(name)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    if REGISTRY.enabled:
+        STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def stage_observer() -> Optional[Callable[[str, float], None]]:
+    """`observe_stage` for code that takes an optional `(stage, seconds)` callback, None when disabled."""
+    return observe_stage if REGISTRY.enabled else None
+
+
+def observe_rtf(processing_s: float, audio_s: float) -> None:
+    if REGISTRY.enabled and audio_s > 0:
+        REAL_TIME_FACTOR.observe(processing_s / audio_s)
+
+
+def observe_tokens(tokens: int, seconds: float) -> None:
+    if REGISTRY.enabled and tokens > 0 and seconds > 0:
+        GENERATED_TOKENS.inc(tokens)
+        GENERATION_SECONDS.inc(seconds)
+        TOKENS_PER_SECOND.observe(tokens / seconds)
+
+
+def render() -> str:
+    return REGISTRY.render()
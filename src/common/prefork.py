@@ -0,0 +1,407 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from multiprocessing.sharedctypes import RawArray, RawValue
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+LOADING, READY, FAILED = 0, 1, 2
+_STATE_NAMES = {LOADING: "loading", READY: "ready", FAILED: "failed"}
+
+# marks a request forwarded between workers, so it is not forwarded again
+PEER_HEADER = "X-Prefork-Peer"
+
+# set in a forked worker: index, number of workers and the sockets of its peers
+_WORKER: Optional[Dict[str, Any]] = None
+
+
+def effective_workers(workers: int, name: str) -> int:
+    """`workers`, or 1 on a CUDA host: a CUDA context does not survive fork, so pre-forking is CPU only."""
+    if workers <= 1:
+        return 1
+    import torch
+
+    if torch.cuda.is_available():
+        logger.warning(f"[{name}] {workers} workers requested, but CUDA does not survive fork; serving with one")
+        return 1
+    return workers
+
+
+def plan_threads(workers: int, threads: int = 0, cores: Optional[Sequence[int]] = None):
+    """Threads per worker (0 = the available cores split evenly) and each worker's cores.
+
+    Workers get disjoint core sets when there are enough cores for all of them, else no affinity (None).
+    """
+    cores = sorted(os.sched_getaffinity(0) if cores is None else cores)
+    threads = threads if threads > 0 else max(1, len(cores) // workers)
+    if workers * threads > len(cores):
+        return threads, [None] * workers
+    return threads, [cores[i * threads : (i + 1) * threads] for i in range(workers)]
+
+
+def pin_worker(threads: int, cores: Optional[Sequence[int]] = None) -> None:
+    """Limit this process to `threads` intra-op threads (and to `cores` if given)."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    if cores is not None:
+        os.sched_setaffinity(0, cores)
+    import torch
+
+    torch.set_num_threads(threads)
+
+
+def single_threaded_master() -> None:
+    """Keep this (master) process's intra-op pool at one thread; call before loading or warmup runs a torch op.
+
+    An OpenMP pool that has run with several threads does not survive fork: a worker that then sets its
+    own thread count (`pin_worker`) hangs in its first parallel op. A pool that never grew past one
+    thread is safe, so the master loads and warms up single-threaded and each worker gets its threads.
+    """
+    import torch
+
+    torch.set_num_threads(1)
+
+
+def memory_usage() -> Dict[str, float]:
+    """RSS, PSS and shared MiB of this process; PSS well below RSS means pages are shared with other workers."""
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty"):
+                    usage[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(usage.get("Rss", 0.0), 1),
+        "pss_mb": round(usage.get("Pss", 0.0), 1),
+        "shared_mb": round(usage.get("Shared_Clean", 0.0) + usage.get("Shared_Dirty", 0.0), 1),
+    }
+
+
+def worker_info() -> Optional[Dict[str, Any]]:
+    """Index, pid and memory of this worker for /stats; None when the service runs as a single process."""
+    if _WORKER is None:
+        return None
+    return {"index": _WORKER["index"], "workers": _WORKER["workers"], "pid": os.getpid(), "memory": memory_usage()}
+
+
+async def _request(path: str, method: str, target: str) -> int:
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        writer.write(
+            f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n{PEER_HEADER}: 1\r\n"
+            "Content-Length: 0\r\nConnection: close\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def forward_to_peers(method: str, target: str, headers) -> bool:
+    """Send `method target` to the other workers (e.g. a cancel for a request another worker runs).
+
+    True if one of them answered 2xx; False when not pre-forked or the request was forwarded already.
+    """
+    if _WORKER is None or headers.get(PEER_HEADER):
+        return False
+    results = await asyncio.gather(
+        *(_request(path, method, target) for path in _WORKER["peers"]), return_exceptions=True
+    )
+    return any(isinstance(status, int) and 200 <= status < 300 for status in results)
+
+
+class InflightCounter:
+    """ASGI middleware counting the HTTP requests and WebSocket sessions a worker is serving.
+
+    The counters live in shared memory, so the balancer sees every worker's load without asking it.
+    """
+
+    def __init__(self, app, counters, index: int):
+        self.app = app
+        self.counters = counters
+        self.index = index
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        # only this worker's event loop writes its slot
+        self.counters[self.index] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.counters[self.index] -= 1
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            data = await reader.read(1 << 16)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        # pass the half-close on: a worker sees a client that went away as a disconnect
+        try:
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (OSError, RuntimeError):
+            pass
+
+
+class Balancer:
+    """Accepts the service's connections and proxies each one to the least-loaded worker.
+
+    Load is the number of in-flight requests a worker reports (`InflightCounter`), then the open
+    connections the balancer has to it. A connection sticks to its worker, so keep-alive clients are
+    balanced per connection, not per request. Proxying is plain TCP, so streaming responses and
+    WebSockets pass through unchanged. While the model loads (or if loading failed) the balancer
+    answers itself: /health with the state, everything else 503 with Retry-After, like a single process.
+    """
+
+    def __init__(self, name: str, listener: socket.socket, paths: Sequence[str], inflight, state):
+        self.name = name
+        self.listener = listener
+        self.paths = list(paths)
+        self.inflight = inflight
+        self.state = state
+        self.connections = [0] * len(self.paths)
+        self._next = 0
+
+    def order(self) -> List[int]:
+        """Workers from least to most loaded; ties rotate so idle workers take turns."""
+        n = len(self.paths)
+        start, self._next = self._next, (self._next + 1) % n
+        return sorted(range(n), key=lambda i: (self.inflight[i], self.connections[i], (i - start) % n))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            if self.state.value == READY:
+                for index in self.order():
+                    try:
+                        up_reader, up_writer = await asyncio.open_unix_connection(self.paths[index])
+                    except OSError:
+                        continue
+                    self.connections[index] += 1
+                    try:
+                        await asyncio.gather(_pipe(reader, up_writer), _pipe(up_reader, writer))
+                    finally:
+                        self.connections[index] -= 1
+                        up_writer.close()
+                    return
+            await self._unavailable(reader, writer)
+        except Exception:
+            logger.exception(f"[{self.name}] balancer connection error")
+        finally:
+            writer.close()
+
+    async def _unavailable(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            return
+        parts = head.split(b" ", 2)
+        path = parts[1].split(b"?")[0].decode("latin-1") if len(parts) > 1 else "/"
+        state = _STATE_NAMES[self.state.value] if self.state.value != READY else "starting workers"
+        service = self.name.lower()
+        if path == "/health":
+            status = 503 if self.state.value == FAILED else 200
+            body = {"status": "failed" if status == 503 else "healthy", "service": service, "state": state}
+        elif path == "/ready":
+            status, body = 503, {"service": service, "state": state, "ready": False}
+        else:
+            status, body = 503, {"detail": f"{self.name} backend is {state}"}
+        payload = json.dumps(body).encode("utf-8")
+        reason = "OK" if status == 200 else "Service Unavailable"
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\nRetry-After: 5\r\nConnection: close\r\n\r\n"
+            ).encode("latin-1")
+            + payload
+        )
+        await writer.drain()
+
+    def run(self) -> None:
+        async def serve():
+            server = await asyncio.start_server(self.handle, sock=self.listener, backlog=2048)
+            loop = asyncio.get_running_loop()
+            stop = loop.create_future()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(sig, lambda: stop.done() or stop.set_result(None))
+            async with server:
+                await stop
+
+        asyncio.run(serve())
+
+
+def _serve_uvicorn(app, sock: socket.socket, log_level: str = "info") -> None:
+    import uvicorn
+
+    uvicorn.run(app, fd=sock.fileno(), log_level=log_level)
+
+
+class PreforkServer:
+    """Serves `app` from `workers` processes forked after the model is loaded once.
+
+    The master loads the backend (`startup`), then forks the workers, which share the weights'
+    memory pages copy-on-write (memory-mapped prepared snapshots are shared through the page cache
+    as well). Each worker serves on its own unix socket with `threads` intra-op threads, pinned to
+    its own cores when there are enough; the balancer process listens on `host:port` and sends each
+    connection to the least-loaded worker (see `Balancer`). `after_fork()` runs in every worker
+    first: threads (batchers, executors) are not inherited by fork and must be started again.
+    The master must not have used more than one intra-op thread before (see `single_threaded_master`).
+    A worker that dies is forked again from the master.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        app,
+        startup,
+        workers: int,
+        host: str,
+        port: int,
+        threads: int = 0,
+        after_fork: Optional[Callable[[], None]] = None,
+        serve: Optional[Callable[[Any, socket.socket], None]] = None,
+        log_level: str = "info",
+    ):
+        self.name = name
+        self.app = app
+        self.startup = startup
+        self.workers = max(1, workers)
+        self.host = host
+        self.port = port
+        self.threads, self.cores = plan_threads(self.workers, threads)
+        self.after_fork = after_fork
+        self.serve = serve or (lambda app, sock: _serve_uvicorn(app, sock, log_level))
+
+        self.state = RawValue("i", LOADING)
+        self.inflight = RawArray("l", self.workers)
+        self.socket_dir = tempfile.mkdtemp(prefix=f"{name.lower()}-workers-")
+        self.paths = [os.path.join(self.socket_dir, f"worker-{i}.sock") for i in range(self.workers)]
+        self._sockets: List[socket.socket] = []
+        self._children: Dict[int, Optional[int]] = {}
+        self._stopping = False
+
+    def _fork(self, target: Callable[..., None], *args) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                for sig in (signal.SIGTERM, signal.SIGINT):
+                    signal.signal(sig, signal.SIG_DFL)
+                target(*args)
+            except BaseException:
+                logger.exception(f"[{self.name}] pid {os.getpid()} failed")
+                code = 1
+            finally:
+                os._exit(code)
+        return pid
+
+    def _run_worker(self, index: int) -> None:
+        global _WORKER
+        for i, sock in enumerate(self._sockets):
+            if i != index:
+                sock.close()
+        _WORKER = {
+            "index": index,
+            "workers": self.workers,
+            "peers": [path for i, path in enumerate(self.paths) if i != index],
+        }
+        pin_worker(self.threads, self.cores[index])
+        if self.after_fork is not None:
+            self.after_fork()
+        logger.info(f"[{self.name}] worker {index} pid={os.getpid()} threads={self.threads} cores={self.cores[index]}")
+        self.serve(InflightCounter(self.app, self.inflight, index), self._sockets[index])
+
+    def _spawn_worker(self, index: int) -> None:
+        self.inflight[index] = 0
+        self._children[self._fork(self._run_worker, index)] = index
+
+    def _stop(self, *_):
+        self._stopping = True
+        raise SystemExit(0)
+
+    def run(self) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._stop)
+        listener = socket.create_server((self.host, self.port), backlog=2048)
+        balancer = Balancer(self.name, listener, self.paths, self.inflight, self.state)
+        balancer_pid = self._fork(balancer.run)
+        self._children[balancer_pid] = None
+        listener.close()
+        logger.info(f"[{self.name}] balancer pid={balancer_pid} listening on {self.host}:{self.port}")
+
+        try:
+            if not self.startup.wait():
+                self.state.value = FAILED
+            else:
+                # bound before forking, so connections queue until a (re)started worker accepts them
+                for path in self.paths:
+                    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    sock.bind(path)
+                    sock.listen(2048)
+                    self._sockets.append(sock)
+                for index in range(self.workers):
+                    self._spawn_worker(index)
+                self.state.value = READY
+                logger.info(f"[{self.name}] {self.workers} workers with {self.threads} threads each")
+            self._supervise(balancer_pid)
+        finally:
+            self._shutdown()
+
+    def _supervise(self, balancer_pid: int) -> None:
+        while True:
+            pid, status = os.wait()
+            if pid == balancer_pid:
+                logger.error(f"[{self.name}] balancer exited ({status}), shutting down")
+                return
+            index = self._children.pop(pid, None)
+            if index is not None and not self._stopping:
+                logger.warning(f"[{self.name}] worker {index} (pid {pid}) exited ({status}), forking it again")
+                time.sleep(1)
+                self._spawn_worker(index)
+
+    def _shutdown(self, timeout_s: float = 30.0) -> None:
+        self._stopping = True
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_IGN)
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._children.pop(pid)
+        deadline = time.monotonic() + timeout_s
+        while self._children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self._children.pop(pid, None)
+            else:
+                time.sleep(0.05)
+        for pid in self._children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        for sock in self._sockets:
+            sock.close()
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# bump when the on-disk layout changes; part of every key, so old snapshots are simply not found
+FORMAT_VERSION = 1
+INDEX_FILE = "prepared.json"
+
+_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def _fingerprint(path: str) -> str:
+    """Names, sizes and mtimes of the files under `path` (cheap; weights are not read)."""
+    entries = []
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            entries.append(f"{os.path.relpath(os.path.join(root, name), path)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha256("\n".join(sorted(entries)).encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_revision(model_path: str) -> str:
+    """Revision of a downloaded model: the commit hash of an HF cache snapshot, else a fingerprint of the dir."""
+    path = os.path.realpath(model_path)
+    if os.path.basename(os.path.dirname(path)) == "snapshots":
+        return os.path.basename(path)
+    return _fingerprint(path)
+
+
+def lora_digest(paths: Sequence[str]) -> str:
+    """Identity of an ordered set of adapter directories (paths and file fingerprints)."""
+    parts = [f"{os.path.abspath(p)}@{_fingerprint(p)}" for p in paths]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def prepared_snapshot_key(model_id: str, revision: str, dtype: Any, lora: Sequence[str] = ()) -> str:
+    """Key of a prepared snapshot: model id, revision, dtype and the LoRA adapters merged into it (in order)."""
+    parts = [str(FORMAT_VERSION), model_id, revision, str(dtype), lora_digest(lora) if lora else ""]
+    digest = hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:20]
+    name = model_id.rstrip("/").replace("/", "__").replace(os.sep, "__")[-60:]
+    return f"{name}-{digest}"
+
+
+def mmap_safetensors(path: str) -> Dict[str, torch.Tensor]:
+    """Tensors of a safetensors file as views of a private (copy-on-write) memory map of it.
+
+    Nothing is read until a tensor is touched, and processes mapping the same file share its pages
+    through the page cache until one of them writes to a tensor.
+    """
+    with open(path, "rb") as f:
+        header_len = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_len))
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    base = 8 + header_len
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = _DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        count = (end - start) // torch.empty((), dtype=dtype).element_size()
+        if count == 0:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensors[name] = torch.frombuffer(buffer, dtype=dtype, count=count, offset=base + start).view(info["shape"])
+    return tensors
+
+
+class PreparedSnapshotCache:
+    """Models stored as loaded and converted (dtype, merged adapters), for near zero-copy loading.
+
+    A snapshot is a directory `<root>/<key>/` with the state dict as safetensors shards in the
+    stored dtypes, `prepared.json` (shards, tied weight aliases, metadata) and whatever config and
+    processor files the backend saves next to it. `load_state_dict` memory-maps the shards, so on CPU
+    the weights are used in place; on GPU each tensor is copied once, straight from the page cache.
+    Snapshots are written to a temporary directory and renamed, so a crash never leaves a partial one.
+    """
+
+    def __init__(self, root: str, max_shard_bytes: int = 2 << 30):
+        self.root = root
+        self.max_shard_bytes = max_shard_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.path(key), INDEX_FILE))
+
+    def save(
+        self,
+        key: str,
+        model: torch.nn.Module,
+        save_files: Optional[Callable[[str], None]] = None,
+        copy_files: Iterable[str] = (),
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Write `model`'s state dict (and config) as snapshot `key`.
+
+        `save_files(dir)` may write processor files into the snapshot; `copy_files` are copied as is.
+        Tensors sharing storage (tied weights) are stored once and restored as aliases.
+        """
+        from safetensors.torch import save_file
+
+        tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=self.root)
+        try:
+            shards: List[Dict[str, torch.Tensor]] = [{}]
+            shard_bytes = 0
+            aliases: Dict[str, str] = {}
+            seen: Dict[tuple, str] = {}
+            for name, tensor in model.state_dict().items():
+                tensor = tensor.detach()
+                storage = (tensor.device, tensor.untyped_storage().data_ptr(), tensor.storage_offset(), tensor.shape)
+                if tensor.numel() and storage in seen:
+                    aliases[name] = seen[storage]
+                    continue
+                seen[storage] = name
+                nbytes = tensor.numel() * tensor.element_size()
+                if shards[-1] and shard_bytes + nbytes > self.max_shard_bytes:
+                    shards.append({})
+                    shard_bytes = 0
+                shards[-1][name] = tensor.to("cpu").contiguous()
+                shard_bytes += nbytes
+
+            files = []
+            for i, shard in enumerate(shards):
+                filename = f"model-{i + 1:05d}-of-{len(shards):05d}.safetensors"
+                save_file(shard, os.path.join(tmp, filename))
+                files.append(filename)
+            if hasattr(model, "config") and hasattr(model.config, "save_pretrained"):
+                model.config.save_pretrained(tmp)
+            if save_files is not None:
+                save_files(tmp)
+            for path in copy_files:
+                if os.path.exists(path):
+                    shutil.copy(path, tmp)
+
+            index = {"format_version": FORMAT_VERSION, "shards": files, "aliases": aliases, **(metadata or {})}
+            with open(os.path.join(tmp, INDEX_FILE), "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+
+            target = self.path(key)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.replace(tmp, target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        logger.info(f"[prepared] Saved {key} ({len(files)} shards)")
+        return target
+
+    def metadata(self, key: str) -> Dict[str, Any]:
+        with open(os.path.join(self.path(key), INDEX_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_state_dict(self, key: str, device: str = "cpu") -> Dict[str, torch.Tensor]:
+        """Memory-mapped state dict of snapshot `key` (moved to `device` unless that is the CPU)."""
+        index = self.metadata(key)
+        state: Dict[str, torch.Tensor] = {}
+        for filename in index["shards"]:
+            state.update(mmap_safetensors(os.path.join(self.path(key), filename)))
+        if torch.device(device).type != "cpu":
+            state = {name: tensor.to(device) for name, tensor in state.items()}
+        for name, target in index["aliases"].items():
+            state[name] = state[target]
+        return state
+
+    def load_model(self, key: str, build: Callable[[str], torch.nn.Module], device: str = "cpu") -> torch.nn.Module:
+        """Build the model skeleton with `build(snapshot_dir)` without allocating weights, then assign
+        the memory-mapped tensors to it (no copy on CPU) and restore the tied weights."""
+        from accelerate import init_empty_weights
+
+        with init_empty_weights():
+            model = build(self.path(key))
+        model.load_state_dict(self.load_state_dict(key, device), strict=True, assign=True)
+        # assign gives every name its own Parameter; re-share the tied ones as saved (not per config,
+        # which may say tied for a model whose head was replaced)
+        for name, target in self.metadata(key)["aliases"].items():
+            module_name, _, attr = name.rpartition(".")
+            module = model.get_submodule(module_name)
+            if attr in module._parameters:
+                setattr(module, attr, model.get_parameter(target))
+        return model.to(device)
@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# fallback reference when the process start time is not available (non-Linux)
+_MODULE_LOADED = time.time()
+
+
+def process_start_time() -> float:
+    """Wall-clock start of this process (from /proc on Linux), so interpreter and library imports count too."""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # the command name (field 2) may contain spaces, the remaining fields follow its closing paren
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/uptime", "r") as f:
+            uptime_s = float(f.read().split()[0])
+        return time.time() - uptime_s + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return _MODULE_LOADED
+
+
+class StartupTimeline:
+    """Wall time of the startup phases of a service: import, download, weight_load, device_transfer, warmup.
+
+    Phases may overlap (e.g. the processor loads while the weights download); a phase's time is the span
+    from its first start to its last end, so overlapping parts are not counted twice.
+    """
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = process_start_time() if start is None else start
+        self._lock = threading.Lock()
+        # (phase, detail, start offset, seconds)
+        self._entries: List[tuple] = []
+
+    def record(self, name: str, start: float, end: float, detail: Optional[str] = None) -> None:
+        """Record a phase that ran from `start` to `end` (time.time() values)."""
+        with self._lock:
+            self._entries.append((name, detail, start - self.start, end - start))
+
+    @contextmanager
+    def phase(self, name: str, detail: Optional[str] = None):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.time(), detail)
+
+    def phases(self) -> Dict[str, float]:
+        """Seconds per phase, in order of first start."""
+        with self._lock:
+            entries = sorted(self._entries, key=lambda e: e[2])
+        spans: Dict[str, List[float]] = {}
+        for name, _, offset, seconds in entries:
+            span = spans.setdefault(name, [offset, offset + seconds])
+            span[0], span[1] = min(span[0], offset), max(span[1], offset + seconds)
+        return {name: round(end - start, 3) for name, (start, end) in spans.items()}
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = sorted(self._entries, key=lambda e: e[2])
+        return {
+            "phases": self.phases(),
+            "entries": [
+                {"phase": name, "detail": detail, "start_s": round(offset, 3), "seconds": round(seconds, 3)}
+                for name, detail, offset, seconds in entries
+            ],
+        }
+
+    def summary(self) -> str:
+        parts = []
+        for name, seconds in self.phases().items():
+            with self._lock:
+                details = [d for n, d, _, _ in self._entries if n == name and d]
+            parts.append(f"{name} {seconds:.1f}s" + (f" ({', '.join(details)})" if details else ""))
+        return ", ".join(parts)
+
+
+# the timeline of this process; backends record their load phases into it through `phase`
+TIMELINE = StartupTimeline()
+
+
+def phase(name: str, detail: Optional[str] = None):
+    """Context manager timing one startup phase of this process (see `StartupTimeline`)."""
+    return TIMELINE.phase(name, detail)
+
+
+def download_snapshot(
+    repo_id: str,
+    token: Union[str, bool, None] = None,
+    allow_patterns: Optional[Sequence[str]] = None,
+    detail: Optional[str] = None,
+) -> str:
+    """Local directory of `repo_id`: the path itself if it is one, else the HF snapshot (downloaded if needed).
+
+    Fetching the snapshot up front, with parallel file downloads, keeps the download separate from the
+    weight load in the startup timeline; loading from the returned directory does no network calls.
+    """
+    if os.path.isdir(repo_id):
+        return repo_id
+    from huggingface_hub import snapshot_download
+
+    with phase("download", detail or repo_id):
+        return snapshot_download(
+            repo_id=repo_id,
+            token=token,
+            allow_patterns=list(allow_patterns) if allow_patterns else None,
+            max_workers=int(os.getenv("HF_DOWNLOAD_WORKERS", "8")),
+        )
+
+
+class ServiceStartup:
+    """Loads a service's backend on a background thread while the server is already listening.
+
+    `load()` builds the backend (and whatever the service derives from it), then the optional `warmup()`
+    runs one small request so that lazy initialization (CUDA kernels, allocator, caches) is not paid by
+    the first user. `state` goes loading -> warming_up -> ready, or failed; the services answer requests
+    with 503 until it is ready. A failed warmup is logged and does not keep the service from serving.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load: Callable[[], Any],
+        warmup: Optional[Callable[[], Any]] = None,
+        timeline: Optional[StartupTimeline] = None,
+    ):
+        self.name = name
+        self.timeline = timeline or TIMELINE
+        self.state = "loading"
+        self.error: Optional[str] = None
+        self.ready_after_s: Optional[float] = None
+        self._load = load
+        self._warmup = warmup
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def failed(self) -> bool:
+        return self.state == "failed"
+
+    def start(self) -> "ServiceStartup":
+        # the time until here is interpreter start and imports
+        self.timeline.record("import", self.timeline.start, time.time())
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-startup", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until loading finished (ready or failed); True if the service is ready."""
+        self._done.wait(timeout)
+        return self.ready
+
+    def _run(self) -> None:
+        try:
+            self._load()
+        except Exception as e:
+            logger.exception(f"[{self.name}] Fatal error during initialization")
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+            self._done.set()
+            return
+
+        if self._warmup is not None:
+            self.state = "warming_up"
+            try:
+                with self.timeline.phase("warmup"):
+                    self._warmup()
+            except Exception:
+                logger.warning(f"[{self.name}] Warmup failed, serving without it", exc_info=True)
+
+        self.ready_after_s = round(time.time() - self.timeline.start, 3)
+        self.state = "ready"
+        self._ready.set()
+        self._done.set()
+        logger.info(f"[{self.name}] Ready after {self.ready_after_s:.1f}s: {self.timeline.summary()}")
+
+    def status(self) -> Dict[str, Any]:
+        content: Dict[str, Any] = {"state": self.state, "ready": self.ready}
+        if self.error is not None:
+            content["error"] = self.error
+        content["ready_after_s"] = self.ready_after_s
+        content["startup"] = self.timeline.as_dict()
+        return content
@@ -0,0 +1,95 @@
+import io
+import logging
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+from src.common import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=8)
+def _resampler(orig_sr: int, target_sr: int):
+    # building the sinc kernel dominates short clips, so keep one per rate pair
+    import torchaudio
+
+    return torchaudio.transforms.Resample(orig_freq=orig_sr, new_freq=target_sr)
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    if orig_sr == target_sr:
+        return audio
+    import torch
+
+    with metrics.stage("resample"), torch.no_grad():
+        out = _resampler(orig_sr, target_sr)(torch.from_numpy(audio))
+    return out.numpy()
+
+
+def decode_audio(data: bytes, sample_rate: int = 16000) -> np.ndarray:
+    """Decode an uploaded audio file from memory to mono float32 at `sample_rate`.
+
+    libsndfile (wav/flac/ogg) is tried first; other containers (mp3, m4a, webm, ...) go through
+    PyAV via faster-whisper, which decodes and resamples in one pass.
+    """
+    import soundfile as sf
+
+    try:
+        with metrics.stage("audio_decode"):
+            audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except Exception as e:
+        logger.debug(f"[STT] soundfile could not decode upload ({e}), falling back to PyAV")
+        from faster_whisper.audio import decode_audio as av_decode_audio
+
+        with metrics.stage("audio_decode"):
+            return av_decode_audio(io.BytesIO(data), sampling_rate=sample_rate)
+
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return np.ascontiguousarray(resample(audio, sr, sample_rate), dtype=np.float32)
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    sample_rate: int,
+    max_window_s: float = 20.0,
+    overlap_s: float = 1.0,
+    search_s: float = 5.0,
+    frame_ms: int = 30,
+    threshold_db: float = -40.0,
+) -> List[Tuple[int, int]]:
+    """Split long audio into `(start, end)` sample windows of at most `max_window_s`.
+
+    Each cut is placed at the quietest frame of the last `search_s` of the window. If that frame is
+    silence (below `threshold_db` dBFS) the windows meet there; otherwise the cut runs through speech
+    and neighbouring windows overlap by `overlap_s` so that the words around it can be merged.
+    """
+    n = len(audio)
+    max_len = int(max_window_s * sample_rate)
+    if n <= max_len:
+        return [(0, n)]
+
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    n_frames = n // frame_len
+    frames = audio[: n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    threshold = 10 ** (threshold_db / 20)
+    half_overlap = int(overlap_s * sample_rate) // 2
+    search_len = int(min(search_s, max_window_s / 2) * sample_rate)
+
+    windows = []
+    start = 0
+    while n - start > max_len:
+        lo = (start + max_len - search_len) // frame_len
+        hi = min(n_frames, (start + max_len - half_overlap) // frame_len)
+        frame = lo + int(np.argmin(rms[lo:hi])) if hi > lo else lo
+        cut = frame * frame_len + frame_len // 2
+        if rms[frame] < threshold:
+            windows.append((start, cut))
+            start = cut
+        else:
+            windows.append((start, cut + half_overlap))
+            start = cut - half_overlap
+    windows.append((start, n))
+    return windows
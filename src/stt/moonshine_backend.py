@@ -1,6 +1,16 @@
 import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from src.common import metrics, startup
+from src.common.prepared_snapshot import PreparedSnapshotCache, prepared_snapshot_key, snapshot_revision
+from src.common.cancellation import CancelToken, RequestCancelled, is_cancelled
+from src.stt.audio import split_on_silence
 
 logger = logging.getLogger(__name__)
 
@@ -9,35 +19,191 @@ logger = logging.getLogger(__name__)
 class MoonshineConfig:
     model_name: str
     device: Optional[str] = None
+    # Long-form: audio longer than max_window_s is split at silences into windows decoded in batches
+    max_window_s: float = 20.0
+    window_overlap_s: float = 1.0
+    window_batch_size: int = 8
+    # Directory of prepared snapshots: the loaded weights (and processor) are saved there on the first
+    # start and memory-mapped on later ones (None disables)
+    prepared_dir: Optional[str] = None
+
+
+# files of the model repo needed to load it (the snapshot is fetched up front, see startup.download_snapshot)
+_MODEL_FILES = ("*.json", "*.safetensors", "*.model", "*.txt")
+
+# Moonshine emits about 6.5 tokens per second of speech; cap generation there to stop runaway repeats
+TOKENS_PER_SECOND = 6.5
+
+
+def _words(text: str) -> List[str]:
+    return [re.sub(r"\W", "", w).lower() for w in text.split()]
+
+
+def _merge_overlap(previous: str, text: str, max_words: int = 12) -> str:
+    """Drop the words at the start of `text` that repeat the end of `previous` (overlapping windows)."""
+    prev_words, words = _words(previous)[-max_words:], _words(text)
+    for k in range(min(len(prev_words), len(words), max_words), 0, -1):
+        if prev_words[-k:] == words[:k] and any(prev_words[-k:]):
+            return " ".join(text.split()[k:])
+    return text
 
 
 class MoonshineBackend:
+    sample_rate = 16000
+
     def __init__(self, cfg: MoonshineConfig):
         import torch
-        from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
+        from transformers import AutoConfig, AutoProcessor, AutoModelForSpeechSeq2Seq
 
         self.device = cfg.device or ("cuda" if torch.cuda.is_available() else "cpu")
         logger.info(f"[STT:moonshine] Loading processor/model '{cfg.model_name}' on {self.device}")
 
-        self.processor = AutoProcessor.from_pretrained(cfg.model_name)
-        self.model = AutoModelForSpeechSeq2Seq.from_pretrained(cfg.model_name)
-        self.model.to(self.device)
+        model_path = startup.download_snapshot(cfg.model_name, allow_patterns=_MODEL_FILES)
+        # the processor loads while the weights load
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="moonshine-processor")
+        processor_future = pool.submit(self._load_processor, AutoProcessor, model_path)
+        pool.shutdown(wait=False)
+
+        prepared = PreparedSnapshotCache(cfg.prepared_dir) if cfg.prepared_dir else None
+        prepared_key = prepared_snapshot_key(cfg.model_name, snapshot_revision(model_path), torch.float32)
+        self.prepared_snapshot = {"key": prepared_key, "loaded": False} if prepared is not None else None
+        if prepared is not None and prepared.has(prepared_key):
+            with startup.phase("weight_load", f"prepared snapshot (mmap) -> {self.device}"):
+                self.model = prepared.load_model(
+                    prepared_key,
+                    lambda path: AutoModelForSpeechSeq2Seq.from_config(AutoConfig.from_pretrained(path)),
+                    device=self.device,
+                )
+            self.prepared_snapshot["loaded"] = True
+            self.processor = processor_future.result()
+        else:
+            with startup.phase("weight_load", "model"):
+                self.model = AutoModelForSpeechSeq2Seq.from_pretrained(model_path)
+            with startup.phase("device_transfer", self.device):
+                self.model.to(self.device)
+            self.processor = processor_future.result()
+            if prepared is not None:
+                with startup.phase("prepare", prepared_key):
+                    prepared.save(
+                        prepared_key,
+                        self.model,
+                        save_files=self.processor.save_pretrained,
+                        metadata={"model": cfg.model_name, "revision": snapshot_revision(model_path)},
+                    )
         self.model.eval()
 
-    def transcribe(self, audio_path: str) -> Dict[str, Any]:
+        self.max_window_s = cfg.max_window_s
+        self.window_overlap_s = cfg.window_overlap_s
+        self.window_batch_size = max(1, cfg.window_batch_size)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {"prepared_snapshot": dict(self.prepared_snapshot)} if self.prepared_snapshot is not None else {}
+
+    @staticmethod
+    def _load_processor(processor_cls, model_path: str):
+        with startup.phase("weight_load", "processor"):
+            return processor_cls.from_pretrained(model_path)
+
+    def transcribe(self, audio: Union[str, np.ndarray], cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """Transcribe a file path or a mono float32 array already at `sample_rate`."""
+        if isinstance(audio, str):
+            import librosa
+
+            audio, _ = librosa.load(audio, sr=self.sample_rate)
+        result = self.transcribe_batch([audio], [cancel_token])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def transcribe_batch(
+        self, audios: List[np.ndarray], cancel_tokens: Optional[List[Optional[CancelToken]]] = None
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """Transcribe several clips (mono float32 at `sample_rate`) in padded `generate` calls.
+
+        Clips longer than `max_window_s` are split at silences into windows; the windows of all clips
+        are decoded together in batches of `window_batch_size` and stitched back per clip, merging the
+        words repeated in overlapping windows. `chunks` holds the text and time span of each window.
+        A cancelled clip stops decoding at the next token and its remaining windows are skipped; it
+        gets `RequestCancelled` instead of a result.
+        """
+        start_time = time.perf_counter()
+        tokens = cancel_tokens or [None] * len(audios)
+        windows = []  # (clip index, start sample, end sample)
+        for i, audio in enumerate(audios):
+            spans = split_on_silence(audio, self.sample_rate, self.max_window_s, self.window_overlap_s)
+            windows.extend((i, start, end) for start, end in spans)
+
+        texts: Dict[int, str] = {}
+        for b in range(0, len(windows), self.window_batch_size):
+            batch = [
+                w
+                for w in range(b, min(b + self.window_batch_size, len(windows)))
+                if not is_cancelled(tokens[windows[w][0]])
+            ]
+            if not batch:
+                continue
+            outputs = self._generate(
+                [audios[i][start:end] for i, start, end in (windows[w] for w in batch)],
+                [tokens[windows[w][0]] for w in batch],
+            )
+            texts.update(zip(batch, outputs))
+
+        chunks: List[List[Dict[str, Any]]] = [[] for _ in audios]
+        for w, (i, start, end) in enumerate(windows):
+            if is_cancelled(tokens[i]):
+                continue
+            text = texts[w]
+            if chunks[i]:
+                text = _merge_overlap(chunks[i][-1]["text"], text)
+            chunks[i].append(
+                {"start": start / self.sample_rate, "end": end / self.sample_rate, "text": text.strip()}
+            )
+
+        elapsed = time.perf_counter() - start_time
+        for audio, token in zip(audios, tokens):
+            if not is_cancelled(token):
+                metrics.observe_rtf(elapsed, len(audio) / self.sample_rate)
+        return [
+            RequestCancelled("transcription was cancelled")
+            if is_cancelled(token)
+            else {
+                "text": " ".join(c["text"] for c in clip_chunks if c["text"]),
+                "language": "de",
+                "language_probability": 1.0,
+                "chunks": clip_chunks,
+            }
+            for clip_chunks, token in zip(chunks, tokens)
+        ]
+
+    def _generate(
+        self, audios: List[np.ndarray], cancel_tokens: Optional[List[Optional[CancelToken]]] = None
+    ) -> List[str]:
         import torch
-        import librosa
+        from transformers import StoppingCriteria, StoppingCriteriaList
+
+        class CancelledRows(StoppingCriteria):
+            # rows of cancelled clips are finished right away, the rest of the batch keeps decoding
+            def __call__(self, input_ids, scores, **kwargs):
+                return torch.tensor([is_cancelled(t) for t in cancel_tokens], device=input_ids.device)
 
-        audio_input, _ = librosa.load(audio_path, sr=16000)
-        inputs = self.processor(audio_input, sampling_rate=16000, return_tensors="pt")
-        inputs = {k: v.to(self.device) if torch.is_tensor(v) else v for k, v in inputs.items()}
+        # pad to the longest clip; the attention mask keeps the padding out of the encoder
+        padding = dict(padding=True, return_attention_mask=True) if len(audios) > 1 else {}
+        with metrics.stage("preprocess"):
+            inputs = self.processor(audios, sampling_rate=self.sample_rate, return_tensors="pt", **padding)
+            inputs = {k: v.to(self.device) if torch.is_tensor(v) else v for k, v in inputs.items()}
+        longest_s = max(len(a) for a in audios) / self.sample_rate
 
-        with torch.no_grad():
-            generated_ids = self.model.generate(**inputs)
+        stopping_criteria = StoppingCriteriaList([CancelledRows()]) if cancel_tokens and any(cancel_tokens) else None
+        start = time.perf_counter()
+        with metrics.stage("generate"), torch.no_grad():
+            generated_ids = self.model.generate(
+                **inputs,
+                max_length=max(16, int(longest_s * TOKENS_PER_SECOND)),
+                stopping_criteria=stopping_criteria,
+            )
+        if metrics.enabled():
+            pad_id = self.model.generation_config.pad_token_id
+            n_tokens = int((generated_ids != pad_id).sum()) if pad_id is not None else generated_ids.numel()
+            metrics.observe_tokens(n_tokens, time.perf_counter() - start)
 
-        text = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
-        return {
-            "text": text,
-            "language": "de",
-            "language_probability": 1.0,
-        }
+        return self.processor.batch_decode(generated_ids, skip_special_tokens=True)
@@ -1,12 +1,21 @@
+import asyncio
 import logging
 import os
-import shutil
-from typing import Any, Dict
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+import numpy as np
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
 
+from src.common import metrics, prefork
+from src.common.batching import MicroBatcher
+from src.common.cancellation import CancellationRegistry, CancelToken, RequestCancelled
+from src.common.executor import ExecutorBusyError, InferenceExecutor
+from src.common.startup import ServiceStartup
+from src.stt.audio import decode_audio, resample
 from src.stt.moonshine_backend import MoonshineBackend, MoonshineConfig
+from src.stt.streaming import SpeechSegment, SpeechSegmenter
 from src.stt.whisper_backend import WhisperBackend, WhisperConfig
 
 logging.basicConfig(level=logging.INFO)
@@ -20,49 +29,344 @@ WHISPER_MODEL = os.getenv("WHISPER_MODEL", "large-v3")
 WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "float16")
 
 STT_MODEL = os.getenv("STT_MODEL", "fidoriel/moonshine-tiny-de")
+# Moonshine long-form: windows of at most this length (split at pauses), overlap when no pause is found
+MOONSHINE_MAX_WINDOW_S = float(os.getenv("MOONSHINE_MAX_WINDOW_S", "20"))
+MOONSHINE_WINDOW_OVERLAP_S = float(os.getenv("MOONSHINE_WINDOW_OVERLAP_S", "1"))
+MOONSHINE_WINDOW_BATCH_SIZE = int(os.getenv("MOONSHINE_WINDOW_BATCH_SIZE", "8"))
+
+# Prepared snapshots (Moonshine): converted weights saved on the first start, memory-mapped on later ones
+PREPARED_SNAPSHOT_DIR = os.getenv("PREPARED_SNAPSHOT_DIR") or None
+
+# Inference runs off the event loop: concurrent transcriptions, and requests allowed to wait for one (503 beyond)
+STT_MAX_CONCURRENCY = int(os.getenv("STT_MAX_CONCURRENCY", "1"))
+STT_MAX_QUEUE = int(os.getenv("STT_MAX_QUEUE", "16"))
+
+# Pre-forked workers (CPU only): the model loads once, N processes share its pages and serve behind a balancer
+STT_WORKERS = int(os.getenv("STT_WORKERS", "1"))
+STT_WORKER_THREADS = int(os.getenv("STT_WORKER_THREADS", "0"))  # intra-op threads per worker (0 = cores / workers)
+
+# Micro-batching: concurrent clips arriving within the window share one forward pass (1 = off)
+STT_MAX_BATCH_SIZE = int(os.getenv("STT_MAX_BATCH_SIZE", "1"))
+STT_BATCH_WINDOW_MS = float(os.getenv("STT_BATCH_WINDOW_MS", "10"))
+
+# WebSocket streaming: energy VAD segmentation and how often the open segment is re-transcribed (0 = finals only)
+STT_STREAM_VAD_THRESHOLD_DB = float(os.getenv("STT_STREAM_VAD_THRESHOLD_DB", "-40"))
+STT_STREAM_MIN_SILENCE_MS = int(os.getenv("STT_STREAM_MIN_SILENCE_MS", "500"))
+STT_STREAM_PARTIAL_INTERVAL_MS = int(os.getenv("STT_STREAM_PARTIAL_INTERVAL_MS", "1000"))
+
+# Offline stand-in for load tests (STT_BACKEND=fake, see benchmarks/fake_backends.py):
+# simulated compute seconds per second of audio
+FAKE_STT_RTF = float(os.getenv("FAKE_STT_RTF", "0.05"))
+
+# Seconds of audio transcribed once after loading, before /ready reports ready (0 disables the warmup)
+STT_WARMUP_SECONDS = float(os.getenv("STT_WARMUP_SECONDS", "1"))
+
+# Prometheus-style /metrics: per-stage latency histograms, real-time factor and tokens/s
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+metrics.configure(enabled=METRICS_ENABLED, service="stt", backend=STT_BACKEND)
 
 
 def _load_backend():
     if STT_BACKEND == "whisper":
-        return WhisperBackend(WhisperConfig(model_name=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE))
+        return WhisperBackend(
+            WhisperConfig(
+                model_name=WHISPER_MODEL,
+                compute_type=WHISPER_COMPUTE_TYPE,
+                batch_size=max(1, STT_MAX_BATCH_SIZE),
+            )
+        )
     if STT_BACKEND == "moonshine":
-        return MoonshineBackend(MoonshineConfig(model_name=STT_MODEL))
+        return MoonshineBackend(
+            MoonshineConfig(
+                model_name=STT_MODEL,
+                max_window_s=MOONSHINE_MAX_WINDOW_S,
+                window_overlap_s=MOONSHINE_WINDOW_OVERLAP_S,
+                window_batch_size=MOONSHINE_WINDOW_BATCH_SIZE,
+                prepared_dir=PREPARED_SNAPSHOT_DIR,
+            )
+        )
+    if STT_BACKEND == "fake":
+        from benchmarks.fake_backends import FakeSTTBackend, FakeSTTConfig
+
+        return FakeSTTBackend(FakeSTTConfig(rtf=FAKE_STT_RTF))
     raise RuntimeError(f"Unknown STT_BACKEND={STT_BACKEND}")
 
 
-try:
+# set once the model is loaded; requests get 503 until service_startup is ready
+backend = None
+
+
+def _init_backend() -> None:
+    global backend
     backend = _load_backend()
-except Exception as e:
-    logger.error(f"Fatal error during STT initialization: {e}")
-    raise
 
 
-@app.post("/v1/audio/transcriptions")
-async def transcribe_audio(file: UploadFile = File(...)) -> Dict[str, Any]:
-    temp_filename = f"temp_{file.filename}"
+def _warmup() -> None:
+    """Transcribe STT_WARMUP_SECONDS of quiet noise once (kernels, allocator, the decode path)."""
+    logger.info(f"[STT] warmup: {STT_WARMUP_SECONDS}s of noise")
+    audio = np.random.default_rng(0).standard_normal(int(STT_WARMUP_SECONDS * backend.sample_rate))
+    backend.transcribe((0.01 * audio).astype(np.float32))
+
+
+# resolved before loading starts: a master that forks workers must load and warm up single-threaded
+workers = prefork.effective_workers(STT_WORKERS, "STT")
+if workers > 1:
+    prefork.single_threaded_master()
+
+# weights load in the background while the server already answers /health
+service_startup = ServiceStartup("STT", _init_backend, warmup=_warmup if STT_WARMUP_SECONDS > 0 else None).start()
+
+executor = InferenceExecutor(max_concurrency=STT_MAX_CONCURRENCY, max_queue=STT_MAX_QUEUE, name="stt-inference")
+
+# in-flight requests by X-Request-Id, cancelled on client disconnect or POST /v1/audio/cancel/{id}
+cancellations = CancellationRegistry()
+
+
+def _not_ready() -> HTTPException:
+    """503 (with Retry-After) while the model is still loading or warming up, or if loading failed."""
+    return HTTPException(
+        status_code=503, detail=f"STT backend is {service_startup.state}", headers={"Retry-After": "5"}
+    )
+
+
+def _transcribe_bytes(data: bytes, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+    return backend.transcribe(decode_audio(data, sample_rate=backend.sample_rate), cancel_token=cancel_token)
+
+
+def _transcribe_pcm(audio: np.ndarray, sample_rate: int, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+    # a whole segment is resampled at once, so frame boundaries leave no filter edges in it
+    return backend.transcribe(resample(audio, sample_rate, backend.sample_rate), cancel_token=cancel_token)
+
+
+def _transcribe_batch(uploads: List[Tuple[bytes, CancelToken]]) -> List[Union[Dict[str, Any], Exception]]:
+    """Decode each (upload, cancel token), then transcribe all decodable clips in one backend call."""
+    results: List[Union[Dict[str, Any], Exception, None]] = [None] * len(uploads)
+    audios, tokens, slots = [], [], []
+    for i, (data, token) in enumerate(uploads):
+        try:
+            audios.append(decode_audio(data, sample_rate=backend.sample_rate))
+            tokens.append(token)
+            slots.append(i)
+        except Exception as e:
+            results[i] = e
+    if audios:
+        for slot, result in zip(slots, backend.transcribe_batch(audios, tokens)):
+            results[slot] = result
+    return results
+
+
+batcher: Optional[MicroBatcher] = None
+if STT_MAX_BATCH_SIZE > 1:
+    logger.info(f"[STT] batching enabled max_batch_size={STT_MAX_BATCH_SIZE} window_ms={STT_BATCH_WINDOW_MS}")
+    batcher = MicroBatcher(
+        _transcribe_batch,
+        max_batch_size=STT_MAX_BATCH_SIZE,
+        window_ms=STT_BATCH_WINDOW_MS,
+        name="stt-batcher",
+    )
 
+
+def _after_fork() -> None:
+    """Start this pre-forked worker's own threads; the master's executor and batcher threads are not inherited."""
+    global executor, batcher
+    executor = InferenceExecutor(max_concurrency=STT_MAX_CONCURRENCY, max_queue=STT_MAX_QUEUE, name="stt-inference")
+    if batcher is not None:
+        batcher = MicroBatcher(
+            _transcribe_batch,
+            max_batch_size=STT_MAX_BATCH_SIZE,
+            window_ms=STT_BATCH_WINDOW_MS,
+            name="stt-batcher",
+        )
+
+
+@app.post("/v1/audio/transcriptions")
+async def transcribe_audio(request: Request, file: UploadFile = File(...)) -> JSONResponse:
+    """Transcribe an uploaded audio file; stops early when the client disconnects or the request is
+    cancelled by its `X-Request-Id`."""
+    if not service_startup.ready:
+        raise _not_ready()
+    data = await file.read()
+    if not data:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
     try:
-        with open(temp_filename, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        token = cancellations.register(request.headers.get("X-Request-Id"))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-        result = backend.transcribe(temp_filename)
-        return result
+    try:
+        if batcher is not None:
+            work = executor.run_async(batcher.run, (data, token))
+        else:
+            work = executor.run(_transcribe_bytes, data, token)
+        result = await cancellations.run(request, token, work)
+        return JSONResponse(content=result, headers={"X-Request-Id": token.request_id})
 
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except RequestCancelled as e:
+        # 499 Client Closed Request; usually nobody is listening anymore
+        raise HTTPException(status_code=499, detail=str(e))
     except Exception as e:
         logger.exception("STT failed")
         raise HTTPException(status_code=500, detail=str(e))
-
     finally:
-        if os.path.exists(temp_filename):
+        cancellations.release(token)
+
+
+@app.post("/v1/audio/cancel/{request_id}")
+async def cancel_transcription(request: Request, request_id: str):
+    """Cancel an in-flight /v1/audio/transcriptions request by its X-Request-Id (on whichever worker runs it)."""
+    if not cancellations.cancel(request_id) and not await prefork.forward_to_peers(
+        "POST", request.url.path, request.headers
+    ):
+        raise HTTPException(status_code=404, detail=f"No request {request_id} in flight")
+    return JSONResponse(content={"request_id": request_id, "cancelled": True})
+
+
+@app.websocket("/v1/audio/stream")
+async def transcribe_stream(websocket: WebSocket, sample_rate: int = 16000):
+    """Streaming transcription over a WebSocket.
+
+    The client sends binary frames of 16-bit little endian mono PCM at `sample_rate` and the text
+    message `end` when done; segmentation runs at `sample_rate`, each segment is resampled for the
+    model as a whole. The server answers with JSON messages: `partial` hypotheses of the
+    segment currently being spoken, a `final` per closed speech segment (with `start`/`end` in
+    seconds), `error` when a segment could not be transcribed, and `done` after `end`.
+    """
+    if not service_startup.ready:
+        # 1013 Try Again Later
+        await websocket.close(code=1013, reason=f"STT backend is {service_startup.state}")
+        return
+    if sample_rate <= 0:
+        # 1003 Unsupported Data
+        await websocket.close(code=1003, reason=f"Invalid sample_rate {sample_rate}")
+        return
+    await websocket.accept()
+    segmenter = SpeechSegmenter(
+        sample_rate=sample_rate,
+        threshold_db=STT_STREAM_VAD_THRESHOLD_DB,
+        min_silence_ms=STT_STREAM_MIN_SILENCE_MS,
+    )
+    send_lock = asyncio.Lock()
+    finals: "asyncio.Queue[Optional[SpeechSegment]]" = asyncio.Queue()
+    segment_index = 0
+    partial_task: Optional[asyncio.Task] = None
+    last_partial = time.monotonic()
+    # cancelled when the client goes away, so queued and running segments are dropped
+    token = CancelToken(f"stream-{id(websocket):x}")
+
+    async def send(message: Dict[str, Any]) -> None:
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def transcribe_finals() -> None:
+        index = 0
+        while (segment := await finals.get()) is not None:
             try:
-                os.remove(temp_filename)
-            except Exception:
-                pass
+                result = await executor.run(_transcribe_pcm, segment.audio, sample_rate, cancel_token=token)
+                await send({"type": "final", "segment": index, "start": segment.start, "end": segment.end, **result})
+            except Exception as e:
+                logger.exception("STT stream segment failed")
+                await send({"type": "error", "segment": index, "detail": str(e)})
+            index += 1
+
+    async def transcribe_partial(index: int, audio: np.ndarray) -> None:
+        # partials are best effort (busy executor, cancelled stream, ...), the final follows anyway
+        try:
+            result = await executor.run(_transcribe_pcm, audio, sample_rate, cancel_token=token)
+            if index == segment_index:
+                await send({"type": "partial", "segment": index, "text": result["text"]})
+        except ExecutorBusyError:
+            pass
+        except Exception as e:
+            logger.debug(f"[STT] stream partial for segment {index} skipped: {e}")
+
+    finals_task = asyncio.create_task(transcribe_finals())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("text") is not None:
+                if message["text"].strip().lower() == "end":
+                    break
+                continue
+            if not message.get("bytes"):
+                continue
+
+            data = message["bytes"]
+            pcm = np.frombuffer(data[: len(data) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+            for segment in segmenter.push(pcm):
+                finals.put_nowait(segment)
+                segment_index += 1
+
+            now = time.monotonic()
+            if (
+                STT_STREAM_PARTIAL_INTERVAL_MS > 0
+                and segmenter.in_speech
+                and (partial_task is None or partial_task.done())
+                and (now - last_partial) * 1000 >= STT_STREAM_PARTIAL_INTERVAL_MS
+            ):
+                last_partial = now
+                partial_task = asyncio.create_task(transcribe_partial(segment_index, segmenter.current()))
+
+        segment = segmenter.flush()
+        if segment is not None:
+            finals.put_nowait(segment)
+        finals.put_nowait(None)
+        await finals_task
+        await send({"type": "done"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("[STT] stream client disconnected")
+    finally:
+        token.cancel()
+        for task in (finals_task, partial_task):
+            if task is not None and not task.done():
+                task.cancel()
 
 
 @app.get("/health")
 async def health():
-    return JSONResponse(content={"status": "healthy", "service": "stt", "backend": STT_BACKEND})
+    """Liveness: the process is up (also while the model loads); 503 only if loading failed."""
+    content = {
+        "status": "failed" if service_startup.failed else "healthy",
+        "service": "stt",
+        "backend": STT_BACKEND,
+        "state": service_startup.state,
+    }
+    return JSONResponse(content=content, status_code=503 if service_startup.failed else 200)
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once the model is loaded and warmed up, else 503; includes the startup timeline."""
+    content = {"service": "stt", "backend": STT_BACKEND, **service_startup.status()}
+    return JSONResponse(content=content, status_code=200 if service_startup.ready else 503)
+
+
+@app.get("/stats")
+async def stats():
+    content = {
+        "service": "stt",
+        "backend": STT_BACKEND,
+        "executor": executor.stats(),
+        "cancellation": cancellations.stats(),
+        "startup": {"state": service_startup.state, "phases": service_startup.timeline.phases()},
+    }
+    content.update(backend.stats() if hasattr(backend, "stats") else {})
+    worker = prefork.worker_info()
+    if worker is not None:
+        content["worker"] = worker
+    return JSONResponse(content=content)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of the stage latency, real-time factor and tokens/s metrics."""
+    if not metrics.enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=false)")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 def main():
@@ -72,8 +376,23 @@ def main():
     port = int(os.getenv("AUDIO_SERVICE_PORT", "6000"))
     debug = os.getenv("DEBUG_MODE", "false").lower() == "true"
 
-    logger.info(f"Starting STT service on {host}:{port} backend={STT_BACKEND}")
-    uvicorn.run(app, host=host, port=port, log_level="debug" if debug else "info")
+    log_level = "debug" if debug else "info"
+
+    logger.info(f"Starting STT service on {host}:{port} backend={STT_BACKEND} workers={workers}")
+    if workers > 1:
+        prefork.PreforkServer(
+            "STT",
+            app,
+            service_startup,
+            workers=workers,
+            host=host,
+            port=port,
+            threads=STT_WORKER_THREADS,
+            after_fork=_after_fork,
+            log_level=log_level,
+        ).run()
+        return
+    uvicorn.run(app, host=host, port=port, log_level=log_level)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpeechSegment:
+    audio: np.ndarray
+    start: float  # seconds since the start of the stream
+    end: float
+
+
+class SpeechSegmenter:
+    """Incremental energy-based VAD that cuts a PCM stream into speech segments.
+
+    Audio is pushed in arbitrarily sized pieces and analysed in `frame_ms` frames. A frame whose
+    RMS level is above `threshold_db` (dBFS) is speech. A segment opens on the first speech frame,
+    including `pad_ms` of audio before it, and closes after `min_silence_ms` of silence (keeping
+    `pad_ms` of it) or once it reaches `max_segment_s`. Segments with less than `min_speech_ms`
+    of speech are dropped as clicks/noise.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        threshold_db: float = -40.0,
+        min_silence_ms: int = 500,
+        min_speech_ms: int = 150,
+        pad_ms: int = 200,
+        max_segment_s: float = 30.0,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, sample_rate * frame_ms // 1000)
+        self.threshold = 10 ** (threshold_db / 20)
+        self.min_silence_frames = max(1, min_silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.pad_frames = pad_ms // frame_ms
+        self.max_segment_frames = max(1, int(max_segment_s * 1000) // frame_ms)
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._pre_roll: Deque[np.ndarray] = deque(maxlen=self.pad_frames or None)
+        self._frames: List[np.ndarray] = []
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self._segment_start = 0  # in frames
+        self._frame_index = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return bool(self._frames)
+
+    def current(self) -> Optional[np.ndarray]:
+        """Audio of the segment that is still open, e.g. for a partial hypothesis."""
+        return np.concatenate(self._frames) if self._frames else None
+
+    def push(self, audio: np.ndarray) -> List[SpeechSegment]:
+        """Feed mono float32 samples; returns the segments closed by them."""
+        audio = np.concatenate([self._pending, np.asarray(audio, dtype=np.float32)])
+        n_frames = len(audio) // self.frame_len
+        self._pending = audio[n_frames * self.frame_len :]
+
+        closed = []
+        for i in range(n_frames):
+            frame = audio[i * self.frame_len : (i + 1) * self.frame_len]
+            segment = self._process_frame(frame)
+            if segment is not None:
+                closed.append(segment)
+        return closed
+
+    def flush(self) -> Optional[SpeechSegment]:
+        """Close the open segment at the end of the stream."""
+        if self._pending.size and self._frames:
+            self._frames.append(self._pending)
+        self._pending = np.zeros(0, dtype=np.float32)
+        return self._close(trailing_silence=0)
+
+    def _process_frame(self, frame: np.ndarray) -> Optional[SpeechSegment]:
+        is_speech = float(np.sqrt(np.mean(frame * frame))) >= self.threshold
+        self._frame_index += 1
+
+        if not self._frames:
+            if not is_speech:
+                if self.pad_frames:
+                    self._pre_roll.append(frame)
+                return None
+            self._segment_start = self._frame_index - 1 - len(self._pre_roll)
+            self._frames = list(self._pre_roll)
+            self._pre_roll.clear()
+
+        self._frames.append(frame)
+        if is_speech:
+            self._speech_frames += 1
+            self._silence_frames = 0
+        else:
+            self._silence_frames += 1
+
+        if self._silence_frames >= self.min_silence_frames:
+            return self._close(trailing_silence=max(0, self._silence_frames - self.pad_frames))
+        if len(self._frames) >= self.max_segment_frames:
+            return self._close(trailing_silence=0)
+        return None
+
+    def _close(self, trailing_silence: int) -> Optional[SpeechSegment]:
+        frames = self._frames[: len(self._frames) - trailing_silence]
+        enough_speech = self._speech_frames >= self.min_speech_frames
+        start = self._segment_start
+        self._frames = []
+        self._speech_frames = 0
+        self._silence_frames = 0
+        if not frames or not enough_speech:
+            return None
+
+        audio = np.concatenate(frames)
+        start_s = start * self.frame_len / self.sample_rate
+        return SpeechSegment(audio=audio, start=start_s, end=start_s + len(audio) / self.sample_rate)
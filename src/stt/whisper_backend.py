@@ -1,6 +1,14 @@
 import logging
+import os
+import time
 from dataclasses import dataclass
-from typing import Any, Dict
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.common import metrics, startup
+from src.common.cancellation import CancelToken, RequestCancelled, is_cancelled
 
 logger = logging.getLogger(__name__)
 
@@ -9,29 +17,161 @@ logger = logging.getLogger(__name__)
 class WhisperConfig:
     model_name: str
     compute_type: str
+    # chunks decoded together by transcribe_batch
+    batch_size: int = 8
 
 
 class WhisperBackend:
     def __init__(self, cfg: WhisperConfig):
         import torch
-        from faster_whisper import WhisperModel
+        from faster_whisper import BatchedInferencePipeline, WhisperModel
 
         device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(
             f"[STT:whisper] Loading Faster-Whisper model '{cfg.model_name}' (device={device}, compute_type={cfg.compute_type})"
         )
-        self.model = WhisperModel(cfg.model_name, device=device, compute_type=cfg.compute_type)
+        model_path = cfg.model_name
+        if not os.path.isdir(model_path):
+            from faster_whisper.utils import download_model
+
+            with startup.phase("download", cfg.model_name):
+                model_path = download_model(cfg.model_name)
+        # CTranslate2 loads the weights straight onto the device, there is no separate transfer
+        with startup.phase("weight_load", f"model -> {device}"):
+            self.model = WhisperModel(model_path, device=device, compute_type=cfg.compute_type)
+        self.sample_rate = self.model.feature_extractor.sampling_rate
+        self.batch_size = cfg.batch_size
+        self.batched = BatchedInferencePipeline(model=self.model)
 
-    def transcribe(self, audio_path: str) -> Dict[str, Any]:
+    def transcribe(self, audio: Union[str, np.ndarray], cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """Transcribe a file path or a mono float32 array already at `sample_rate`.
+
+        Segments are decoded lazily; a cancelled `cancel_token` stops before the next one.
+        """
+        start = time.perf_counter()
         segments, info = self.model.transcribe(
-            audio_path,
+            audio,
             beam_size=5,
             vad_filter=True,
             vad_parameters=dict(min_silence_duration_ms=500),
         )
-        text = "".join([s.text for s in segments]).strip()
+        texts, n_tokens = [], 0
+        with metrics.stage("transcribe"):
+            for s in segments:
+                if cancel_token is not None:
+                    cancel_token.check()
+                texts.append(s.text)
+                n_tokens += len(s.tokens)
+        text = "".join(texts).strip()
+        elapsed = time.perf_counter() - start
+        metrics.observe_tokens(n_tokens, elapsed)
+        metrics.observe_rtf(elapsed, getattr(info, "duration", 0.0))
         return {
             "text": text,
             "language": getattr(info, "language", None),
             "language_probability": getattr(info, "language_probability", None),
         }
+
+    def _detect_language(self, pieces: List[np.ndarray]) -> Tuple[str, float]:
+        """Language of a clip from its first 30 s of speech, as `transcribe` detects it."""
+        if not self.model.model.is_multilingual:
+            return "en", 1.0
+        n_samples = self.model.feature_extractor.n_samples
+        head, length = [], 0
+        for piece in pieces:
+            head.append(piece[: n_samples - length])
+            length += len(head[-1])
+            if length >= n_samples:
+                break
+        with metrics.stage("language_detection"):
+            language, probability, _ = self.model.detect_language(np.concatenate(head))
+        return language, probability
+
+    def transcribe_batch(
+        self, audios: List[np.ndarray], cancel_tokens: Optional[List[Optional[CancelToken]]] = None
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """Transcribe several clips (mono float32 at `sample_rate`) with the batched pipeline.
+
+        Each clip is VAD-split on its own and its language is detected from its own speech (from the raw
+        audio if it has none). The speech chunks of all clips in the same language are concatenated;
+        each clip's consecutive chunks are merged into spans of up to `chunk_length` seconds and passed
+        as `clip_timestamps`, so spans from different requests share encoder/decoder batches. Segments
+        are mapped back to their clip by time. Clips cancelled before the batch starts are left out; a language group stops early
+        only once every clip in it is cancelled. Cancelled clips get `RequestCancelled` instead of a result.
+        """
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        start = time.perf_counter()
+        sr = self.sample_rate
+        vad = VadOptions(min_silence_duration_ms=500, max_speech_duration_s=self.model.feature_extractor.chunk_length)
+        tokens = cancel_tokens or [None] * len(audios)
+        speech_pieces: Dict[int, List[np.ndarray]] = {}
+        for i, audio in enumerate(audios):
+            if is_cancelled(tokens[i]):
+                continue
+            with metrics.stage("vad"):
+                speech = get_speech_timestamps(audio, vad, sampling_rate=sr)
+            if speech:
+                speech_pieces[i] = [audio[ts["start"] : ts["end"]] for ts in speech]
+
+        # a clip without speech still reports its language, like `transcribe` does
+        languages = {
+            i: self._detect_language(speech_pieces.get(i) or [audio])
+            for i, audio in enumerate(audios)
+            if not is_cancelled(tokens[i]) and len(audio)
+        }
+        groups: Dict[str, List[int]] = {}
+        for i in speech_pieces:
+            groups.setdefault(languages[i][0], []).append(i)
+        max_span = int(self.model.feature_extractor.chunk_length * sr)
+
+        texts: List[List[str]] = [[] for _ in audios]
+        n_tokens = 0
+        for language, clips in groups.items():
+            pieces, clip_timestamps, starts, owners = [], [], [], []
+            pos = 0
+            for i in clips:
+                # consecutive pieces of a clip share an encoder window (and their context) up to chunk_length
+                span_start = pos
+                for piece in speech_pieces[i]:
+                    if pos > span_start and pos + len(piece) - span_start > max_span:
+                        clip_timestamps.append({"start": span_start / sr, "end": pos / sr})
+                        starts.append(span_start / sr)
+                        owners.append(i)
+                        span_start = pos
+                    pieces.append(piece)
+                    pos += len(piece)
+                clip_timestamps.append({"start": span_start / sr, "end": pos / sr})
+                starts.append(span_start / sr)
+                owners.append(i)
+            segments, _ = self.batched.transcribe(
+                np.concatenate(pieces),
+                language=language,
+                beam_size=5,
+                vad_filter=False,
+                clip_timestamps=clip_timestamps,
+                batch_size=self.batch_size,
+            )
+            with metrics.stage("transcribe"):
+                for s in segments:
+                    if all(is_cancelled(tokens[i]) for i in clips):
+                        break
+                    chunk = max(0, bisect_right(starts, (s.start + s.end) / 2) - 1)
+                    texts[owners[chunk]].append(s.text)
+                    n_tokens += len(s.tokens)
+
+        elapsed = time.perf_counter() - start
+        metrics.observe_tokens(n_tokens, elapsed)
+        for i, audio in enumerate(audios):
+            if not is_cancelled(tokens[i]):
+                metrics.observe_rtf(elapsed, len(audio) / sr)
+        return [
+            RequestCancelled("transcription was cancelled")
+            if is_cancelled(token)
+            else {
+                "text": "".join(t).strip(),
+                "language": languages.get(i, (None, None))[0],
+                "language_probability": languages.get(i, (None, None))[1],
+            }
+            for i, (t, token) in enumerate(zip(texts, tokens))
+        ]
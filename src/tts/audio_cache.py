@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from src.common.cancellation import RequestCancelled
+from src.tts.voice import Voice
+from src.tts.voice_cache import voice_digest
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """NFC + collapsed whitespace; case and punctuation are kept since they change the prosody."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def synthesis_cache_key(text: str, voice: Union[str, Voice], **params: Any) -> str:
+    """Content address of a synthesized response: normalized text, voice content (file path or registered
+    `Voice`) and every generation/encoding parameter that changes the output bytes (backend, model, steps, ...)."""
+    parts = [normalize_text(text), voice_digest(voice)]
+    parts += [f"{name}={params[name]}" for name in sorted(params)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class SynthesisCache:
+    """Encoded TTS responses by content key: an LRU memory tier bounded by `max_bytes` and an
+    optional disk tier (`<cache_dir>/<key>.bin`, survives restarts, not size bounded).
+
+    `get_or_create` is single-flight: concurrent requests for a key that is being generated wait
+    for that one generation instead of starting their own. If the generating request is cancelled,
+    a waiting one generates the key itself.
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20, cache_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir or None
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    async def get_or_create(self, key: str, factory: Callable[[], Awaitable[bytes]]) -> bytes:
+        while True:
+            value = self._get_memory(key)
+            if value is not None:
+                return value
+
+            fut = self._inflight.get(key)
+            if fut is None:
+                break
+            with self._lock:
+                self.coalesced += 1
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise
+                # the generating request went away; take over
+
+        fut = asyncio.get_running_loop().create_future()
+        # followers may not exist, don't log their unretrieved errors
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = fut
+        try:
+            value = await asyncio.to_thread(self._load, key)
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+            else:
+                with self._lock:
+                    self.misses += 1
+                value = await factory()
+                await asyncio.to_thread(self._save, key, value)
+            self._put(key, value)
+            fut.set_result(value)
+            return value
+        except (asyncio.CancelledError, RequestCancelled):
+            # the generating request was cancelled, not the followers' ones: a follower takes over
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _get_memory(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def _put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def _load(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"[AudioCache] Ignoring unreadable cache file for {key}: {e}")
+            return None
+
+    def _save(self, key: str, value: bytes) -> None:
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[AudioCache] Failed to persist {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,71 @@
+import base64
+import io
+from typing import Dict, Union
+
+import numpy as np
+import torch
+
+# response_format -> media type of the binary /v1/tts body
+MEDIA_TYPES: Dict[str, str] = {
+    "pcm": "audio/pcm",
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+}
+# "opus" is what OpenAI-style clients ask for; it is Opus in an Ogg container
+FORMAT_ALIASES: Dict[str, str] = {"opus": "ogg"}
+
+# sample rates the Opus encoder accepts; anything else is resampled to 48 kHz
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def normalize_format(fmt: str) -> str:
+    """Canonical format name; raises ValueError for unknown formats."""
+    fmt = FORMAT_ALIASES.get(fmt.lower(), fmt.lower())
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unknown response_format '{fmt}', expected one of json, {', '.join(MEDIA_TYPES)}, opus")
+    return fmt
+
+
+def _mono_float32(audio: Union[torch.Tensor, np.ndarray]) -> np.ndarray:
+    if isinstance(audio, torch.Tensor):
+        audio = audio.detach().to(device="cpu", dtype=torch.float32).numpy()
+    return np.asarray(audio, dtype=np.float32).reshape(-1)
+
+
+def pcm16_bytes(audio: Union[torch.Tensor, np.ndarray]) -> bytes:
+    """16-bit little endian mono PCM, clipped to [-1, 1]."""
+    audio = _mono_float32(audio)
+    return (np.clip(audio, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def encode_audio(audio: Union[torch.Tensor, np.ndarray], sample_rate: int, fmt: str) -> bytes:
+    """Serialize mono audio to `fmt` (see MEDIA_TYPES): 16-bit PCM/WAV/FLAC, Opus (Vorbis fallback) in Ogg."""
+    import soundfile as sf
+
+    fmt = normalize_format(fmt)
+    if fmt == "pcm":
+        return pcm16_bytes(audio)
+
+    samples = np.clip(_mono_float32(audio), -1.0, 1.0)
+    if fmt == "ogg":
+        if "OPUS" in sf.available_subtypes("OGG"):
+            subtype = "OPUS"
+            if sample_rate not in OPUS_SAMPLE_RATES:
+                import torchaudio
+
+                samples = torchaudio.functional.resample(torch.from_numpy(samples), sample_rate, 48000).numpy()
+                sample_rate = 48000
+        else:
+            subtype = "VORBIS"  # libsndfile < 1.0.29 has no Opus
+    else:
+        subtype = "PCM_16"
+
+    buf = io.BytesIO()
+    sf.write(buf, samples, sample_rate, format=fmt.upper(), subtype=subtype)
+    return buf.getvalue()
+
+
+def encode_base64_wav(audio: Union[torch.Tensor, np.ndarray], sample_rate: int) -> str:
+    """The JSON response payload: a base64 encoded 16-bit WAV."""
+    return base64.b64encode(encode_audio(audio, sample_rate, "wav")).decode("ascii")
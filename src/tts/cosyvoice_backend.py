@@ -1,12 +1,18 @@
-import io
-import base64
 import logging
 import os
+import threading
+import time
+from contextlib import closing
 from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-import torchaudio
+import torch
 
-from src.tts.voice import get_voice_sample_path
+from src.common import metrics, startup
+from src.common.cancellation import CancelToken, RequestCancelled
+from src.tts.audio_format import encode_base64_wav
+from src.tts.long_text import Crossfader, crossfade_concat, split_text
+from src.tts.voice import DEFAULT_VOICE_PATH, VOICES_DIR, Voice, VoiceRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +22,13 @@ class CosyVoiceConfig:
     # Either a local directory path containing cosyvoice3.yaml + weights,
     # or a HF repo id like FunAudioLLM/Fun-CosyVoice3-0.5B-2512
     model_dir: str
+    # Long texts are split into sentence segments of at most this many characters (0 disables)
+    # and joined with `crossfade_ms` fades
+    segment_max_chars: int = 300
+    crossfade_ms: float = 30.0
+    # Reference voices and their `<voice>.prompt.txt`, scanned once; CosyVoice's frontend decodes the audio itself
+    voices_dir: str = VOICES_DIR
+    default_voice_path: Optional[str] = DEFAULT_VOICE_PATH
 
 
 class CosyVoiceBackend:
@@ -42,40 +55,117 @@ class CosyVoiceBackend:
             local_dir = os.path.join(base_dir, model_dir.replace("/", "__"))
 
             logger.info(f"[CosyVoice] Downloading from HF: {model_dir} -> {local_dir}")
-            snapshot_download(repo_id=model_dir, local_dir=local_dir)
+            with startup.phase("download", model_dir):
+                snapshot_download(repo_id=model_dir, local_dir=local_dir)
             model_dir = local_dir
 
         logger.info(f"[CosyVoice] Loading AutoModel from '{model_dir}'")
-        self.model = AutoModel(model_dir=model_dir)
+        # AutoModel loads each part onto the GPU as it goes, there is no separate transfer
+        with startup.phase("weight_load", "AutoModel"):
+            self.model = AutoModel(model_dir=model_dir)
+        self.model_dir = model_dir
         self.sample_rate = self.model.sample_rate
+        self.segment_max_chars = cfg.segment_max_chars
+        self.crossfade_samples = int(cfg.crossfade_ms * self.sample_rate / 1000)
+        # the CosyVoice frontend/model keep per-call state, run one inference at a time
+        self._lock = threading.Lock()
+        self.voices = VoiceRegistry(cfg.voices_dir, default_voice_path=cfg.default_voice_path).scan()
 
-    def synthesize_base64(self, text: str, voice: str = "default") -> str:
-        prompt_wav = get_voice_sample_path(voice)
-
-        # Prompt text can be voice-specific
-        prompt_text = None
-        prompt_file = os.path.join(os.getenv("VOICES_DIR", "voices"), f"{voice}.prompt.txt")
-        if voice and voice != "default" and os.path.exists(prompt_file):
-            with open(prompt_file, "r", encoding="utf-8") as f:
-                prompt_text = f.read().strip()
+    def _prompt(self, voice: str) -> Tuple[str, str]:
+        ref = self.voices.get(voice)
+
+        # Prompt text can be voice-specific (`<voice>.prompt.txt`, read by the registry scan)
+        prompt_text = ref.prompt_text if voice and voice == ref.name else None
         if not prompt_text:
             prompt_text = os.getenv(
                 "COSYVOICE_DEFAULT_PROMPT_TEXT",
                 "You are a helpful assistant.<|endofprompt|>Hallo, hier spricht Jan.",
             )
-
-        gen = self.model.inference_zero_shot(text, prompt_text, prompt_wav, stream=False)
-        last = None
-        for last in gen:
-            pass
-        if last is None or "tts_speech" not in last:
+        return prompt_text, ref.path
+
+    def cache_identity(self, voice: str, quality: Optional[str] = None) -> Tuple[Voice, Dict[str, Any]]:
+        """Voice and generation parameters that determine the audio of a request (for result caching)."""
+        prompt_text, _ = self._prompt(voice)
+        return self.voices.get(voice), {
+            "model": self.model_dir,
+            "prompt_text": prompt_text,
+            "segment_max_chars": self.segment_max_chars,
+            "crossfade_samples": self.crossfade_samples,
+        }
+
+    def split_segments(self, text: str) -> List[str]:
+        if self.segment_max_chars <= 0:
+            return [text]
+        return split_text(text, self.segment_max_chars) or [text]
+
+    def _iter_speech(self, text: str, voice: str, stream: bool) -> Iterator[torch.Tensor]:
+        """Yield `tts_speech` tensors (1, T) as CosyVoice produces them.
+
+        With stream=False every text segment is yielded once it is complete, with stream=True
+        each segment arrives in several incremental chunks.
+        """
+        prompt_text, prompt_wav = self._prompt(voice)
+        with self._lock:
+            gen = self.model.inference_zero_shot(text, prompt_text, prompt_wav, stream=stream)
+            try:
+                for out in gen:
+                    if "tts_speech" not in out:
+                        continue
+                    audio = out["tts_speech"]
+                    if audio.dim() == 1:
+                        audio = audio.unsqueeze(0)
+                    yield audio
+            finally:
+                gen.close()
+
+    def synthesize(self, text: str, voice: str = "default", cancel_token: Optional[CancelToken] = None) -> torch.Tensor:
+        """Synthesize `text`; a cancelled `cancel_token` stops at the next CosyVoice output."""
+        start = time.perf_counter()
+        segments = []
+        for segment in self.split_segments(text):
+            if cancel_token is not None:
+                cancel_token.check()
+            # CosyVoice may split a segment further and yields one output per piece
+            pieces = []
+            with closing(self._iter_speech(segment, voice, stream=False)) as outputs:
+                for audio in outputs:
+                    if cancel_token is not None:
+                        cancel_token.check()
+                    pieces.append(audio.cpu())
+            if pieces:
+                segments.append(torch.cat(pieces, dim=-1))
+        if not segments:
             raise RuntimeError("CosyVoice produced no output")
+        audio = segments[0] if len(segments) == 1 else crossfade_concat(segments, self.crossfade_samples)
+        metrics.observe_rtf(time.perf_counter() - start, audio.shape[-1] / self.sample_rate)
+        return audio
 
-        audio = last["tts_speech"]
-        if audio.dim() == 1:
-            audio = audio.unsqueeze(0)
-
-        buf = io.BytesIO()
-        torchaudio.save(buf, audio.cpu(), self.sample_rate, format="wav")
-        buf.seek(0)
-        return base64.b64encode(buf.read()).decode("utf-8")
+    def synthesize_base64(self, text: str, voice: str = "default") -> str:
+        return encode_base64_wav(self.synthesize(text, voice), self.sample_rate)
+
+    def synthesize_stream(self, text: str, voice: str, audio_streamer) -> None:
+        """Push CosyVoice's incremental chunks into `audio_streamer` (see VibeVoiceBackend.synthesize_stream)."""
+        sample_indices = torch.tensor([0])
+        try:
+            start, samples = time.perf_counter(), 0
+            produced = False
+            fader = Crossfader(self.crossfade_samples)
+            for segment in self.split_segments(text):
+                fader.start_segment()
+                with closing(self._iter_speech(segment, voice, stream=True)) as chunks:
+                    for audio in chunks:
+                        if audio_streamer.finished_flags[0]:
+                            raise RequestCancelled("stream was closed by the consumer")
+                        out = fader.push(audio)
+                        samples += audio.shape[-1]
+                        if len(out):
+                            audio_streamer.put(out.view(1, 1, -1), sample_indices)
+                        produced = True
+            tail = fader.flush()
+            if len(tail) and not audio_streamer.finished_flags[0]:
+                audio_streamer.put(tail.view(1, 1, -1), sample_indices)
+            if not produced and not audio_streamer.finished_flags[0]:
+                raise RuntimeError("CosyVoice produced no output")
+            metrics.observe_rtf(time.perf_counter() - start, samples / self.sample_rate)
+        finally:
+            audio_streamer.end()
@@ -0,0 +1,113 @@
+import re
+from typing import List, Optional, Pattern
+
+import torch
+
+# sentence end, optionally followed by a closing quote/bracket, then whitespace; CJK needs no space
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"'”»)\]])\s+|(?<=[。！？])\s*")
+_CLAUSE_END = re.compile(r"(?<=[,;:，；：—–])\s+")
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Split a sentence longer than `max_chars` at clause punctuation, then at word boundaries."""
+    pieces: List[str] = []
+    for clause in _CLAUSE_END.split(sentence):
+        while len(clause) > max_chars:
+            cut = clause.rfind(" ", 0, max_chars + 1)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        if clause:
+            pieces.append(clause)
+    return pieces
+
+
+def _pack(pieces: List[str], max_chars: int, sep: str = " ") -> List[str]:
+    """Greedily join consecutive pieces with `sep` while they fit into `max_chars`."""
+    segments: List[str] = []
+    for piece in pieces:
+        if segments and len(segments[-1]) + len(sep) + len(piece) <= max_chars:
+            segments[-1] = f"{segments[-1]}{sep}{piece}"
+        else:
+            segments.append(piece)
+    return segments
+
+
+def split_text(text: str, max_chars: int = 300, line_prefix: Optional[Pattern[str]] = None) -> List[str]:
+    """Split text into sentence-aligned segments of at most `max_chars` characters.
+
+    Short sentences (and short lines) are packed together so segments stay close to `max_chars`;
+    longer sentences are split at clauses. If `line_prefix` matches the start of a line (e.g. a
+    `Speaker 1:` tag) it is repeated on every segment cut from that line.
+    """
+    if len(text.strip()) <= max_chars:
+        return [text.strip()] if text.strip() else []
+
+    lines: List[str] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        prefix = ""
+        if line_prefix is not None:
+            match = line_prefix.match(line)
+            if match:
+                prefix, line = match.group(0), line[match.end() :].strip()
+        budget = max(1, max_chars - len(prefix))
+
+        pieces: List[str] = []
+        for sentence in _SENTENCE_END.split(line):
+            sentence = sentence.strip()
+            if sentence:
+                pieces.extend(_split_long(sentence, budget) if len(sentence) > budget else [sentence])
+        lines.extend(f"{prefix}{s}" for s in _pack(pieces, budget))
+    return _pack(lines, max_chars, sep="\n")
+
+
+class Crossfader:
+    """Joins the audio of consecutive segments with a short linear crossfade, chunk by chunk.
+
+    The last `fade_samples` of the audio pushed so far are held back; when the next segment starts,
+    they are blended with its first samples. Works for whole segments and for streamed chunks alike.
+    """
+
+    def __init__(self, fade_samples: int):
+        self.fade_samples = max(0, fade_samples)
+        self._tail: Optional[torch.Tensor] = None
+        self._fade_next = False
+
+    def start_segment(self) -> None:
+        self._fade_next = self._tail is not None
+
+    def push(self, chunk: torch.Tensor) -> torch.Tensor:
+        """Add mono samples of the current segment; returns the samples that are final."""
+        chunk = chunk.detach().reshape(-1).to(device="cpu", dtype=torch.float32)
+        if self._tail is not None:
+            if self._fade_next:
+                n = min(len(self._tail), len(chunk))
+                ramp = torch.linspace(0.0, 1.0, n + 2)[1:-1]
+                faded = self._tail[len(self._tail) - n :] * (1.0 - ramp) + chunk[:n] * ramp
+                chunk = torch.cat([self._tail[: len(self._tail) - n], faded, chunk[n:]])
+            else:
+                chunk = torch.cat([self._tail, chunk])
+        self._fade_next = False
+
+        keep = min(self.fade_samples, len(chunk))
+        self._tail = chunk[len(chunk) - keep :]
+        return chunk[: len(chunk) - keep]
+
+    def flush(self) -> torch.Tensor:
+        tail = self._tail if self._tail is not None else torch.zeros(0)
+        self._tail = None
+        return tail
+
+
+def crossfade_concat(segments: List[torch.Tensor], fade_samples: int) -> torch.Tensor:
+    """Concatenate mono segments with `fade_samples` long crossfades; returns shape (1, T)."""
+    fader = Crossfader(fade_samples)
+    parts = []
+    for segment in segments:
+        fader.start_segment()
+        parts.append(fader.push(segment))
+    parts.append(fader.flush())
+    return torch.cat(parts).unsqueeze(0)
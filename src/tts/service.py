@@ -1,11 +1,20 @@
+import asyncio
+import base64
 import logging
 import os
 from typing import Optional
 
 import torch
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
+from src.common import metrics, prefork
+from src.common.batching import MicroBatcher
+from src.common.cancellation import CancellationRegistry, CancelToken, RequestCancelled
+from src.common.executor import ExecutorBusyError, InferenceExecutor
+from src.common.startup import ServiceStartup
+from src.tts.audio_cache import SynthesisCache, synthesis_cache_key
+from src.tts.audio_format import MEDIA_TYPES, encode_audio, normalize_format, pcm16_bytes
 from src.tts.cosyvoice_backend import CosyVoiceBackend, CosyVoiceConfig
 from src.tts.vibevoice_backend import VibeVoiceBackend, VibeVoiceConfig
 
@@ -21,9 +30,61 @@ HF_TOKEN = os.getenv("HF_TOKEN")
 # VibeVoice model name
 TTS_MODEL = os.getenv("TTS_MODEL", "aoi-ot/VibeVoice-7B")
 
+# Encoded voice prompts (acoustic latents + embeddings) cached across requests
+VIBEVOICE_VOICE_CACHE_SIZE = int(os.getenv("VIBEVOICE_VOICE_CACHE_SIZE", "8"))
+VIBEVOICE_VOICE_CACHE_DIR = os.getenv("VIBEVOICE_VOICE_CACHE_DIR") or None
+# KV caches of the system + voice prompt prefix reused across requests
+VIBEVOICE_PREFIX_CACHE_SIZE = int(os.getenv("VIBEVOICE_PREFIX_CACHE_SIZE", "4"))
+# Default diffusion steps per speech token: fast | balanced | quality | <steps> (unset = model default)
+VIBEVOICE_DIFFUSION_PRESET = os.getenv("VIBEVOICE_DIFFUSION_PRESET") or None
+# Inference precision: fp32 | bf16 | int8 (CPU only); modules listed in VIBEVOICE_FP32_MODULES always stay fp32
+VIBEVOICE_PRECISION = os.getenv("VIBEVOICE_PRECISION", "fp32")
+VIBEVOICE_FP32_MODULES = os.getenv("VIBEVOICE_FP32_MODULES")
+# Fine-tuned adapter directories merged into the weights, comma-separated in order (unset = none)
+VIBEVOICE_LORA_DIRS = [d.strip() for d in os.getenv("VIBEVOICE_LORA_DIRS", "").split(",") if d.strip()]
+# Prepared snapshots: weights as loaded, converted and merged are saved on the first start and
+# memory-mapped on later ones, keyed by model, revision, dtype and adapters (unset disables)
+PREPARED_SNAPSHOT_DIR = os.getenv("PREPARED_SNAPSHOT_DIR") or None
+
+# Request batching: concurrent requests arriving within the window share one generate call (1 = off)
+TTS_MAX_BATCH_SIZE = int(os.getenv("TTS_MAX_BATCH_SIZE", "1"))
+TTS_BATCH_WINDOW_MS = float(os.getenv("TTS_BATCH_WINDOW_MS", "20"))
+
+# Long texts are synthesized as sentence segments of at most this many characters (0 = off),
+# joined with short crossfades; VibeVoice generates up to VIBEVOICE_SEGMENT_BATCH_SIZE segments per call
+TTS_SEGMENT_MAX_CHARS = int(os.getenv("TTS_SEGMENT_MAX_CHARS", "300"))
+TTS_CROSSFADE_MS = float(os.getenv("TTS_CROSSFADE_MS", "30"))
+VIBEVOICE_SEGMENT_BATCH_SIZE = int(os.getenv("VIBEVOICE_SEGMENT_BATCH_SIZE", "4"))
+
+# Inference runs off the event loop: concurrent generations, and requests allowed to wait for one (503 beyond)
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "1"))
+TTS_MAX_QUEUE = int(os.getenv("TTS_MAX_QUEUE", "16"))
+
+# Pre-forked workers (CPU only): the model loads once, N processes share its pages and serve behind a balancer
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "1"))
+TTS_WORKER_THREADS = int(os.getenv("TTS_WORKER_THREADS", "0"))  # intra-op threads per worker (0 = cores / workers)
+
+# Reference voices (VOICES_DIR, see src/tts/voice.py) are rescanned when files change; 0 disables the polling
+VOICES_WATCH_INTERVAL_S = float(os.getenv("VOICES_WATCH_INTERVAL_S", "5"))
+
+# Synthesized responses cached by content (text, voice, model, parameters, format); 0 disables the memory tier
+TTS_AUDIO_CACHE_MAX_BYTES = int(os.getenv("TTS_AUDIO_CACHE_MAX_BYTES", str(64 << 20)))
+TTS_AUDIO_CACHE_DIR = os.getenv("TTS_AUDIO_CACHE_DIR") or None
+
+# Prometheus-style /metrics: per-stage latency histograms, real-time factor and tokens/s
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+metrics.configure(enabled=METRICS_ENABLED, service="tts", backend=TTS_BACKEND)
+
 # CosyVoice: can be either local dir or HF repo id
 COSYVOICE_MODEL_DIR = os.getenv("COSYVOICE_MODEL_DIR", "pretrained_models/Fun-CosyVoice3-0.5B")
 
+# Offline stand-ins for load tests (TTS_BACKEND=fake | tiny-vibevoice, see benchmarks/fake_backends.py):
+# simulated compute seconds per second of audio
+FAKE_TTS_RTF = float(os.getenv("FAKE_TTS_RTF", "0.1"))
+
+# Synthesized once after loading, before /ready reports ready (empty disables the warmup)
+TTS_WARMUP_TEXT = os.getenv("TTS_WARMUP_TEXT", "Hello! This is a short warmup sentence.").strip()
+
 
 def _load_backend():
     device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -31,61 +92,419 @@ def _load_backend():
 
     if TTS_BACKEND == "vibevoice":
         return (
-            VibeVoiceBackend(VibeVoiceConfig(model_name=TTS_MODEL, hf_token=HF_TOKEN), device=device),
+            VibeVoiceBackend(
+                VibeVoiceConfig(
+                    model_name=TTS_MODEL,
+                    hf_token=HF_TOKEN,
+                    voice_cache_size=VIBEVOICE_VOICE_CACHE_SIZE,
+                    voice_cache_dir=VIBEVOICE_VOICE_CACHE_DIR,
+                    prefix_cache_size=VIBEVOICE_PREFIX_CACHE_SIZE,
+                    diffusion_preset=VIBEVOICE_DIFFUSION_PRESET,
+                    segment_max_chars=TTS_SEGMENT_MAX_CHARS,
+                    segment_batch_size=VIBEVOICE_SEGMENT_BATCH_SIZE,
+                    crossfade_ms=TTS_CROSSFADE_MS,
+                    precision=VIBEVOICE_PRECISION,
+                    fp32_modules=(
+                        None
+                        if VIBEVOICE_FP32_MODULES is None
+                        else [m.strip() for m in VIBEVOICE_FP32_MODULES.split(",") if m.strip()]
+                    ),
+                    lora_dirs=VIBEVOICE_LORA_DIRS,
+                    prepared_dir=PREPARED_SNAPSHOT_DIR,
+                ),
+                device=device,
+            ),
             device,
         )
 
     if TTS_BACKEND == "cosyvoice":
         # note: CosyVoiceBackend may download from HF if COSYVOICE_MODEL_DIR looks like a repo id
-        return (CosyVoiceBackend(CosyVoiceConfig(model_dir=COSYVOICE_MODEL_DIR)), device)
+        cfg = CosyVoiceConfig(
+            model_dir=COSYVOICE_MODEL_DIR,
+            segment_max_chars=TTS_SEGMENT_MAX_CHARS,
+            crossfade_ms=TTS_CROSSFADE_MS,
+        )
+        return (CosyVoiceBackend(cfg), device)
+
+    if TTS_BACKEND == "fake":
+        from benchmarks.fake_backends import FakeTTSBackend, FakeTTSConfig
+
+        return FakeTTSBackend(FakeTTSConfig(rtf=FAKE_TTS_RTF)), "cpu"
+
+    if TTS_BACKEND == "tiny-vibevoice":
+        from benchmarks.fake_backends import TinyVibeVoiceBackend
+
+        backend = TinyVibeVoiceBackend(
+            segment_max_chars=TTS_SEGMENT_MAX_CHARS,
+            segment_batch_size=VIBEVOICE_SEGMENT_BATCH_SIZE,
+            crossfade_ms=TTS_CROSSFADE_MS,
+            diffusion_preset=VIBEVOICE_DIFFUSION_PRESET,
+        )
+        return backend, "cpu"
 
     raise RuntimeError(f"Unknown TTS_BACKEND={TTS_BACKEND}")
 
 
-try:
+# set by _init_backend once the model is loaded; requests get 503 until service_startup is ready
+backend = None
+device: Optional[str] = None
+batcher: Optional[MicroBatcher] = None
+
+
+def _init_backend() -> None:
+    global backend, device, batcher
     backend, device = _load_backend()
-except Exception as e:
-    logger.error(f"Fatal error during TTS initialization: {e}")
-    raise
+    if TTS_MAX_BATCH_SIZE > 1 and hasattr(backend, "synthesize_batch"):
+        logger.info(f"[TTS] batching enabled max_batch_size={TTS_MAX_BATCH_SIZE} window_ms={TTS_BATCH_WINDOW_MS}")
+        batcher = MicroBatcher(
+            backend.synthesize_batch,
+            max_batch_size=TTS_MAX_BATCH_SIZE,
+            window_ms=TTS_BATCH_WINDOW_MS,
+            name="tts-batcher",
+        )
+    if workers == 1:
+        _watch_voices()
+
+
+def _watch_voices() -> None:
+    """Hot reload of added, replaced or removed voice files; a pre-forking master leaves it to its workers."""
+    if getattr(backend, "voices", None) is not None:
+        backend.voices.watch(VOICES_WATCH_INTERVAL_S)
+
+
+def _warmup() -> None:
+    """Synthesize TTS_WARMUP_TEXT once with the default voice (kernels, allocator, voice and prefix caches)."""
+    logger.info(f"[TTS] warmup: {TTS_WARMUP_TEXT!r}")
+    backend.synthesize(TTS_WARMUP_TEXT, voice="default")
+
+
+# resolved before loading starts: a master that forks workers must load and warm up single-threaded
+workers = prefork.effective_workers(TTS_WORKERS, "TTS")
+if workers > 1:
+    prefork.single_threaded_master()
+
+# weights load in the background while the server already answers /health
+service_startup = ServiceStartup("TTS", _init_backend, warmup=_warmup if TTS_WARMUP_TEXT else None).start()
+
+executor = InferenceExecutor(max_concurrency=TTS_MAX_CONCURRENCY, max_queue=TTS_MAX_QUEUE, name="tts-inference")
+
+# in-flight requests by X-Request-Id, cancelled on client disconnect or POST /v1/tts/cancel/{id}
+cancellations = CancellationRegistry()
+
+audio_cache: Optional[SynthesisCache] = None
+if TTS_AUDIO_CACHE_MAX_BYTES > 0 or TTS_AUDIO_CACHE_DIR:
+    audio_cache = SynthesisCache(max_bytes=TTS_AUDIO_CACHE_MAX_BYTES, cache_dir=TTS_AUDIO_CACHE_DIR)
+
+
+def _after_fork() -> None:
+    """Start this pre-forked worker's own threads; the master's executor and batcher threads are not inherited."""
+    global executor, batcher
+    executor = InferenceExecutor(max_concurrency=TTS_MAX_CONCURRENCY, max_queue=TTS_MAX_QUEUE, name="tts-inference")
+    if batcher is not None:
+        batcher = MicroBatcher(
+            backend.synthesize_batch,
+            max_batch_size=TTS_MAX_BATCH_SIZE,
+            window_ms=TTS_BATCH_WINDOW_MS,
+            name="tts-batcher",
+        )
+    _watch_voices()
+
+
+def _require_ready() -> None:
+    """503 (with Retry-After) while the model is still loading or warming up, or if loading failed."""
+    if not service_startup.ready:
+        raise HTTPException(
+            status_code=503, detail=f"TTS backend is {service_startup.state}", headers={"Retry-After": "5"}
+        )
+
+
+def _busy(e: ExecutorBusyError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+def _cancelled(e: RequestCancelled) -> HTTPException:
+    # 499 Client Closed Request; usually nobody is listening anymore
+    return HTTPException(status_code=499, detail=str(e))
+
+
+def _register(request: Request) -> CancelToken:
+    """Cancellation token under the client's X-Request-Id (generated if absent); 409 if it is in flight."""
+    try:
+        return cancellations.register(request.headers.get("X-Request-Id"))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+def _encode_response(audio, sample_rate: int, encoding: str) -> bytes:
+    with metrics.stage("response_encode"):
+        return encode_audio(audio, sample_rate, encoding)
+
+
+def _check_quality(quality: Optional[str]) -> None:
+    """Reject unknown quality presets up front (400) instead of failing inside generation."""
+    if quality is None:
+        return
+    if not hasattr(backend, "resolve_diffusion_steps"):
+        raise HTTPException(status_code=400, detail=f"quality presets are not supported by backend {TTS_BACKEND}")
+    try:
+        backend.resolve_diffusion_steps(quality)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _check_format(response_format: str) -> str:
+    """Canonical response format ("json" or a binary audio format); unknown formats are a 400."""
+    if response_format.lower() == "json":
+        return "json"
+    try:
+        return normalize_format(response_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/v1/tts")
-async def tts_endpoint(text: str, voice: str = "default", language: Optional[str] = None):
+async def tts_endpoint(
+    request: Request,
+    text: str,
+    voice: str = "default",
+    language: Optional[str] = None,
+    quality: Optional[str] = None,
+    response_format: str = "json",
+):
+    """Synthesize `text`. `response_format=json` (default) returns a base64 WAV inside JSON;
+    `pcm`, `wav`, `flac` and `ogg`/`opus` return the encoded audio as the binary response body.
+
+    Generation stops when the client disconnects or the request is cancelled by its `X-Request-Id`."""
     try:
+        _require_ready()
         if not text or not text.strip():
             raise HTTPException(status_code=400, detail="Text cannot be empty")
+        _check_quality(quality)
+        fmt = _check_format(response_format)
 
         lang = language or DEFAULT_LANGUAGE
-        audio_b64 = backend.synthesize_base64(text.strip(), voice=voice)
         sample_rate = getattr(backend, "sample_rate", 24000)
+        encoding = "wav" if fmt == "json" else fmt
+        token = _register(request)
+
+        async def synthesize() -> bytes:
+            if batcher is not None:
+                audio = await executor.run_async(batcher.run, (text.strip(), voice, quality, token))
+            elif quality is not None:
+                audio = await executor.run(
+                    backend.synthesize, text.strip(), voice=voice, quality=quality, cancel_token=token
+                )
+            else:
+                audio = await executor.run(backend.synthesize, text.strip(), voice=voice, cancel_token=token)
+            # encoding is CPU work too, keep it off the event loop (but out of the inference workers)
+            return await asyncio.to_thread(_encode_response, audio, sample_rate, encoding)
+
+        try:
+            if audio_cache is not None and hasattr(backend, "cache_identity"):
+                ref, params = backend.cache_identity(voice, quality)
+                key = synthesis_cache_key(
+                    text, ref, backend=TTS_BACKEND, sample_rate=sample_rate, format=encoding, **params
+                )
+                body = await cancellations.run(request, token, audio_cache.get_or_create(key, synthesize))
+            else:
+                body = await cancellations.run(request, token, synthesize())
+        finally:
+            cancellations.release(token)
+
+        headers = {"X-Request-Id": token.request_id}
+        if fmt != "json":
+            return Response(
+                content=body,
+                media_type=MEDIA_TYPES[fmt],
+                headers={"X-Sample-Rate": str(sample_rate), "X-Audio-Channels": "1", **headers},
+            )
 
         return JSONResponse(
             content={
                 "language": lang,
-                "audio_base64": audio_b64,
+                "audio_base64": base64.b64encode(body).decode("ascii"),
                 "sample_rate": sample_rate,
                 "format": "wav",
                 "backend": TTS_BACKEND,
-            }
+            },
+            headers=headers,
         )
 
     except HTTPException:
         raise
+    except ExecutorBusyError as e:
+        raise _busy(e)
+    except RequestCancelled as e:
+        raise _cancelled(e)
     except Exception as e:
         logger.exception("TTS endpoint error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/v1/tts/stream")
+async def tts_stream_endpoint(request: Request, text: str, voice: str = "default", quality: Optional[str] = None):
+    """Stream raw 16-bit mono PCM (little endian) while the utterance is being generated.
+
+    Generation stops when the client disconnects or the request is cancelled by its `X-Request-Id`."""
+    from vibevoice.modular.streamer import AsyncAudioStreamer
+
+    _require_ready()
+    if not text or not text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    if not hasattr(backend, "synthesize_stream"):
+        raise HTTPException(status_code=501, detail=f"Streaming is not supported by backend {TTS_BACKEND}")
+    _check_quality(quality)
+
+    token = _register(request)
+    streamer = AsyncAudioStreamer(batch_size=1)
+    # ending the streamer is what stops a streaming generation
+    token.add_callback(streamer.end)
+    args = (text.strip(), voice, streamer) + ((quality,) if quality is not None else ())
+    try:
+        generation = asyncio.wrap_future(executor.submit(backend.synthesize_stream, *args))
+    except ExecutorBusyError as e:
+        cancellations.release(token)
+        raise _busy(e)
+    # the outcome is awaited below unless the client went away, don't log it as unretrieved then
+    generation.add_done_callback(lambda f: f.cancelled() or f.exception())
+    chunks = streamer.get_stream(0)
+
+    # Wait for the first chunk so that failures before any audio still map to an HTTP error
+    try:
+        first_chunk = await cancellations.run(request, token, chunks.__anext__())
+    except StopAsyncIteration:
+        first_chunk = None
+    except RequestCancelled as e:
+        cancellations.release(token)
+        raise _cancelled(e)
+    if first_chunk is None:
+        cancellations.release(token)
+        try:
+            await generation
+        except Exception as e:
+            logger.exception("TTS stream error")
+            raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail="TTS produced no audio")
+
+    async def pcm_stream():
+        try:
+            yield pcm16_bytes(first_chunk)
+            async for chunk in chunks:
+                yield pcm16_bytes(chunk)
+            await generation
+        except RequestCancelled:
+            logger.info(f"[TTS] stream {token.request_id} cancelled")
+        except Exception:
+            logger.exception("TTS stream error")
+        finally:
+            if not generation.done():
+                # the client disconnected mid-stream; this ends the streamer, which stops generation
+                token.cancel()
+            streamer.end()
+            cancellations.release(token)
+
+    sample_rate = getattr(backend, "sample_rate", 24000)
+    return StreamingResponse(
+        pcm_stream(),
+        media_type="audio/pcm",
+        headers={
+            "X-Sample-Rate": str(sample_rate),
+            "X-Audio-Format": "pcm_s16le",
+            "X-Audio-Channels": "1",
+            "X-Request-Id": token.request_id,
+        },
+    )
+
+
+@app.post("/v1/tts/cancel/{request_id}")
+async def cancel_tts(request: Request, request_id: str):
+    """Cancel an in-flight /v1/tts or /v1/tts/stream request by its X-Request-Id (on whichever worker runs it)."""
+    if not cancellations.cancel(request_id) and not await prefork.forward_to_peers(
+        "POST", request.url.path, request.headers
+    ):
+        raise HTTPException(status_code=404, detail=f"No request {request_id} in flight")
+    return JSONResponse(content={"request_id": request_id, "cancelled": True})
+
+
+def _voice_registry():
+    _require_ready()
+    if getattr(backend, "voices", None) is None:
+        raise HTTPException(status_code=501, detail=f"Backend {TTS_BACKEND} has no voice registry")
+    return backend.voices
+
+
+@app.get("/v1/voices")
+async def list_voices():
+    """The registered reference voices and the default one."""
+    voices = _voice_registry()
+    return JSONResponse(content={"default": voices.stats()["default"], "voices": [v.info() for v in voices.list()]})
+
+
+@app.post("/v1/voices", status_code=201)
+async def upload_voice(
+    name: str, file: UploadFile = File(...), prompt_text: Optional[str] = None, replace: bool = False
+):
+    """Add (or with `replace=true` overwrite) the voice `name` from an uploaded reference recording.
+
+    The audio is stored in VOICES_DIR and preprocessed once; `prompt_text` is its transcript (CosyVoice).
+    With pre-forked workers the other workers pick the voice up at their next rescan (VOICES_WATCH_INTERVAL_S)."""
+    voices = _voice_registry()
+    data = await file.read()
+    try:
+        voice = await asyncio.to_thread(voices.register, name, data, file.filename or "", prompt_text, replace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse(content=voice.info(), status_code=201)
+
+
 @app.get("/health")
 async def health():
-    return JSONResponse(
-        content={
-            "status": "healthy",
-            "service": "tts",
-            "backend": TTS_BACKEND,
-            "device": str(device),
-        }
-    )
+    """Liveness: the process is up (also while the model loads); 503 only if loading failed."""
+    content = {
+        "status": "failed" if service_startup.failed else "healthy",
+        "service": "tts",
+        "backend": TTS_BACKEND,
+        "device": device,
+        "state": service_startup.state,
+    }
+    return JSONResponse(content=content, status_code=503 if service_startup.failed else 200)
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once the model is loaded and warmed up, else 503; includes the startup timeline."""
+    content = {"service": "tts", "backend": TTS_BACKEND, **service_startup.status()}
+    return JSONResponse(content=content, status_code=200 if service_startup.ready else 503)
+
+
+@app.get("/stats")
+async def stats():
+    content = {
+        "service": "tts",
+        "backend": TTS_BACKEND,
+        "executor": executor.stats(),
+        "cancellation": cancellations.stats(),
+        "startup": {"state": service_startup.state, "phases": service_startup.timeline.phases()},
+    }
+    if audio_cache is not None:
+        content["audio_cache"] = audio_cache.stats()
+    content.update(backend.stats() if hasattr(backend, "stats") else {})
+    if getattr(backend, "voices", None) is not None:
+        content["voices"] = backend.voices.stats()
+    worker = prefork.worker_info()
+    if worker is not None:
+        content["worker"] = worker
+    return JSONResponse(content=content)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of the stage latency, real-time factor and tokens/s metrics."""
+    if not metrics.enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=false)")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 def main():
@@ -95,8 +514,23 @@ def main():
     port = int(os.getenv("TTS_SERVICE_PORT", "5000"))
     debug = os.getenv("DEBUG_MODE", "false").lower() == "true"
 
-    logger.info(f"Starting TTS service on {host}:{port} backend={TTS_BACKEND}")
-    uvicorn.run(app, host=host, port=port, log_level="debug" if debug else "info")
+    log_level = "debug" if debug else "info"
+
+    logger.info(f"Starting TTS service on {host}:{port} backend={TTS_BACKEND} workers={workers}")
+    if workers > 1:
+        prefork.PreforkServer(
+            "TTS",
+            app,
+            service_startup,
+            workers=workers,
+            host=host,
+            port=port,
+            threads=TTS_WORKER_THREADS,
+            after_fork=_after_fork,
+            log_level=log_level,
+        ).run()
+        return
+    uvicorn.run(app, host=host, port=port, log_level=log_level)
 
 
 if __name__ == "__main__":
@@ -1,22 +1,91 @@
 import os
-import io
-import base64
 import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import torch
-import torchaudio
 
-from src.tts.voice import get_voice_sample_path
+from src.common import metrics, startup
+from src.common.prepared_snapshot import PreparedSnapshotCache, lora_digest, prepared_snapshot_key, snapshot_revision
+from src.common.cancellation import CancelToken, RequestCancelled, is_cancelled
+from src.tts.audio_format import encode_base64_wav
+from src.tts.long_text import Crossfader, crossfade_concat, split_text
+from src.tts.voice import DEFAULT_VOICE_PATH, VOICES_DIR, VOICES_PREPARED_DIR, Voice, VoiceRegistry
+from src.tts.voice_cache import VoicePrompt, VoicePromptCache, voice_cache_key
 
 logger = logging.getLogger(__name__)
 
+# files of the model repo needed to load it (the snapshot is fetched up front, see startup.download_snapshot)
+_MODEL_FILES = ("*.json", "*.safetensors")
+
+# script lines the processor assigns to a speaker; kept on every segment cut from such a line
+_SPEAKER_TAG = re.compile(r"Speaker\s+\d+\s*:\s*")
+
 
 @dataclass
 class VibeVoiceConfig:
     model_name: str
     hf_token: Optional[str]
+    # Encoded voice prompts kept in memory (0 disables) and optionally persisted to disk
+    voice_cache_size: int = 8
+    voice_cache_dir: Optional[str] = None
+    # LM KV caches of the shared system + voice prompt prefix, keyed by voice (0 disables)
+    prefix_cache_size: int = 4
+    # Default diffusion steps per speech token: a preset name (fast/balanced/quality) or a step count;
+    # None keeps the model config's ddpm_num_inference_steps
+    diffusion_preset: Optional[str] = None
+    # Long texts are split into sentence segments of at most this many characters (0 disables),
+    # generated up to `segment_batch_size` per generate call and joined with `crossfade_ms` fades
+    segment_max_chars: int = 300
+    segment_batch_size: int = 4
+    crossfade_ms: float = 30.0
+    # Inference precision: fp32, bf16 (weights + autocast) or int8 (dynamic quantization, CPU only);
+    # `fp32_modules` stay in fp32 in every mode, None keeps the default (acoustic + semantic tokenizer)
+    precision: str = "fp32"
+    fp32_modules: Optional[List[str]] = None
+    # Fine-tuned adapter directories (see vibevoice.modular.lora_loading), merged into the weights in order
+    lora_dirs: Optional[List[str]] = None
+    # Directory of prepared snapshots: the loaded, converted and merged weights are saved there on the
+    # first start and memory-mapped on later ones (None disables)
+    prepared_dir: Optional[str] = None
+    # Reference voices: scanned once and stored resampled and loudness-normalized under
+    # `<voices_prepared_dir>/vibevoice` (None: the source files are decoded on every voice encode)
+    voices_dir: str = VOICES_DIR
+    default_voice_path: Optional[str] = DEFAULT_VOICE_PATH
+    voices_prepared_dir: Optional[str] = VOICES_PREPARED_DIR
+
+
+class _SegmentStreamer:
+    """Streamer handed to generate() for one segment of a longer request.
+
+    Chunks go through the request's Crossfader into the outer streamer; ending the segment does
+    not end the outer stream, but the outer stream ending (client went away) stops the segment.
+    """
+
+    def __init__(self, outer, fader: Crossfader):
+        self.outer = outer
+        self.fader = fader
+        self._ended = False
+
+    @property
+    def finished_flags(self) -> List[bool]:
+        return [self._ended or self.outer.finished_flags[0]]
+
+    def put(self, audio_chunks: torch.Tensor, sample_indices: torch.Tensor) -> None:
+        for i, sample_idx in enumerate(sample_indices):
+            if int(sample_idx) != 0 or self.finished_flags[0]:
+                continue
+            out = self.fader.push(audio_chunks[i])
+            if len(out):
+                self.outer.put(out.view(1, 1, -1), torch.tensor([0]))
+
+    def end(self, sample_indices: Optional[torch.Tensor] = None) -> None:
+        self._ended = True
 
 
 class VibeVoiceBackend:
@@ -26,17 +95,43 @@ class VibeVoiceBackend:
         # Import VibeVoice modules
         # VibeVoice lives in external/vibevoice and is importable as package `vibevoice`.
         from vibevoice.modular.modeling_vibevoice_inference import (
+            DIFFUSION_STEP_PRESETS,
             VibeVoiceForConditionalGenerationInference,
         )
+        from vibevoice.modular.configuration_vibevoice import VibeVoiceConfig as ModelConfig
+        from vibevoice.modular.lora_loading import load_lora_assets, merge_lora_adapters
+        from vibevoice.modular.precision import FP32_MODULES, PRECISION_MODES, apply_precision, module_nbytes
+        from vibevoice.modular.prefix_cache import PrefixKVCache
         from vibevoice.processor.vibevoice_processor import VibeVoiceProcessor
 
         self.device = device
+        self.model_name = cfg.model_name
+        self.cfg_scale = 1.3
+        self.diffusion_presets = dict(DIFFUSION_STEP_PRESETS)
+        self.default_diffusion_steps: Optional[int] = None
+        self.default_diffusion_steps = self.resolve_diffusion_steps(cfg.diffusion_preset)
+        self.segment_max_chars = cfg.segment_max_chars
+        self.segment_batch_size = max(1, cfg.segment_batch_size)
+        self.crossfade_samples = int(cfg.crossfade_ms * self.sample_rate / 1000)
+        if cfg.precision not in PRECISION_MODES:
+            raise ValueError(f"Unknown precision '{cfg.precision}', expected one of {', '.join(PRECISION_MODES)}")
+        if cfg.precision == "int8" and device != "cpu":
+            raise ValueError("int8 precision only runs on CPU, use bf16 on GPU")
+
+        def load_processor():
+            logger.info(f"[VibeVoice] Loading processor from {cfg.model_name}")
+            with startup.phase("weight_load", "processor"):
+                return VibeVoiceProcessor.from_pretrained(cfg.model_name, token=cfg.hf_token)
 
-        logger.info(f"[VibeVoice] Loading processor from {cfg.model_name}")
-        self.processor = VibeVoiceProcessor.from_pretrained(cfg.model_name, token=cfg.hf_token)
+        # the processor (and its text tokenizer, a separate repo) loads while the model downloads and loads
+        processor_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vibevoice-processor")
+        processor_future = processor_pool.submit(load_processor)
+        processor_pool.shutdown(wait=False)
+        model_path = startup.download_snapshot(cfg.model_name, token=cfg.hf_token, allow_patterns=_MODEL_FILES)
 
         # Commented out due to issues with flash attention installation
-        load_dtype = torch.float32
+        # bf16 loads straight into bf16; apply_precision then puts the tokenizers back in fp32
+        load_dtype = torch.bfloat16 if cfg.precision == "bf16" else torch.float32
         attn_impl = "sdpa"
         # if device == "cuda":
         #     load_dtype = torch.bfloat16
@@ -45,62 +140,345 @@ class VibeVoiceBackend:
         #     load_dtype = torch.float32
         #     attn_impl = "sdpa"
 
-        logger.info(f"[VibeVoice] Loading model with dtype={load_dtype}, attn={attn_impl}")
+        lora_dirs = list(cfg.lora_dirs or [])
+        revision = snapshot_revision(model_path)
+        self.model_revision = revision + (f"+lora:{lora_digest(lora_dirs)}" if lora_dirs else "")
 
-        try:
-            self.model = VibeVoiceForConditionalGenerationInference.from_pretrained(
-                cfg.model_name,
-                torch_dtype=load_dtype,
-                attn_implementation=attn_impl,
-                device_map=device,
-                token=cfg.hf_token,
-            )
-        except Exception as e:
-            logger.warning(f"[VibeVoice] Failed to load with {attn_impl}, falling back to sdpa. Error: {e}")
-            self.model = VibeVoiceForConditionalGenerationInference.from_pretrained(
-                cfg.model_name,
-                torch_dtype=load_dtype,
-                attn_implementation="sdpa",
-                device_map=device,
-                token=cfg.hf_token,
-            )
+        prepared = PreparedSnapshotCache(cfg.prepared_dir) if cfg.prepared_dir else None
+        prepared_key = prepared_snapshot_key(cfg.model_name, revision, load_dtype, lora_dirs)
+        self.prepared_snapshot = {"key": prepared_key, "loaded": False} if prepared is not None else None
+        if prepared is not None and prepared.has(prepared_key):
+            logger.info(f"[VibeVoice] Loading prepared snapshot {prepared.path(prepared_key)}")
+            with startup.phase("weight_load", f"prepared snapshot (mmap) -> {device}"):
+                self.model = prepared.load_model(
+                    prepared_key,
+                    lambda path: VibeVoiceForConditionalGenerationInference._from_config(
+                        ModelConfig.from_pretrained(path), torch_dtype=load_dtype, attn_implementation=attn_impl
+                    ),
+                    device=device,
+                )
+            self.prepared_snapshot["loaded"] = True
+        else:
+            self.model = self._load_pretrained(model_path, load_dtype, attn_impl, device, cfg.hf_token)
+            if lora_dirs:
+                with startup.phase("weight_load", "LoRA merge"):
+                    for lora_dir in lora_dirs:
+                        logger.info(f"[VibeVoice] Merging adapters from {lora_dir}")
+                        load_lora_assets(self.model, lora_dir, device=torch.device(device))
+                        merge_lora_adapters(self.model)
+            if prepared is not None:
+                # stored before apply_precision: int8 packed weights are not plain tensors, and bf16
+                # mode re-applies its casts on load at no cost
+                with startup.phase("prepare", prepared_key):
+                    prepared.save(
+                        prepared_key,
+                        self.model,
+                        copy_files=[os.path.join(model_path, "preprocessor_config.json")],
+                        metadata={"model": cfg.model_name, "revision": revision, "dtype": str(load_dtype)},
+                    )
 
         self.model.eval()
+        fp32_modules = FP32_MODULES if cfg.fp32_modules is None else cfg.fp32_modules
+        self.precision = apply_precision(self.model, cfg.precision, fp32_modules=fp32_modules)
+        self.weights_bytes = module_nbytes(self.model)
+        self.processor = processor_future.result()
 
-    def synthesize_base64(self, text: str, voice: str = "default") -> str:
-        voice_sample_path = get_voice_sample_path(voice)
-        logger.info(f"[VibeVoice] Using voice sample: {voice_sample_path}")
+        # decoded, resampled and normalized once here (or on upload), not on every voice encode
+        with startup.phase("prepare", "voices"):
+            self.voices = VoiceRegistry(
+                cfg.voices_dir,
+                default_voice_path=cfg.default_voice_path,
+                preprocess=self._preprocess_voice if cfg.voices_prepared_dir else None,
+                sample_rate=self.sample_rate,
+                prepared_dir=os.path.join(cfg.voices_prepared_dir, "vibevoice") if cfg.voices_prepared_dir else None,
+            ).scan()
 
-        inputs = self.processor(
-            text=[text],
-            voice_samples=[[voice_sample_path]],
-            padding=True,
-            return_tensors="pt",
-            return_attention_mask=True,
+        self.voice_cache = VoicePromptCache(
+            max_entries=cfg.voice_cache_size,
+            cache_dir=cfg.voice_cache_dir,
+            device=device,
         )
+        self.prefix_cache = PrefixKVCache(max_entries=cfg.prefix_cache_size)
+        # generate() mutates shared scheduler state, so only one generation runs at a time
+        self._generate_lock = threading.Lock()
+
+    @staticmethod
+    def _load_pretrained(
+        model_path: str, load_dtype: torch.dtype, attn_impl: str, device: str, hf_token: Optional[str]
+    ):
+        from vibevoice.modular.modeling_vibevoice_inference import VibeVoiceForConditionalGenerationInference
+
+        logger.info(f"[VibeVoice] Loading model with dtype={load_dtype}, attn={attn_impl}")
+        # device_map places the weights on the device while loading, there is no separate transfer
+        with startup.phase("weight_load", f"model -> {device}"):
+            try:
+                return VibeVoiceForConditionalGenerationInference.from_pretrained(
+                    model_path,
+                    torch_dtype=load_dtype,
+                    attn_implementation=attn_impl,
+                    device_map=device,
+                    token=hf_token,
+                )
+            except Exception as e:
+                logger.warning(f"[VibeVoice] Failed to load with {attn_impl}, falling back to sdpa. Error: {e}")
+                return VibeVoiceForConditionalGenerationInference.from_pretrained(
+                    model_path,
+                    torch_dtype=load_dtype,
+                    attn_implementation="sdpa",
+                    device_map=device,
+                    token=hf_token,
+                )
+
+    def resolve_diffusion_steps(self, quality: Optional[str]) -> Optional[int]:
+        """Map a preset name or step count to diffusion steps; None means the configured default."""
+        if quality is None or quality == "":
+            return self.default_diffusion_steps
+        if quality in self.diffusion_presets:
+            return self.diffusion_presets[quality]
+        if str(quality).isdigit() and int(quality) > 0:
+            return int(quality)
+        presets = ", ".join(self.diffusion_presets)
+        raise ValueError(f"Unknown quality '{quality}', expected one of {presets} or a positive step count")
+
+    def cache_identity(self, voice: str, quality: Optional[str] = None) -> Tuple[Voice, Dict[str, Any]]:
+        """Voice and generation parameters that determine the audio of a request (for result caching)."""
+        return self.voices.get(voice), {
+            "model": self.model_name,
+            "revision": self.model_revision,
+            "dtype": self.precision.mode,
+            "diffusion_steps": self.resolve_diffusion_steps(quality),
+            "cfg_scale": self.cfg_scale,
+            "segment_max_chars": self.segment_max_chars,
+            "crossfade_samples": self.crossfade_samples,
+        }
+
+    def _preprocess_voice(self, path: str) -> np.ndarray:
+        """Reference audio as the processor feeds it to the tokenizer: 24 kHz mono, loudness-normalized."""
+        wav = self.processor.audio_processor._load_audio_from_path(path)
+        if self.processor.db_normalize and self.processor.audio_normalizer:
+            wav = self.processor.audio_normalizer(wav)
+        return wav
+
+    def _encode_voice(self, voice: Voice) -> VoicePrompt:
+        logger.info(f"[VibeVoice] Encoding voice prompt: {voice.name} ({voice.path})")
+        if voice.preprocessed:
+            wav = self.processor.audio_processor._load_audio_from_path(voice.path)
+        else:
+            wav = self._preprocess_voice(voice.source)
+
+        with metrics.stage("voice_encode"), self.precision.autocast():
+            acoustic_latents, speech_embeds = self.model.encode_voice_prompt(torch.from_numpy(wav))
+        return VoicePrompt(waveform=wav, acoustic_latents=acoustic_latents, speech_embeds=speech_embeds)
+
+    def get_voice_prompt(self, voice: Voice) -> Tuple[str, VoicePrompt]:
+        key = voice_cache_key(voice, self.model_name, self.model_revision, self.precision.mode)
+        return key, self.voice_cache.get_or_create(key, lambda: self._encode_voice(voice))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {
+            "voice_cache": self.voice_cache.stats(),
+            "prefix_cache": self.prefix_cache.stats(),
+            "precision": {
+                "mode": self.precision.mode,
+                "modules": dict(self.precision.modules),
+                "weights_bytes": self.weights_bytes,
+            },
+        }
+        if self.prepared_snapshot is not None:
+            stats["prepared_snapshot"] = dict(self.prepared_snapshot)
+        return stats
+
+    def _generate_batch(
+        self,
+        requests: List[Tuple[str, str]],
+        audio_streamer=None,
+        diffusion_steps: Optional[int] = None,
+        cancel_tokens: Optional[List[Optional[CancelToken]]] = None,
+    ) -> List[Union[torch.Tensor, Exception]]:
+        results: List[Union[torch.Tensor, Exception, None]] = [None] * len(requests)
+        tokens = cancel_tokens or [None] * len(requests)
+        texts, prompts, keys, slots = [], [], [], []
+        for i, (text, voice) in enumerate(requests):
+            if is_cancelled(tokens[i]):
+                results[i] = RequestCancelled("request was cancelled before generation")
+                continue
+            try:
+                voice_ref = self.voices.get(voice)
+                logger.info(f"[VibeVoice] Using voice sample: {voice_ref.source}")
+                voice_key, voice_prompt = self.get_voice_prompt(voice_ref)
+            except Exception as e:
+                results[i] = e
+                continue
+            texts.append(text)
+            prompts.append(voice_prompt)
+            keys.append(voice_key)
+            slots.append(i)
+
+        if not slots:
+            return results
+
+        # The processor only needs the waveform length to lay out the prompt; the encoded
+        # embeddings come from the cache, so the raw speech tensors are dropped.
+        with metrics.stage("preprocess"):
+            inputs = self.processor(
+                text=texts,
+                voice_samples=[[{"array": p.waveform, "normalized": True}] for p in prompts],
+                padding=True,
+                return_tensors="pt",
+                return_attention_mask=True,
+            )
+        inputs.pop("speech_tensors", None)
+        inputs.pop("speech_masks", None)
 
         for k, v in inputs.items():
             if torch.is_tensor(v):
                 inputs[k] = v.to(self.device)
 
-        with torch.no_grad():
+        # speech_input_mask is consumed row by row, so the per-request embeddings simply concatenate
+        speech_embeds = torch.cat([p.speech_embeds for p in prompts], dim=0)
+        # rows of cancelled requests stop generating, the others in the batch carry on
+        row_tokens = [tokens[slot] for slot in slots]
+
+        def cancelled_rows() -> List[int]:
+            return [row for row, token in enumerate(row_tokens) if is_cancelled(token)]
+
+        with self._generate_lock, torch.no_grad(), self.precision.autocast():
+            start = time.perf_counter()
             outputs = self.model.generate(
                 **inputs,
+                audio_streamer=audio_streamer,
+                speech_embeds=speech_embeds,
+                # prefix reuse only applies to single requests
+                prefix_cache=self.prefix_cache if len(slots) == 1 else None,
+                prefix_cache_key=keys[0] if len(slots) == 1 else None,
+                ddpm_inference_steps=diffusion_steps,
                 max_new_tokens=None,
-                cfg_scale=1.3,
+                cfg_scale=self.cfg_scale,
                 tokenizer=self.processor.tokenizer,
                 generation_config={"do_sample": False},
                 is_prefill=True,
+                sample_stop_fn=cancelled_rows if any(row_tokens) else None,
+                stage_observer=metrics.stage_observer(),
             )
+            if metrics.enabled():
+                new_tokens = outputs.sequences[:, inputs["input_ids"].shape[1] :]
+                n_tokens = int((new_tokens != self.processor.tokenizer.eos_token_id).sum())
+                metrics.observe_tokens(n_tokens, time.perf_counter() - start)
 
-        if not hasattr(outputs, "speech_outputs") or outputs.speech_outputs is None:
-            raise RuntimeError("VibeVoice generated no speech output")
+        speech_outputs = getattr(outputs, "speech_outputs", None) or [None] * len(slots)
+        for slot, audio in zip(slots, speech_outputs):
+            if is_cancelled(tokens[slot]):
+                results[slot] = RequestCancelled("request was cancelled during generation")
+            elif audio is None:
+                results[slot] = RuntimeError("VibeVoice generated no speech output")
+            else:
+                results[slot] = audio
+        return results
 
-        audio = outputs.speech_outputs[0].detach().cpu().to(torch.float32)
-        if audio.dim() == 1:
-            audio = audio.unsqueeze(0)
+    def split_segments(self, text: str) -> List[str]:
+        if self.segment_max_chars <= 0:
+            return [text]
+        return split_text(text, self.segment_max_chars, line_prefix=_SPEAKER_TAG) or [text]
 
-        buf = io.BytesIO()
-        torchaudio.save(buf, audio, self.sample_rate, format="wav")
-        buf.seek(0)
-        return base64.b64encode(buf.read()).decode("utf-8")
+    def synthesize_batch(self, requests: List[Tuple[str, ...]]) -> List[Union[torch.Tensor, Exception]]:
+        """Synthesize several (text, voice[, quality[, cancel_token]]) requests in batched generate calls.
+
+        Long texts are split into sentence segments first; segments of all requests with the same
+        diffusion step count are generated as batch rows (at least `segment_batch_size` per call) and
+        each request's segments are joined with short crossfades. Returns one mono audio tensor at
+        `sample_rate` per request, or the exception that request failed with. A cancelled request is
+        dropped from the batch at the next step and fails with `RequestCancelled`.
+        """
+        logger.info(f"[VibeVoice] Synthesizing batch of {len(requests)}")
+        start = time.perf_counter()
+        results: List[Union[torch.Tensor, Exception, None]] = [None] * len(requests)
+        groups: Dict[Optional[int], List[int]] = {}
+        for i, request in enumerate(requests):
+            try:
+                steps = self.resolve_diffusion_steps(request[2] if len(request) > 2 else None)
+            except ValueError as e:
+                results[i] = e
+                continue
+            groups.setdefault(steps, []).append(i)
+
+        for steps, indices in groups.items():
+            segments = [(i, segment) for i in indices for segment in self.split_segments(requests[i][0])]
+            if len(segments) > len(indices):
+                logger.info(f"[VibeVoice] Split {len(indices)} request(s) into {len(segments)} segments")
+            rows = max(self.segment_batch_size, len(indices))
+            parts: Dict[int, List[Union[torch.Tensor, Exception]]] = {i: [] for i in indices}
+            for offset in range(0, len(segments), rows):
+                chunk = segments[offset : offset + rows]
+                outputs = self._generate_batch(
+                    [(segment, requests[i][1]) for i, segment in chunk],
+                    diffusion_steps=steps,
+                    cancel_tokens=[self._cancel_token(requests[i]) for i, _ in chunk],
+                )
+                for (i, _), r in zip(chunk, outputs):
+                    parts[i].append(r)
+
+            for i, audios in parts.items():
+                error = next((a for a in audios if isinstance(a, Exception)), None)
+                if error is not None:
+                    results[i] = error
+                elif len(audios) == 1:
+                    results[i] = audios[0]
+                else:
+                    results[i] = crossfade_concat(audios, self.crossfade_samples)
+
+        elapsed = time.perf_counter() - start
+        for audio in results:
+            if torch.is_tensor(audio):
+                metrics.observe_rtf(elapsed, audio.shape[-1] / self.sample_rate)
+        return results
+
+    @staticmethod
+    def _cancel_token(request: Tuple[str, ...]) -> Optional[CancelToken]:
+        return request[3] if len(request) > 3 else None
+
+    def synthesize(
+        self,
+        text: str,
+        voice: str = "default",
+        quality: Optional[str] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> torch.Tensor:
+        result = self.synthesize_batch([(text, voice, quality, cancel_token)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def synthesize_base64(self, text: str, voice: str = "default", quality: Optional[str] = None) -> str:
+        return encode_base64_wav(self.synthesize(text, voice, quality), self.sample_rate)
+
+    def synthesize_stream(self, text: str, voice: str, audio_streamer, quality: Optional[str] = None) -> None:
+        """Synthesize one request, pushing audio chunks into `audio_streamer` as they are decoded.
+
+        Long texts are generated segment by segment, so the first segment plays while the next one is
+        generated; segment boundaries are crossfaded. Blocking; run it off the event loop. The streamer
+        is always ended, also on failure. Ending the streamer from the consumer side (e.g. client went
+        away) stops generation and raises `RequestCancelled`.
+        """
+        try:
+            start, samples = time.perf_counter(), 0
+            steps = self.resolve_diffusion_steps(quality)
+            fader = Crossfader(self.crossfade_samples)
+            for segment in self.split_segments(text):
+                if audio_streamer.finished_flags[0]:
+                    break
+                fader.start_segment()
+                segment_streamer = _SegmentStreamer(audio_streamer, fader)
+                result = self._generate_batch(
+                    [(segment, voice)], audio_streamer=segment_streamer, diffusion_steps=steps
+                )[0]
+                if isinstance(result, Exception):
+                    raise result
+                samples += result.shape[-1]
+            if audio_streamer.finished_flags[0]:
+                raise RequestCancelled("stream was closed by the consumer")
+            tail = fader.flush()
+            if len(tail):
+                audio_streamer.put(tail.view(1, 1, -1), torch.tensor([0]))
+            metrics.observe_rtf(time.perf_counter() - start, samples / self.sample_rate)
+        finally:
+            audio_streamer.end()
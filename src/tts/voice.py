@@ -1,22 +1,399 @@
+import fcntl
+import hashlib
+import json
+import logging
 import os
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.stt.audio import decode_audio
+
+logger = logging.getLogger(__name__)
 
 VOICES_DIR = os.getenv("VOICES_DIR", "voices")
 DEFAULT_VOICE_PATH = os.getenv("DEFAULT_VOICE_PATH", os.path.join(VOICES_DIR, "de-jan_man.wav"))
+# preprocessed voices (per backend); defaults to VOICES_DIR/.prepared, set it if VOICES_DIR is read-only
+VOICES_PREPARED_DIR = os.getenv("VOICES_PREPARED_DIR") or os.path.join(VOICES_DIR, ".prepared")
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg", ".m4a")
+PROMPT_SUFFIX = ".prompt.txt"
+INDEX_FILE = "index.json"
+LOCK_FILE = ".lock"
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+@dataclass(frozen=True)
+class Voice:
+    """A registered reference voice.
+
+    source:       the audio file in the voices directory
+    path:         what the backend loads: the preprocessed .npy, or `source` if the backend does not preprocess
+    digest:       sha256 of `path`'s content (cache keys use it instead of hashing the file per request)
+    prompt_text:  transcript of the reference audio, from `<name>.prompt.txt`
+    """
+
+    name: str
+    source: str
+    path: str
+    digest: str
+    prompt_text: Optional[str] = None
+    sample_rate: Optional[int] = None
+    duration_s: Optional[float] = None
+
+    @property
+    def preprocessed(self) -> bool:
+        return self.path != self.source
+
+    def info(self) -> Dict[str, Any]:
+        return {k: v for k, v in asdict(self).items() if k not in ("path", "digest")}
+
+
+# (path, mtime_ns, size) -> sha256 of file content
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's content, memoized on (path, mtime, size) so hot voices are not re-hashed."""
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _digest_lock:
+        cached = _digest_memo.get(memo_key)
+    if cached is not None:
+        return cached
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def _write_text(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _write_atomic(path: str, write: Callable[[str], None]) -> None:
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class VoiceRegistry:
+    """The voices of `voices_dir`, resolved and preprocessed once instead of on every request.
+
+    `scan()` indexes every audio file (`<name>.wav`, ...) with its `<name>.prompt.txt`. With a
+    `preprocess(path) -> waveform` function (the backend's decode, resample and loudness
+    normalization), each voice is stored once as `<prepared_dir>/<name>.npy`; an index of the source
+    files' size and mtime lets later starts reuse them without decoding anything. `watch()` polls the
+    directory and rescans when files change (hot reload), `register()` adds an uploaded voice.
+    A voice name that is not registered resolves to the default voice: `default_voice_path` if it
+    exists, else the alphabetically first voice.
+    Scans and uploads hold a file lock (`<prepared_dir>/.lock`), so pre-forked workers sharing the
+    directories never see each other's half-written index and prepared files.
+    """
+
+    def __init__(
+        self,
+        voices_dir: str = VOICES_DIR,
+        default_voice_path: Optional[str] = DEFAULT_VOICE_PATH,
+        preprocess: Optional[Callable[[str], np.ndarray]] = None,
+        sample_rate: Optional[int] = None,
+        prepared_dir: Optional[str] = None,
+    ):
+        self.voices_dir = voices_dir
+        self.default_voice_path = os.path.abspath(default_voice_path) if default_voice_path else None
+        self.preprocess = preprocess
+        self.sample_rate = sample_rate
+        self.prepared_dir = prepared_dir if preprocess is not None else None
+        self._voices: Dict[str, Voice] = {}
+        self._default: Optional[Voice] = None
+        self._signature: Optional[Tuple] = None
+        self._lock = threading.Lock()
+        self._scan_lock = threading.RLock()
+        self._lock_depth = 0
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.scans = 0
+        self.preprocessed = 0
+
+    # --- lookup -------------------------------------------------------------------------------
+
+    def get(self, name: str = "default") -> Voice:
+        """The voice `name`, else the default voice; RuntimeError if there are no voices at all."""
+        with self._lock:
+            voice = self._voices.get(name) if name and name != "default" else None
+            voice = voice or self._default
+        if voice is None:
+            raise RuntimeError(f"No voice samples found. Expected audio files in {self.voices_dir}/")
+        return voice
+
+    def list(self) -> List[Voice]:
+        with self._lock:
+            return [self._voices[name] for name in sorted(self._voices)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "voices": len(self._voices),
+                "default": self._default.name if self._default else None,
+                "scans": self.scans,
+                "preprocessed": self.preprocessed,
+                "watching": self._watcher is not None and self._watcher.is_alive(),
+            }
+
+    # --- scanning -----------------------------------------------------------------------------
+
+    def _sources(self) -> Dict[str, str]:
+        """name -> audio file of the voices directory (plus a default voice that lives elsewhere)."""
+        sources = {}
+        if os.path.isdir(self.voices_dir):
+            for entry in sorted(os.listdir(self.voices_dir)):
+                name, ext = os.path.splitext(entry)
+                if ext.lower() in AUDIO_EXTENSIONS and not entry.startswith("."):
+                    sources.setdefault(name, os.path.join(self.voices_dir, entry))
+        default = self.default_voice_path
+        if default and os.path.exists(default) and os.path.dirname(default) != os.path.abspath(self.voices_dir):
+            sources.setdefault(os.path.splitext(os.path.basename(default))[0], default)
+        return sources
+
+    def _current_signature(self) -> Tuple:
+        """Names, sizes and mtimes of everything a scan reads; a change means a rescan is due."""
+        files = []
+        paths = []
+        if os.path.isdir(self.voices_dir):
+            paths = [os.path.join(self.voices_dir, e) for e in os.listdir(self.voices_dir) if not e.startswith(".")]
+        if self.default_voice_path:
+            paths.append(self.default_voice_path)
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, st.st_size, st.st_mtime_ns))
+        return tuple(sorted(files))
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if not self.prepared_dir:
+            return {}
+        try:
+            with open(os.path.join(self.prepared_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            return index if index.get("sample_rate") == self.sample_rate else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, voices: Dict[str, Dict[str, Any]]) -> None:
+        path = os.path.join(self.prepared_dir, INDEX_FILE)
+
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"sample_rate": self.sample_rate, "voices": voices}, f, indent=2)
+
+        try:
+            _write_atomic(path, write)
+        except OSError as e:
+            logger.warning(f"[Voices] Failed to write {path}: {e}")
+
+    def _prepare(
+        self, name: str, source: str, entry: Optional[Dict[str, Any]], wav: Optional[np.ndarray] = None
+    ) -> Tuple[Voice, Dict[str, Any]]:
+        st = os.stat(source)
+        stamp = {"source": os.path.abspath(source), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        prompt_text = self._prompt_text(name)
+        if self.preprocess is None:
+            return Voice(name, source, source, file_digest(source), prompt_text), stamp
+
+        path = os.path.join(self.prepared_dir, f"{name}.npy")
+        if entry and all(entry.get(k) == v for k, v in stamp.items()) and os.path.exists(path):
+            voice = Voice(name, source, path, entry["digest"], prompt_text, self.sample_rate, entry.get("duration_s"))
+            return voice, entry
+
+        wav = np.ascontiguousarray(self.preprocess(source) if wav is None else wav, dtype=np.float32)
+
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                np.save(f, wav)
+
+        try:
+            os.makedirs(self.prepared_dir, exist_ok=True)
+            _write_atomic(path, write)
+        except OSError as e:
+            # e.g. a read-only voices volume: the backend preprocesses the source on every encode instead
+            logger.warning(f"[Voices] Cannot store {path} ({e}), using {source} as is (set VOICES_PREPARED_DIR)")
+            return Voice(name, source, source, file_digest(source), prompt_text), stamp
+        duration_s = round(len(wav) / self.sample_rate, 3) if self.sample_rate else None
+        with self._lock:
+            self.preprocessed += 1
+        logger.info(f"[Voices] Preprocessed {source} -> {path} ({duration_s}s)")
+        entry = {**stamp, "digest": file_digest(path), "duration_s": duration_s}
+        return Voice(name, source, path, entry["digest"], prompt_text, self.sample_rate, duration_s), entry
+
+    def _prompt_text(self, name: str) -> Optional[str]:
+        path = os.path.join(self.voices_dir, f"{name}{PROMPT_SUFFIX}")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    @contextmanager
+    def _locked(self):
+        """Serialize scans and uploads across threads (reentrant) and across processes (flock)."""
+        with self._scan_lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            # without a prepared dir nothing shared is written but the uploaded file itself (an atomic rename)
+            lock_file = None
+            if self.prepared_dir:
+                try:
+                    os.makedirs(self.prepared_dir, exist_ok=True)
+                    lock_file = open(os.path.join(self.prepared_dir, LOCK_FILE), "a")
+                except OSError as e:
+                    # read-only: voices are not stored there either (see _prepare)
+                    logger.debug(f"[Voices] No lock file in {self.prepared_dir} ({e})")
+            try:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._lock_depth = 1
+                yield
+            finally:
+                self._lock_depth = 0
+                if lock_file is not None:
+                    lock_file.close()  # releases the flock
+
+    def scan(self) -> "VoiceRegistry":
+        """(Re)index the voices directory; only new or changed files are preprocessed."""
+        with self._locked():
+            signature = self._current_signature()
+            index = self._load_index().get("voices", {})
+            voices: Dict[str, Voice] = {}
+            entries: Dict[str, Dict[str, Any]] = {}
+            for name, source in self._sources().items():
+                try:
+                    voices[name], entries[name] = self._prepare(name, source, index.get(name))
+                except Exception as e:
+                    logger.warning(f"[Voices] Skipping {source}: {e}")
+
+            if self.prepared_dir:
+                for name in set(index) - set(entries):
+                    stale = os.path.join(self.prepared_dir, f"{name}.npy")
+                    if os.path.exists(stale):
+                        os.remove(stale)
+                if entries != index:
+                    self._save_index(entries)
+
+            default = None
+            for voice in voices.values():
+                if self.default_voice_path and os.path.abspath(voice.source) == self.default_voice_path:
+                    default = voice
+            with self._lock:
+                self._voices = voices
+                self._default = default or (voices[sorted(voices)[0]] if voices else None)
+                self._signature = signature
+                self.scans += 1
+        logger.info(f"[Voices] {len(voices)} voices in {self.voices_dir} (default: {self.stats()['default']})")
+        return self
+
+    def changed(self) -> bool:
+        return self._current_signature() != self._signature
+
+    # --- hot reload ---------------------------------------------------------------------------
+
+    def watch(self, interval_s: float = 5.0) -> None:
+        """Poll the voices directory every `interval_s` and rescan when it changed (idempotent).
+
+        Pre-forked workers each start their own; the master does not watch once it forks them.
+        """
+        if interval_s <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval_s):
+                try:
+                    if self.changed():
+                        self.scan()
+                except Exception:
+                    logger.exception("[Voices] Rescan failed")
+
+        self._watcher = threading.Thread(target=run, name="voice-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # --- uploads ------------------------------------------------------------------------------
 
+    def register(
+        self, name: str, data: bytes, filename: str = "", prompt_text: Optional[str] = None, replace: bool = False
+    ) -> Voice:
+        """Store an uploaded voice as `<voices_dir>/<name><ext>` (+ prompt text) and preprocess it now.
 
-def get_voice_sample_path(voice_name: str = "default") -> str:
-    """Resolve a voice reference name to an existing .wav file path."""
-    if voice_name and voice_name != "default":
-        voice_path = os.path.join(VOICES_DIR, f"{voice_name}.wav")
-        if os.path.exists(voice_path):
-            return voice_path
+        ValueError for a bad name, format or undecodable audio; FileExistsError if `name` exists and not `replace`.
+        """
+        if not _NAME.match(name) or name == "default":
+            raise ValueError(f"Invalid voice name {name!r}: use letters, digits, '_', '-' and '.' (max 64)")
+        ext = os.path.splitext(filename)[1].lower() or ".wav"
+        if ext not in AUDIO_EXTENSIONS:
+            raise ValueError(f"Unsupported audio format {ext}, expected one of {', '.join(AUDIO_EXTENSIONS)}")
+        if not data:
+            raise ValueError("Empty audio upload")
 
-    if os.path.exists(DEFAULT_VOICE_PATH):
-        return DEFAULT_VOICE_PATH
+        with self._locked():
+            existing = [p for n, p in self._sources().items() if n == name]
+            if existing and not replace:
+                raise FileExistsError(f"Voice {name!r} already exists")
+            os.makedirs(self.voices_dir, exist_ok=True)
+            source = os.path.join(self.voices_dir, f"{name}{ext}")
 
-    if os.path.exists(VOICES_DIR):
-        wav_files = [f for f in os.listdir(VOICES_DIR) if f.endswith(".wav")]
-        if wav_files:
-            return os.path.join(VOICES_DIR, wav_files[0])
+            # decoded (and preprocessed) before it replaces anything; hidden, so a concurrent scan skips it
+            upload = os.path.join(self.voices_dir, f".upload.{os.getpid()}.{threading.get_ident()}{ext}")
+            try:
+                with open(upload, "wb") as f:
+                    f.write(data)
+                if self.preprocess is not None:
+                    wav = self.preprocess(upload)
+                else:
+                    # only checked: the backend reads the stored file itself
+                    wav = None
+                    if decode_audio(data).size == 0:
+                        raise ValueError("no audio samples")
+            except Exception as e:
+                if os.path.exists(upload):
+                    os.remove(upload)
+                raise ValueError(f"Could not decode the uploaded audio: {e}") from e
 
-    raise RuntimeError(f"No voice samples found. Expected .wav files in {VOICES_DIR}/")
+            for old in existing:
+                if old != source and os.path.dirname(old) == self.voices_dir:
+                    os.remove(old)
+            os.replace(upload, source)
+            prompt_path = os.path.join(self.voices_dir, f"{name}{PROMPT_SUFFIX}")
+            if prompt_text is not None:
+                _write_atomic(prompt_path, lambda tmp: _write_text(tmp, prompt_text.strip()))
+            elif replace and os.path.exists(prompt_path):
+                os.remove(prompt_path)
+            if self.preprocess is not None:
+                _, entry = self._prepare(name, source, None, wav)
+                index = self._load_index().get("voices", {})
+                self._save_index({**index, name: entry})
+            return self.scan().get(name)
@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+import torch
+
+from src.tts.voice import Voice, file_digest
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VoicePrompt:
+    """Encoded reference voice, ready to be spliced into a VibeVoice prompt.
+
+    waveform:          normalized 24 kHz mono waveform (what the processor would feed the tokenizer)
+    acoustic_latents:  scaled acoustic tokenizer latents, shape (frames, vae_dim)
+    speech_embeds:     acoustic latents after the connector, shape (frames, hidden_size)
+    """
+
+    waveform: np.ndarray
+    acoustic_latents: torch.Tensor
+    speech_embeds: torch.Tensor
+
+
+def voice_digest(voice: Union[str, Voice]) -> str:
+    """Content digest of a voice file path, or of a registered `Voice` (known already, no file access)."""
+    return voice.digest if isinstance(voice, Voice) else file_digest(voice)
+
+
+def voice_cache_key(
+    voice: Union[str, Voice], model_name: str, revision: Optional[str], dtype: Union[torch.dtype, str]
+) -> str:
+    """Cache key: voice content + model identity. Renaming a file keeps its entry, editing it does not."""
+    parts = [voice_digest(voice), model_name, revision or "", str(dtype)]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class VoicePromptCache:
+    """LRU cache of `VoicePrompt`s with an optional on-disk tier.
+
+    Memory entries keep their tensors on the model device; the disk tier stores CPU copies as
+    `<cache_dir>/<key>.pt` and survives restarts. `max_entries <= 0` disables the memory tier.
+    """
+
+    def __init__(self, max_entries: int = 8, cache_dir: Optional[str] = None, device: str = "cpu"):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir or None
+        self.device = device
+        self._entries: "OrderedDict[str, VoicePrompt]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_or_create(self, key: str, factory: Callable[[], VoicePrompt]) -> VoicePrompt:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = self._load(key)
+        if entry is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            entry = factory()
+            self._save(key, entry)
+
+        self._put(key, entry)
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _put(self, key: str, entry: VoicePrompt) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pt")
+
+    def _load(self, key: str) -> Optional[VoicePrompt]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            data = torch.load(path, map_location="cpu", weights_only=True)
+            return VoicePrompt(
+                waveform=data["waveform"].numpy(),
+                acoustic_latents=data["acoustic_latents"].to(self.device),
+                speech_embeds=data["speech_embeds"].to(self.device),
+            )
+        except Exception as e:
+            logger.warning(f"[VoiceCache] Ignoring unreadable cache file {path}: {e}")
+            return None
+
+    def _save(self, key: str, entry: VoicePrompt) -> None:
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        try:
+            torch.save(
+                {
+                    "waveform": torch.from_numpy(np.ascontiguousarray(entry.waveform)),
+                    "acoustic_latents": entry.acoustic_latents.detach().cpu(),
+                    "speech_embeds": entry.speech_embeds.detach().cpu(),
+                },
+                tmp_path,
+            )
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"[VoiceCache] Failed to persist {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,98 @@
+import types
+
+import pytest
+import torch
+
+
+def build_tiny_vibevoice(seed: int = 0):
+    """Randomly initialized VibeVoice inference model small enough for CPU unit tests."""
+    from vibevoice.modular.configuration_vibevoice import VibeVoiceConfig
+    from vibevoice.modular.modeling_vibevoice_inference import VibeVoiceForConditionalGenerationInference
+
+    torch.manual_seed(seed)
+    config = VibeVoiceConfig(
+        acoustic_tokenizer_config=dict(
+            vae_dim=8, encoder_n_filters=4, decoder_n_filters=4, encoder_ratios=[2, 2], encoder_depths="1-1-1"
+        ),
+        semantic_tokenizer_config=dict(vae_dim=8, encoder_n_filters=4, encoder_ratios=[2, 2], encoder_depths="1-1-1"),
+        decoder_config=dict(
+            model_type="qwen2",
+            vocab_size=64,
+            hidden_size=32,
+            intermediate_size=64,
+            num_hidden_layers=2,
+            num_attention_heads=4,
+            num_key_value_heads=2,
+            max_position_embeddings=256,
+        ),
+        diffusion_head_config=dict(hidden_size=32, head_layers=1, latent_size=8, ddpm_num_inference_steps=4),
+    )
+    model = VibeVoiceForConditionalGenerationInference(config).eval()
+    model.model.speech_scaling_factor.fill_(1.0)
+    model.model.speech_bias_factor.fill_(0.0)
+    return model
+
+
+# Special token ids of the fake tokenizer. speech_diffusion has the lowest id so that it wins ties
+# in the constrained argmax, which keeps tiny models generating speech instead of stopping.
+TINY_TOKENIZER = types.SimpleNamespace(
+    bos_token_id=None,
+    pad_token_id=0,
+    speech_diffusion_id=1,
+    speech_start_id=2,
+    speech_end_id=3,
+    eos_token_id=4,
+)
+
+
+def generate_tiny(model, tokenizer, input_ids=None, speech_input_mask=None, seed=0, **kwargs):
+    """A left-padded batch with one two-frame voice segment per row through `generate`, greedy and seeded.
+
+    Defaults to three rows with the voice at positions 5:7; `input_ids` / `speech_input_mask` override them.
+    """
+    if input_ids is None:
+        input_ids = torch.tensor(
+            [
+                [0, 0, 5, 6, 2, 1, 1, 3, 9, 2],
+                [5, 6, 7, 2, 1, 1, 3, 8, 9, 2],
+                [0, 5, 7, 2, 1, 1, 3, 8, 9, 2],
+            ]
+        )
+    if speech_input_mask is None:
+        speech_input_mask = torch.zeros_like(input_ids, dtype=torch.bool)
+        speech_input_mask[:, 5:7] = True
+    # left padding: everything from a row's first non-pad token on is attended
+    attention_mask = (input_ids != tokenizer.pad_token_id).long().cumsum(dim=1).gt(0).long()
+    batch_size = input_ids.shape[0]
+
+    torch.manual_seed(seed)
+    return model.generate(
+        input_ids=input_ids,
+        attention_mask=attention_mask,
+        speech_tensors=torch.randn(batch_size, 8),
+        speech_masks=torch.ones(batch_size, 2, dtype=torch.bool),
+        speech_input_mask=speech_input_mask,
+        tokenizer=tokenizer,
+        max_new_tokens=None,
+        cfg_scale=1.3,
+        generation_config={"do_sample": False},
+        show_progress_bar=False,
+        **kwargs,
+    )
+
+
+def speech_only_head(model, tokenizer):
+    """Only diffusion / speech_start get logits, so every sample keeps producing audio until max length."""
+    head = torch.zeros_like(model.lm_head.weight)
+    head[tokenizer.speech_diffusion_id].fill_(1.0)
+    model.lm_head.weight = torch.nn.Parameter(head)
+
+
+@pytest.fixture
+def tiny_vibevoice():
+    return build_tiny_vibevoice()
+
+
+@pytest.fixture
+def tiny_tokenizer():
+    return TINY_TOKENIZER
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+import torch
+
+from benchmarks.fake_backends import FakeSTTBackend, FakeSTTConfig, FakeTTSBackend, FakeTTSConfig
+from benchmarks.load_test import Sample, compare, percentiles, run_level, scaling, summarize
+from src.common.cancellation import CancelToken, RequestCancelled
+
+
+def test_fake_tts_is_deterministic_and_sized_by_text():
+    backend = FakeTTSBackend(FakeTTSConfig(rtf=0.0))
+    short = backend.synthesize("Hello there.", voice="a")
+    assert torch.equal(short, backend.synthesize("Hello there.", voice="a"))
+    assert not torch.equal(short, backend.synthesize("Hello there.", voice="b"))
+    assert backend.synthesize("Hello there. " * 10, voice="a").shape[-1] > 5 * short.shape[-1]
+    with pytest.raises(ValueError):
+        backend.synthesize("Hello", quality="best")
+
+
+def test_fake_tts_batch_is_cheaper_than_sequential():
+    backend = FakeTTSBackend(FakeTTSConfig(rtf=0.05, batch_cost=0.1))
+    text = "A sentence that takes about two seconds to say."
+    start = time.perf_counter()
+    results = backend.synthesize_batch([(text, "default")] * 4)
+    batched = time.perf_counter() - start
+    assert all(isinstance(r, torch.Tensor) for r in results)
+    # 4 rows cost 1.3x of one row instead of 4x
+    assert batched < 2.5 * backend._compute_s(text, None)
+    assert backend.stats()["fake"] == {"generate_calls": 1, "rows": 4}
+
+
+def test_fake_tts_cancellation_stops_the_batch():
+    backend = FakeTTSBackend(FakeTTSConfig(rtf=10.0))
+    token = CancelToken("r1")
+    token.cancel()
+    start = time.perf_counter()
+    result = backend.synthesize_batch([("Long text " * 20, "default", None, token)])[0]
+    assert isinstance(result, RequestCancelled)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_fake_stt_is_deterministic():
+    backend = FakeSTTBackend(FakeSTTConfig(rtf=0.0))
+    audio = np.sin(np.arange(32000) / 10).astype(np.float32)
+    first = backend.transcribe(audio)
+    assert first == backend.transcribe(audio)
+    assert len(first["text"].split()) == 5
+    assert backend.transcribe_batch([audio, audio[:16000]])[1]["text"] != first["text"]
+
+
+def test_percentiles_use_nearest_rank():
+    stats = percentiles([i / 1000 for i in range(1, 101)], 1000)
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (50, 95, 99, 100)
+    assert stats["mean"] == pytest.approx(50.5)
+    assert percentiles([]) is None
+
+
+def test_summarize_counts_errors_and_rtf():
+    samples = [Sample(200, 0.5, ttfa_s=0.1, audio_s=2.0), Sample(200, 1.0, audio_s=2.0), Sample(503, 0.01)]
+    level = summarize(samples, concurrency=2, wall_s=1.0)
+    assert (level["ok"], level["errors"], level["status"]) == (2, 1, {"200": 2, "503": 1})
+    assert level["throughput_rps"] == 2.0
+    assert level["audio_s_per_s"] == 4.0
+    assert level["rtf"]["max"] == 0.5
+    assert level["ttfa_ms"]["p50"] == 100.0
+
+
+def test_run_level_keeps_concurrency_closed_loop():
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def send(i):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        return Sample(200, 0.01, audio_s=1.0)
+
+    level = run_level(send, concurrency=3, total=12)
+    assert level["requests"] == level["ok"] == 12
+    assert peak[0] <= 3
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    def result(p95, rps):
+        return {"levels": [{"concurrency": 4, "latency_ms": {"p95": p95}, "throughput_rps": rps}]}
+
+    assert compare(result(110, 9.0), result(100, 10.0), max_regression=0.2) == []
+    regressions = compare(result(150, 7.0), result(100, 10.0), max_regression=0.2)
+    assert len(regressions) == 2
+    assert "p95 latency" in regressions[0] and "throughput" in regressions[1]
+
+
+def test_scaling_is_relative_to_the_first_worker_count():
+    def run(workers, rps):
+        return {"workers": workers, "levels": [{"concurrency": 8, "throughput_rps": rps}]}
+
+    rows = scaling([run(1, 2.0), run(2, 3.8), run(4, 6.0)])
+    assert [(r["workers"], r["speedup"], r["efficiency"]) for r in rows] == [
+        (1, 1.0, 1.0),
+        (2, 1.9, 0.95),
+        (4, 3.0, 0.75),
+    ]
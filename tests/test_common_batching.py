@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from src.common.batching import MicroBatcher
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [i * 10 for i in items]
+
+    batcher = MicroBatcher(process, max_batch_size=4, window_ms=100)
+    try:
+        futures = [batcher.submit(i) for i in range(6)]
+        assert [f.result(timeout=5) for f in futures] == [0, 10, 20, 30, 40, 50]
+    finally:
+        batcher.close()
+
+    assert [len(b) for b in batches] == [4, 2]
+
+
+def test_micro_batcher_isolates_per_item_failures():
+    def process(items):
+        return [ValueError(f"bad {i}") if i == 1 else i for i in items]
+
+    batcher = MicroBatcher(process, max_batch_size=3, window_ms=50)
+    try:
+        ok, bad = batcher.submit(0), batcher.submit(1)
+        assert ok.result(timeout=5) == 0
+        with pytest.raises(ValueError):
+            bad.result(timeout=5)
+    finally:
+        batcher.close()
+
+
+def test_micro_batcher_skips_cancelled_requests():
+    started = threading.Event()
+    release = threading.Event()
+    seen = []
+
+    def process(items):
+        seen.extend(items)
+        started.set()
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(process, max_batch_size=1, window_ms=0)
+    try:
+        first = batcher.submit("first")
+        started.wait(5)
+        second = batcher.submit("second")
+        assert second.cancel()
+        release.set()
+        assert first.result(timeout=5) == "first"
+        time.sleep(0.1)
+    finally:
+        batcher.close()
+    assert seen == ["first"]
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.common.cancellation import CancellationRegistry, RequestCancelled
+from src.common.executor import InferenceExecutor
+
+
+class _Request:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def test_token_runs_callbacks_once():
+    registry = CancellationRegistry()
+    token = registry.register("abc")
+    calls = []
+    token.add_callback(lambda: calls.append("a"))
+    assert registry.cancel("abc") and token.cancelled
+    token.cancel()
+    token.add_callback(lambda: calls.append("late"))
+    assert calls == ["a", "late"]
+    with pytest.raises(RequestCancelled):
+        token.check()
+
+
+def test_registry_ids():
+    registry = CancellationRegistry()
+    token = registry.register(None)
+    assert token.request_id
+    with pytest.raises(ValueError):
+        registry.register(token.request_id)
+    assert not registry.cancel("unknown")
+    registry.release(token)
+    assert registry.stats() == {"in_flight": 0, "cancelled": 0, "disconnected": 0}
+    # a released id can be reused
+    registry.release(registry.register(token.request_id))
+
+
+def test_run_returns_result():
+    registry = CancellationRegistry(poll_interval_s=0.01)
+
+    async def scenario():
+        token = registry.register()
+        return await registry.run(_Request(), token, asyncio.sleep(0.03, result="ok"))
+
+    assert asyncio.run(scenario()) == "ok"
+
+
+def test_disconnect_cancels_running_inference():
+    registry = CancellationRegistry(poll_interval_s=0.01)
+    executor = InferenceExecutor(max_concurrency=1, max_queue=2)
+    steps = []
+
+    def generate(token):
+        for _ in range(500):
+            token.check()
+            steps.append(1)
+            threading.Event().wait(0.002)
+        return "finished"
+
+    async def scenario():
+        request = _Request()
+        token = registry.register()
+        running = registry.run(request, token, executor.run(generate, token))
+        queued_token = registry.register()
+        queued = registry.run(request, queued_token, executor.run(generate, queued_token))
+
+        async def disconnect():
+            await asyncio.sleep(0.05)
+            request.disconnected = True
+
+        results = await asyncio.gather(running, queued, disconnect(), return_exceptions=True)
+        registry.release(token)
+        registry.release(queued_token)
+        return results
+
+    try:
+        running, queued, _ = asyncio.run(scenario())
+        assert isinstance(running, RequestCancelled) and isinstance(queued, RequestCancelled)
+        # wait for the worker to notice the token
+        for _ in range(200):
+            if executor.stats()["running"] == 0:
+                break
+            threading.Event().wait(0.01)
+        assert len(steps) < 500
+        stats = executor.stats()
+        assert stats["cancelled"] == 2 and stats["completed"] == 0 and stats["failed"] == 0
+        assert stats["cancelled_work_s"] > 0
+        assert registry.stats()["cancelled"] == 2 and registry.stats()["disconnected"] >= 1
+    finally:
+        executor.shutdown()
+
+
+def test_explicit_cancel_by_id():
+    registry = CancellationRegistry(poll_interval_s=0.01)
+
+    async def scenario():
+        token = registry.register("req-1")
+
+        async def cancel_later():
+            await asyncio.sleep(0.03)
+            assert registry.cancel("req-1")
+
+        asyncio.ensure_future(cancel_later())
+        with pytest.raises(RequestCancelled):
+            await registry.run(_Request(), token, asyncio.sleep(5))
+
+    asyncio.run(scenario())
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.common.executor import ExecutorBusyError, InferenceExecutor
+
+
+def test_executor_runs_off_the_event_loop():
+    executor = InferenceExecutor(max_concurrency=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        job = asyncio.ensure_future(executor.run(lambda: release.wait(5) and "done"))
+        # the loop keeps serving other coroutines while the job blocks its worker
+        await asyncio.sleep(0.05)
+        assert not job.done()
+        release.set()
+        return await job
+
+    try:
+        assert asyncio.run(scenario()) == "done"
+        stats = executor.stats()
+        assert stats["completed"] == 1 and stats["running"] == 0 and stats["queued"] == 0
+        assert stats["avg_run_ms"] >= 40
+    finally:
+        executor.shutdown()
+
+
+def test_executor_rejects_when_queue_is_full():
+    executor = InferenceExecutor(max_concurrency=1, max_queue=1)
+    release = threading.Event()
+    try:
+        running = executor.submit(release.wait, 5)
+        queued = executor.submit(lambda: "queued")
+        with pytest.raises(ExecutorBusyError):
+            executor.submit(lambda: "rejected")
+        release.set()
+        assert running.result(timeout=5) is True
+        assert queued.result(timeout=5) == "queued"
+        stats = executor.stats()
+        assert stats["rejected"] == 1 and stats["completed"] == 2
+        # the queued job waited for the first one
+        assert stats["max_queue_wait_ms"] > 0
+    finally:
+        executor.shutdown()
+
+
+def test_executor_frees_slots_of_cancelled_and_failed_jobs():
+    executor = InferenceExecutor(max_concurrency=1, max_queue=1)
+    release = threading.Event()
+    try:
+        running = executor.submit(release.wait, 5)
+        queued = executor.submit(lambda: "never")
+        assert queued.cancel()
+        failing = executor.submit(lambda: 1 / 0)
+        release.set()
+        running.result(timeout=5)
+        with pytest.raises(ZeroDivisionError):
+            failing.result(timeout=5)
+        stats = executor.stats()
+        assert stats["queued"] == 0 and stats["running"] == 0
+        assert stats["failed"] == 1
+    finally:
+        executor.shutdown()
@@ -0,0 +1,120 @@
+import re
+import time
+
+import pytest
+
+from src.common import metrics
+from src.common.batching import MicroBatcher
+from src.common.executor import InferenceExecutor
+from src.common.metrics import Histogram, MetricsRegistry
+
+from conftest import generate_tiny, speech_only_head
+
+
+@pytest.fixture
+def enabled_metrics():
+    previous = metrics.REGISTRY.enabled, dict(metrics.REGISTRY.const_labels)
+    metrics.configure(enabled=True, service="test", backend="fake")
+    yield
+    metrics.REGISTRY.enabled, metrics.REGISTRY.const_labels = previous
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    hist = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        hist.observe(value, stage="prefill")
+    registry.const_labels = {"service": "tts"}
+
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{service="tts",stage="prefill",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{service="tts",stage="prefill",le="1"} 3' in text
+    assert 'latency_seconds_bucket{service="tts",stage="prefill",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{service="tts",stage="prefill"} 4' in text
+    assert 'latency_seconds_sum{service="tts",stage="prefill"} 6.05' in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("events_total", "Events", ("name",)).inc(name='a "b"\n')
+    assert 'events_total{name="a \\"b\\"\\n"} 1' in registry.render()
+
+
+def test_disabled_hooks_record_nothing():
+    previous = metrics.REGISTRY.enabled
+    metrics.configure(enabled=False)
+    try:
+        before = metrics.STAGE_SECONDS.snapshot(stage="disabled_stage")["count"]
+        with metrics.stage("disabled_stage"):
+            pass
+        metrics.observe_stage("disabled_stage", 1.0)
+        assert metrics.stage("a") is metrics.stage("b")
+        assert metrics.stage_observer() is None
+        assert metrics.STAGE_SECONDS.snapshot(stage="disabled_stage")["count"] == before
+    finally:
+        metrics.REGISTRY.enabled = previous
+
+
+def test_stage_timer_and_rates(enabled_metrics):
+    before = metrics.STAGE_SECONDS.snapshot(stage="unit_stage")
+    with metrics.stage("unit_stage"):
+        time.sleep(0.01)
+    after = metrics.STAGE_SECONDS.snapshot(stage="unit_stage")
+    assert after["count"] == before["count"] + 1
+    assert after["sum"] - before["sum"] >= 0.01
+
+    tokens = metrics.GENERATED_TOKENS.value()
+    metrics.observe_tokens(50, 0.5)
+    metrics.observe_rtf(0.5, 2.0)
+    assert metrics.GENERATED_TOKENS.value() == tokens + 50
+    text = metrics.render()
+    assert re.search(r'inference_tokens_per_second_bucket\{backend="fake",service="test",le="100"\} [1-9]', text)
+    assert re.search(r'inference_real_time_factor_bucket\{backend="fake",service="test",le="0.3"\} [1-9]', text)
+
+
+def test_queue_wait_is_recorded_by_executor_and_batcher(enabled_metrics):
+    before = metrics.STAGE_SECONDS.snapshot(stage="queue_wait")["count"]
+    executor = InferenceExecutor(max_concurrency=1, max_queue=4)
+    batcher = MicroBatcher(lambda items: items, max_batch_size=2, window_ms=5)
+    try:
+        assert executor.submit(lambda: 1).result(timeout=5) == 1
+        assert batcher.submit("a").result(timeout=5) == "a"
+    finally:
+        executor.shutdown()
+        batcher.close()
+    assert metrics.STAGE_SECONDS.snapshot(stage="queue_wait")["count"] == before + 2
+
+
+def test_generate_reports_stages(tiny_vibevoice, tiny_tokenizer):
+    speech_only_head(tiny_vibevoice, tiny_tokenizer)
+    seen = {}
+    generate_tiny(tiny_vibevoice, tiny_tokenizer, stage_observer=lambda s, t: seen.setdefault(s, []).append(t))
+
+    expected = {"prefill", "lm_forward", "lm_negative_forward", "diffusion", "acoustic_decode", "semantic_encode"}
+    assert set(seen) == expected
+    assert len(seen["prefill"]) == 1
+    assert len(seen["diffusion"]) == len(seen["acoustic_decode"]) == len(seen["semantic_encode"]) > 0
+    assert all(t >= 0 for times in seen.values() for t in times)
+
+
+def test_batch_synthesis_observes_a_plausible_real_time_factor(enabled_metrics):
+    from benchmarks.fake_backends import TinyVibeVoiceBackend
+
+    backend = TinyVibeVoiceBackend(segment_max_chars=40, segment_batch_size=2)
+    before = metrics.REAL_TIME_FACTOR.snapshot()
+    start = time.perf_counter()
+    audios = backend.synthesize_batch([("Hello there. " * 6, "a"), ("Hi.", "b")])
+    wall = time.perf_counter() - start
+    after = metrics.REAL_TIME_FACTOR.snapshot()
+
+    assert after["count"] == before["count"] + 2
+    # each sample is the batch's processing time over that request's audio length
+    bound = sum(wall / (audio.shape[-1] / backend.sample_rate) for audio in audios)
+    assert 0 < after["sum"] - before["sum"] <= bound
+
+
+def test_values_above_the_last_bucket_land_in_inf():
+    hist = Histogram("h", "h", buckets=(1.0,))
+    hist.observe(1e9)
+    assert hist.snapshot() == {"count": 1, "sum": 1e9}
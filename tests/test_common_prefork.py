@@ -0,0 +1,172 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.common import prefork
+from src.common.prefork import Balancer, InflightCounter, PreforkServer, plan_threads
+
+
+def test_threads_are_split_over_disjoint_cores():
+    threads, cores = plan_threads(4, cores=range(8))
+    assert threads == 2
+    assert cores == [[0, 1], [2, 3], [4, 5], [6, 7]]
+    # not enough cores for every worker: keep the thread count, no affinity
+    assert plan_threads(4, threads=4, cores=range(8)) == (4, [None] * 4)
+
+
+def test_balancer_prefers_the_least_loaded_worker():
+    inflight = [2, 0, 1]
+    balancer = Balancer("test", None, ["a", "b", "c"], inflight, state=None)
+    assert balancer.order()[0] == 1
+    inflight[1] = 3
+    assert balancer.order() == [2, 0, 1]
+    # idle workers take turns
+    inflight[:] = [0, 0, 0]
+    assert {balancer.order()[0] for _ in range(3)} == {0, 1, 2}
+
+
+def test_inflight_counter_tracks_running_requests():
+    counters = [0, 0]
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(counters[1])
+
+    asyncio.run(InflightCounter(app, counters, 1)({"type": "http"}, None, None))
+    assert seen == [1] and counters == [0, 0]
+
+
+def test_peers_are_not_asked_outside_a_prefork_worker():
+    assert prefork.worker_info() is None
+    assert asyncio.run(prefork.forward_to_peers("POST", "/v1/tts/cancel/x", {})) is False
+
+
+def test_workers_forked_after_warmup_do_not_hang():
+    # a worker forked after a multi-threaded OpenMP region hangs in its first op with its own thread count
+    script = textwrap.dedent(
+        """
+        import os, torch
+        from src.common import prefork
+
+        torch.set_num_threads(4)  # torch's default on a four-core host
+        prefork.single_threaded_master()
+        (torch.randn(512, 512) @ torch.randn(512, 512)).sum()  # load + warmup
+        pid = os.fork()
+        if pid == 0:
+            prefork.pin_worker(2)
+            (torch.randn(512, 512) @ torch.randn(512, 512)).sum()
+            os._exit(0)
+        assert os.waitpid(pid, 0)[1] == 0
+        """
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True, timeout=60)
+
+
+class _SlowStartup:
+    def wait(self, timeout=None):
+        time.sleep(1.0)
+        return True
+
+
+async def _app(scope, receive, send):
+    await asyncio.sleep(0.3)
+    body = json.dumps({"pid": os.getpid(), "worker": prefork.worker_info()["index"]}).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"%d" % len(body))]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _serve(app, sock):
+    """Minimal HTTP/1.0 server calling the ASGI app once per connection (uvicorn stands in for it in production)."""
+
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await app({"type": "http"}, None, send)
+        writer.write(b"HTTP/1.0 %d OK\r\n\r\n" % messages[0]["status"] + messages[1]["body"])
+        await writer.drain()
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, sock=sock)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def _get(port, path="/"):
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as conn:
+        conn.sendall(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+        data = b""
+        while chunk := conn.recv(4096):
+            data += chunk
+    head, _, body = data.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def _wait_until_ready(port, timeout_s=20.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            status, body = _get(port)
+            if status == 200:
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.1)
+    raise AssertionError("prefork server did not become ready")
+
+
+@pytest.fixture
+def port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_workers_share_the_load_and_are_restarted(port):
+    server = PreforkServer("Test", _app, _SlowStartup(), workers=2, host="127.0.0.1", port=port, serve=_serve)
+    master = multiprocessing.get_context("fork").Process(target=server.run)
+    master.start()
+    try:
+        # the balancer answers while the master is still loading
+        for _ in range(50):
+            try:
+                assert _get(port, "/health") == (200, {"status": "healthy", "service": "test", "state": "loading"})
+                break
+            except OSError:
+                time.sleep(0.05)
+        assert _get(port, "/v1/anything")[0] == 503
+        _wait_until_ready(port)
+
+        with ThreadPoolExecutor(4) as pool:
+            results = [body for _, body in pool.map(lambda _: _get(port), range(4))]
+        pids = {r["pid"] for r in results}
+        assert {r["worker"] for r in results} == {0, 1}
+        assert len(pids) == 2 and master.pid not in pids
+
+        os.kill(results[0]["pid"], signal.SIGKILL)
+        time.sleep(0.2)
+        with ThreadPoolExecutor(4) as pool:
+            results = [body for _, body in pool.map(lambda _: _get(port), range(4))]
+        assert {r["worker"] for r in results} == {0, 1}
+    finally:
+        master.terminate()
+        master.join(30)
+    assert master.exitcode == 0
+    assert not os.path.exists(server.socket_dir)
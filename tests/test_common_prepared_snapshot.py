@@ -0,0 +1,105 @@
+import os
+
+import pytest
+import torch
+
+from src.common.prepared_snapshot import (
+    PreparedSnapshotCache,
+    mmap_safetensors,
+    prepared_snapshot_key,
+    snapshot_revision,
+)
+
+from conftest import build_tiny_vibevoice, generate_tiny, speech_only_head
+
+
+def _build(path):
+    from vibevoice.modular.configuration_vibevoice import VibeVoiceConfig
+    from vibevoice.modular.modeling_vibevoice_inference import VibeVoiceForConditionalGenerationInference
+
+    return VibeVoiceForConditionalGenerationInference._from_config(VibeVoiceConfig.from_pretrained(path)).eval()
+
+
+def test_key_depends_on_revision_dtype_and_adapters(tmp_path):
+    adapter = tmp_path / "adapter"
+    adapter.mkdir()
+    (adapter / "adapter_config.json").write_text("{}")
+
+    base = prepared_snapshot_key("org/model", "abc", torch.float32)
+    assert base == prepared_snapshot_key("org/model", "abc", torch.float32)
+    assert base.startswith("org__model-")
+    others = {
+        prepared_snapshot_key("org/model", "def", torch.float32),
+        prepared_snapshot_key("org/model", "abc", torch.bfloat16),
+        prepared_snapshot_key("org/model", "abc", torch.float32, [str(adapter)]),
+    }
+    assert base not in others and len(others) == 3
+
+
+def test_revision_is_the_hf_commit_or_a_fingerprint(tmp_path):
+    snapshot = tmp_path / "models--org--model" / "snapshots" / "0123abcd"
+    snapshot.mkdir(parents=True)
+    assert snapshot_revision(str(snapshot)) == "0123abcd"
+
+    local = tmp_path / "local"
+    local.mkdir()
+    (local / "config.json").write_text("{}")
+    first = snapshot_revision(str(local))
+    (local / "model.safetensors").write_bytes(b"weights")
+    assert snapshot_revision(str(local)) != first
+
+
+def test_roundtrip_is_memory_mapped_and_keeps_tied_weights(tmp_path, tiny_vibevoice, tiny_tokenizer):
+    speech_only_head(tiny_vibevoice, tiny_tokenizer)
+    cache = PreparedSnapshotCache(str(tmp_path), max_shard_bytes=64 << 10)
+    cache.save("tiny", tiny_vibevoice, metadata={"dtype": "float32"})
+    assert cache.has("tiny") and not cache.has("other")
+    index = cache.metadata("tiny")
+    assert len(index["shards"]) > 1 and index["dtype"] == "float32"
+    assert [p for p in os.listdir(tmp_path) if p.startswith(".")] == []
+
+    loaded = cache.load_model("tiny", _build)
+    expected = tiny_vibevoice.state_dict()
+    state = loaded.state_dict()
+    assert state.keys() == expected.keys()
+    assert all(torch.equal(state[k], expected[k]) for k in expected)
+    assert not any(p.is_meta for p in loaded.parameters())
+    # the replaced head stays untied even though the config asks for tied embeddings
+    assert loaded.lm_head.weight is not loaded.model.language_model.embed_tokens.weight
+
+    with torch.no_grad():
+        want = generate_tiny(tiny_vibevoice, tiny_tokenizer)
+        got = generate_tiny(loaded, tiny_tokenizer)
+    for a, b in zip(want.speech_outputs, got.speech_outputs):
+        assert torch.allclose(a, b)
+
+
+def test_tied_weights_are_stored_once(tmp_path, tiny_vibevoice):
+    tiny_vibevoice.tie_weights()
+    cache = PreparedSnapshotCache(str(tmp_path))
+    cache.save("tiny", tiny_vibevoice)
+    assert cache.metadata("tiny")["aliases"] == {"lm_head.weight": "model.language_model.embed_tokens.weight"}
+    loaded = cache.load_model("tiny", _build)
+    assert loaded.lm_head.weight is loaded.model.language_model.embed_tokens.weight
+
+
+def test_mmap_tensors_are_copy_on_write(tmp_path):
+    from safetensors.torch import save_file
+
+    path = str(tmp_path / "w.safetensors")
+    save_file({"w": torch.arange(6, dtype=torch.float32).view(2, 3), "empty": torch.zeros(0)}, path)
+    tensors = mmap_safetensors(path)
+    assert tensors["w"].shape == (2, 3) and tensors["empty"].numel() == 0
+    tensors["w"].zero_()
+    assert torch.equal(mmap_safetensors(path)["w"], torch.arange(6, dtype=torch.float32).view(2, 3))
+
+
+def test_failed_save_leaves_no_partial_snapshot(tmp_path):
+    cache = PreparedSnapshotCache(str(tmp_path))
+
+    def broken(path):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        cache.save("tiny", build_tiny_vibevoice(), save_files=broken)
+    assert os.listdir(tmp_path) == []
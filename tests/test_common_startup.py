@@ -0,0 +1,61 @@
+import threading
+import time
+
+from src.common.startup import ServiceStartup, StartupTimeline, download_snapshot, process_start_time
+
+
+def test_overlapping_phases_are_not_counted_twice():
+    timeline = StartupTimeline(start=100.0)
+    timeline.record("import", 100.0, 102.0)
+    timeline.record("weight_load", 103.0, 106.0, "processor")
+    timeline.record("download", 102.0, 105.0)
+    timeline.record("weight_load", 105.0, 110.0, "model")
+
+    assert timeline.phases() == {"import": 2.0, "download": 3.0, "weight_load": 7.0}
+    assert timeline.summary() == "import 2.0s, download 3.0s, weight_load 7.0s (processor, model)"
+    assert [e["phase"] for e in timeline.as_dict()["entries"]] == ["import", "download", "weight_load", "weight_load"]
+
+
+def test_process_start_time_is_in_the_past():
+    assert process_start_time() <= time.time()
+
+
+def test_local_directories_are_not_downloaded(tmp_path):
+    assert download_snapshot(str(tmp_path)) == str(tmp_path)
+
+
+def test_startup_loads_in_the_background_then_warms_up():
+    release = threading.Event()
+    calls = []
+
+    def load():
+        release.wait(5)
+        calls.append("load")
+
+    startup = ServiceStartup("test", load, warmup=lambda: calls.append("warmup"), timeline=StartupTimeline())
+    startup.start()
+    assert startup.state == "loading" and not startup.ready
+    assert startup.status()["ready"] is False
+
+    release.set()
+    assert startup.wait(5)
+    assert calls == ["load", "warmup"]
+    assert startup.status()["state"] == "ready"
+    assert set(startup.timeline.phases()) == {"import", "warmup"}
+
+
+def test_failed_load_is_reported_and_failed_warmup_is_not_fatal():
+    def load():
+        raise RuntimeError("no weights")
+
+    failed = ServiceStartup("test", load, timeline=StartupTimeline()).start()
+    assert not failed.wait(5)
+    assert failed.failed
+    assert failed.status()["error"] == "RuntimeError: no weights"
+
+    def warmup():
+        raise RuntimeError("warmup broke")
+
+    warm = ServiceStartup("test", lambda: None, warmup=warmup, timeline=StartupTimeline()).start()
+    assert warm.wait(5)
+    assert warm.state == "ready"
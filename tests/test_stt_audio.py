@@ -0,0 +1,39 @@
+import io
+
+import numpy as np
+import pytest
+
+sf = pytest.importorskip("soundfile")
+pytest.importorskip("torchaudio")
+
+from src.stt.audio import _resampler, decode_audio
+
+
+def _wav_bytes(audio: np.ndarray, sample_rate: int) -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, audio, sample_rate, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def test_decode_audio_downmixes_and_resamples_in_memory():
+    t = np.arange(48000) / 48000
+    tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+    stereo = np.stack([tone, tone], axis=1)
+
+    audio = decode_audio(_wav_bytes(stereo, 48000), sample_rate=16000)
+
+    assert audio.dtype == np.float32 and audio.ndim == 1
+    assert abs(len(audio) - 16000) <= 1
+    np.testing.assert_allclose(np.abs(audio[1000:-1000]).max(), 0.5, atol=0.01)
+
+
+def test_decode_audio_reuses_resampler_and_skips_matching_rate():
+    _resampler.cache_clear()
+    clip = _wav_bytes(np.zeros(800, dtype=np.float32), 8000)
+    decode_audio(clip, sample_rate=16000)
+    decode_audio(clip, sample_rate=16000)
+    assert _resampler.cache_info().hits == 1
+
+    native = decode_audio(_wav_bytes(np.zeros(1600, dtype=np.float32), 16000), sample_rate=16000)
+    assert len(native) == 1600
+    assert _resampler.cache_info().currsize == 1
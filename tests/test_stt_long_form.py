@@ -0,0 +1,45 @@
+import numpy as np
+
+from src.stt.audio import split_on_silence
+from src.stt.moonshine_backend import _merge_overlap
+
+SR = 16000
+
+
+def _speech(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def test_split_on_silence_cuts_at_pauses_without_overlap():
+    pause = np.zeros(SR // 2, dtype=np.float32)
+    audio = np.concatenate([_speech(8), pause, _speech(8), pause, _speech(8)])
+
+    windows = split_on_silence(audio, SR, max_window_s=10, overlap_s=1)
+
+    assert len(windows) == 3
+    assert windows[0][0] == 0 and windows[-1][1] == len(audio)
+    for (_, end), (start, _) in zip(windows, windows[1:]):
+        assert end == start
+        # the cut lies inside the pause
+        assert np.abs(audio[start - 100 : start + 100]).max() == 0
+    assert all(end - start <= 10 * SR for start, end in windows)
+
+
+def test_split_on_silence_overlaps_when_there_is_no_pause():
+    audio = _speech(25)
+    windows = split_on_silence(audio, SR, max_window_s=10, overlap_s=1)
+
+    assert windows[-1][1] == len(audio)
+    assert all(end - start <= 10 * SR for start, end in windows)
+    for (_, end), (start, _) in zip(windows, windows[1:]):
+        assert abs((end - start) - SR) <= 1
+
+
+def test_split_on_silence_keeps_short_audio_whole():
+    assert split_on_silence(_speech(3), SR, max_window_s=10) == [(0, 3 * SR)]
+
+
+def test_merge_overlap_drops_repeated_words():
+    assert _merge_overlap("we went to the market and", "The market, and bought apples") == "bought apples"
+    assert _merge_overlap("hello there", "general kenobi") == "general kenobi"
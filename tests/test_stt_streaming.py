@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.stt.streaming import SpeechSegmenter
+
+SR = 16000
+
+
+def _tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+def test_segmenter_closes_segments_after_silence_across_push_boundaries():
+    segmenter = SpeechSegmenter(sample_rate=SR, min_silence_ms=300, pad_ms=90)
+    stream = np.concatenate([_silence(0.5), _tone(1.0), _silence(0.6), _tone(0.5), _silence(0.1)])
+
+    closed = []
+    # odd piece sizes so that frames straddle pushes
+    for i in range(0, len(stream), 1234):
+        closed.extend(segmenter.push(stream[i : i + 1234]))
+
+    assert len(closed) == 1
+    first = closed[0]
+    assert abs(first.start - (0.5 - 0.09)) < 0.04
+    assert abs(first.end - (1.5 + 0.09)) < 0.04
+    assert segmenter.in_speech
+
+    last = segmenter.flush()
+    assert last is not None and abs(last.start - (2.1 - 0.09)) < 0.04
+    assert not segmenter.in_speech and segmenter.flush() is None
+
+
+def test_segmenter_drops_clicks_and_splits_long_speech():
+    segmenter = SpeechSegmenter(sample_rate=SR, min_speech_ms=150, max_segment_s=1.0)
+    assert segmenter.push(np.concatenate([_silence(0.2), _tone(0.06), _silence(1.0)])) == []
+
+    closed = segmenter.push(_tone(2.5))
+    assert [round(len(s.audio) / SR, 2) for s in closed] == [0.99, 0.99]
+    assert segmenter.current() is not None
+
+
+def test_segmenter_ignores_quiet_noise():
+    segmenter = SpeechSegmenter(sample_rate=SR, threshold_db=-40)
+    rng = np.random.default_rng(0)
+    noise = (0.001 * rng.standard_normal(SR * 2)).astype(np.float32)
+    assert segmenter.push(noise) == []
+    assert not segmenter.in_speech
+
+
+def test_segmenter_runs_at_the_client_rate():
+    # the stream service segments at the client's rate and resamples whole segments for the model
+    sr = 44100
+    t = np.arange(sr) / sr
+    tone = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    stream = np.concatenate([np.zeros(sr // 2, dtype=np.float32), tone, np.zeros(sr, dtype=np.float32)])
+    segmenter = SpeechSegmenter(sample_rate=sr, min_silence_ms=300, pad_ms=90)
+    closed = [s for i in range(0, len(stream), 882) for s in segmenter.push(stream[i : i + 882])]
+
+    assert len(closed) == 1
+    segment = closed[0]
+    assert abs(segment.start - (0.5 - 0.09)) < 0.04 and abs(segment.end - (1.5 + 0.09)) < 0.04
+    assert len(segment.audio) == round((segment.end - segment.start) * sr)
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.stt.whisper_backend import WhisperBackend
+
+vad = pytest.importorskip("faster_whisper.vad")
+
+SR = 16000
+LANGUAGES = {1.0: "en", 2.0: "de", 3.0: "fr"}
+
+
+class _Model:
+    """Stands in for WhisperModel: a clip's language is given by its sample value."""
+
+    model = SimpleNamespace(is_multilingual=True)
+
+    def __init__(self, chunk_length=30):
+        self.feature_extractor = SimpleNamespace(n_samples=30 * SR, chunk_length=chunk_length)
+
+    def detect_language(self, audio):
+        return LANGUAGES[float(audio[0])], 0.9, []
+
+
+class _Pipeline:
+    """Stands in for BatchedInferencePipeline: one segment per clip timestamp, tagged with the decode language."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, language=None, clip_timestamps=(), **kwargs):
+        self.calls.append((language, [(ts["start"], ts["end"]) for ts in clip_timestamps]))
+        segments = [
+            SimpleNamespace(
+                start=ts["start"],
+                end=ts["end"],
+                text=f" {language}:{LANGUAGES[float(audio[int(ts['start'] * SR)])]}",
+                tokens=[0],
+            )
+            for ts in clip_timestamps
+        ]
+        return iter(segments), SimpleNamespace(language=language, language_probability=1.0)
+
+
+def _vad(audio, *args, **kwargs):
+    # three 0.25 s pieces with pauses between them; clips of value 3.0 are silence
+    if audio[0] == 3.0:
+        return []
+    return [{"start": start, "end": start + SR // 4} for start in (0, 6000, 12000)]
+
+
+def _backend(monkeypatch, chunk_length=30):
+    monkeypatch.setattr(vad, "get_speech_timestamps", _vad)
+    backend = WhisperBackend.__new__(WhisperBackend)
+    backend.model, backend.batched = _Model(chunk_length), _Pipeline()
+    backend.sample_rate, backend.batch_size = SR, 8
+    return backend
+
+
+def test_batched_clips_are_decoded_in_their_own_language(monkeypatch):
+    backend = _backend(monkeypatch)
+    clips = [np.full(SR, value, dtype=np.float32) for value in (1.0, 2.0, 1.0, 3.0)]
+    results = backend.transcribe_batch(clips)
+
+    # the silent clip is not decoded but reports its language, like transcribe() does
+    assert [r["language"] for r in results] == ["en", "de", "en", "fr"]
+    assert [r["text"] for r in results] == ["en:en", "de:de", "en:en", ""]
+    # every clip is decoded with its own language, clips of one language share a call,
+    # and the pieces of a clip are merged into one window
+    assert sorted(backend.batched.calls) == [("de", [(0.0, 0.75)]), ("en", [(0.0, 0.75), (0.75, 1.5)])]
+
+
+def test_merged_spans_stay_within_the_chunk_length(monkeypatch):
+    backend = _backend(monkeypatch, chunk_length=0.5)
+    result = backend.transcribe_batch([np.full(SR, 1.0, dtype=np.float32)])[0]
+    assert backend.batched.calls == [("en", [(0.0, 0.5), (0.5, 0.75)])]
+    assert result["text"] == "en:en en:en"
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from src.common.cancellation import RequestCancelled
+from src.tts.audio_cache import SynthesisCache, synthesis_cache_key
+
+
+def _factory(value: bytes, calls: list, delay: float = 0.0):
+    async def make():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+
+    return make
+
+
+def test_audio_cache_single_flight_for_concurrent_requests():
+    cache = SynthesisCache(max_bytes=1024)
+    calls = []
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_create("k", _factory(b"audio", calls, 0.05)) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [b"audio"] * 5
+    assert calls == [b"audio"]
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 4
+    assert stats["hit_rate"] == 0.8
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled():
+    cache = SynthesisCache(max_bytes=1024)
+    calls = []
+
+    async def cancelled():
+        calls.append("leader")
+        await asyncio.sleep(0.05)
+        # the backend noticed the leader's cancel token before the task itself was cancelled
+        raise RequestCancelled("synthesis was cancelled")
+
+    async def scenario():
+        leader = asyncio.ensure_future(cache.get_or_create("k", cancelled))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(cache.get_or_create("k", _factory(b"audio", calls)))
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(scenario())
+    assert isinstance(leader, RequestCancelled)
+    assert follower == b"audio" and calls == ["leader", b"audio"]
+
+
+def test_audio_cache_evicts_by_bytes():
+    cache = SynthesisCache(max_bytes=10)
+    calls = []
+
+    async def scenario():
+        await cache.get_or_create("a", _factory(b"aaaa", calls))
+        await cache.get_or_create("b", _factory(b"bbbb", calls))
+        await cache.get_or_create("a", _factory(b"aaaa", calls))  # hit, "b" is least recently used
+        await cache.get_or_create("c", _factory(b"cccc", calls))  # 12 bytes > 10, evicts "b"
+        await cache.get_or_create("b", _factory(b"bbbb", calls))
+        await cache.get_or_create("big", _factory(b"x" * 11, calls))  # larger than the budget, not kept
+
+    asyncio.run(scenario())
+    assert calls == [b"aaaa", b"bbbb", b"cccc", b"bbbb", b"x" * 11]
+    stats = cache.stats()
+    assert stats["bytes"] <= 10 and stats["hits"] == 1
+
+
+def test_audio_cache_disk_tier_and_failures(tmp_path):
+    calls = []
+    asyncio.run(SynthesisCache(max_bytes=0, cache_dir=str(tmp_path)).get_or_create("k", _factory(b"wav", calls)))
+
+    restarted = SynthesisCache(max_bytes=1024, cache_dir=str(tmp_path))
+    assert asyncio.run(restarted.get_or_create("k", _factory(b"other", calls))) == b"wav"
+    assert calls == [b"wav"] and restarted.stats()["disk_hits"] == 1
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(restarted.get_or_create("bad", fail))
+    # failures are not cached
+    assert asyncio.run(restarted.get_or_create("bad", _factory(b"ok", calls))) == b"ok"
+
+
+def test_synthesis_cache_key_normalizes_text_only(tmp_path):
+    voice = tmp_path / "voice.wav"
+    voice.write_bytes(b"RIFF voice")
+    key = synthesis_cache_key("Hallo  Welt\n", str(voice), model="m", format="wav")
+
+    assert key == synthesis_cache_key(" Hallo Welt", str(voice), format="wav", model="m")
+    assert key != synthesis_cache_key("hallo welt", str(voice), model="m", format="wav")
+    assert key != synthesis_cache_key("Hallo Welt", str(voice), model="m", format="flac")
+    voice.write_bytes(b"RIFF other voice")
+    assert key != synthesis_cache_key("Hallo Welt", str(voice), model="m", format="wav")
@@ -0,0 +1,46 @@
+import base64
+import io
+
+import numpy as np
+import pytest
+import torch
+
+sf = pytest.importorskip("soundfile")
+
+from src.tts.audio_format import encode_audio, encode_base64_wav, normalize_format, pcm16_bytes
+
+SR = 24000
+
+
+def _tone() -> torch.Tensor:
+    t = torch.arange(SR) / SR
+    return (0.5 * torch.sin(2 * torch.pi * 440 * t)).unsqueeze(0)
+
+
+def test_pcm16_bytes_clips_and_flattens():
+    pcm = np.frombuffer(pcm16_bytes(torch.tensor([[0.0, 0.5, 2.0, -2.0]])), dtype="<i2")
+    assert pcm.tolist() == [0, 16383, 32767, -32767]
+
+
+@pytest.mark.parametrize("fmt", ["wav", "flac"])
+def test_lossless_formats_roundtrip(fmt):
+    audio = _tone()
+    decoded, sr = sf.read(io.BytesIO(encode_audio(audio, SR, fmt)), dtype="float32")
+    assert sr == SR
+    np.testing.assert_allclose(decoded, audio.reshape(-1).numpy(), atol=1e-4)
+
+
+def test_ogg_is_much_smaller_than_wav():
+    audio = _tone()
+    ogg = encode_audio(audio, SR, "opus")
+    decoded, sr = sf.read(io.BytesIO(ogg), dtype="float32")
+    assert len(ogg) * 5 < len(encode_audio(audio, SR, "wav"))
+    assert abs(len(decoded) / sr - 1.0) < 0.05
+
+
+def test_base64_wav_and_unknown_format():
+    wav = base64.b64decode(encode_base64_wav(_tone().numpy(), SR))
+    assert wav[:4] == b"RIFF"
+    assert normalize_format("OPUS") == "ogg"
+    with pytest.raises(ValueError):
+        normalize_format("mp3")
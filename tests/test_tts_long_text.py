@@ -0,0 +1,95 @@
+import re
+
+import torch
+
+from src.tts.long_text import Crossfader, crossfade_concat, split_text
+from src.tts.vibevoice_backend import _SPEAKER_TAG, _SegmentStreamer
+
+TEXT = (
+    "The quick brown fox jumps over the lazy dog. It was a sunny day! Was it? "
+    "Nobody knew, and nobody cared, because the fox was already gone. "
+    '"Run," said the dog. The end.'
+)
+
+
+def test_short_text_is_one_segment():
+    assert split_text("  Hello there. How are you?  ", max_chars=100) == ["Hello there. How are you?"]
+    assert split_text("   ", max_chars=100) == []
+
+
+def test_segments_are_sentence_aligned_and_bounded():
+    segments = split_text(TEXT, max_chars=60)
+    assert len(segments) > 1
+    assert all(len(s) <= 60 for s in segments)
+    assert " ".join(segments) == TEXT
+    assert segments[0] == "The quick brown fox jumps over the lazy dog."
+
+
+def test_long_sentence_falls_back_to_clauses_and_words():
+    sentence = "one, " + " ".join(["word"] * 30) + "."
+    segments = split_text(sentence, max_chars=40)
+    assert segments[0].startswith("one,")
+    assert all(len(s) <= 40 for s in segments)
+    assert " ".join(segments).split() == sentence.split()
+
+
+def test_cjk_sentences_split_without_spaces():
+    text = "今天天气很好。我们去公园吧！好的。" * 4
+    segments = split_text(text, max_chars=20)
+    assert all(len(s) <= 20 for s in segments)
+    assert "".join(s.replace(" ", "") for s in segments) == text
+
+
+def test_speaker_tag_is_repeated_on_every_segment():
+    script = "Speaker 1: " + TEXT + "\nSpeaker 2: Short reply."
+    segments = split_text(script, max_chars=80, line_prefix=_SPEAKER_TAG)
+    assert len(segments) > 2
+    for segment in segments:
+        for line in segment.splitlines():
+            assert re.match(r"Speaker [12]: \S", line)
+        assert len(segment) <= 80
+    assert segments[-1].endswith("Speaker 2: Short reply.")
+
+
+def test_crossfade_concat_blends_boundaries():
+    a, b = torch.ones(100), -torch.ones(100)
+    out = crossfade_concat([a, b], fade_samples=10)
+    assert out.shape == (1, 190)
+    assert torch.all(out[0, :90] == 1) and torch.all(out[0, 100:] == -1)
+    fade = out[0, 90:100]
+    assert torch.all(fade[1:] < fade[:-1])  # monotonic ramp from a to b
+
+
+def test_streamed_chunks_match_whole_segments():
+    torch.manual_seed(0)
+    segments = [torch.randn(700), torch.randn(500), torch.randn(300)]
+    fader = Crossfader(64)
+    parts = []
+    for segment in segments:
+        fader.start_segment()
+        for chunk in segment.split(96):
+            parts.append(fader.push(chunk))
+    parts.append(fader.flush())
+    torch.testing.assert_close(torch.cat(parts).unsqueeze(0), crossfade_concat(segments, 64))
+
+
+class _Outer:
+    def __init__(self):
+        self.finished_flags = [False]
+        self.chunks = []
+
+    def put(self, audio_chunks, sample_indices):
+        self.chunks.append(audio_chunks[0])
+
+
+def test_segment_streamer_forwards_without_ending_outer():
+    outer, fader = _Outer(), Crossfader(10)
+    streamer = _SegmentStreamer(outer, fader)
+    streamer.put(torch.ones(1, 1, 50), torch.tensor([0]))
+    streamer.end()
+    assert streamer.finished_flags == [True]
+    assert outer.finished_flags == [False]
+    assert sum(c.numel() for c in outer.chunks) == 40
+
+    outer.finished_flags[0] = True
+    assert _SegmentStreamer(outer, fader).finished_flags == [True]
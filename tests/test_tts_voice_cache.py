@@ -0,0 +1,68 @@
+import numpy as np
+import torch
+
+from src.tts.voice_cache import VoicePrompt, VoicePromptCache, voice_cache_key
+
+
+def _prompt(value: float) -> VoicePrompt:
+    return VoicePrompt(
+        waveform=np.full(16, value, dtype=np.float32),
+        acoustic_latents=torch.full((2, 4), value),
+        speech_embeds=torch.full((2, 8), value),
+    )
+
+
+def test_voice_cache_lru_eviction():
+    cache = VoicePromptCache(max_entries=2)
+    calls = []
+
+    def factory(v):
+        def make():
+            calls.append(v)
+            return _prompt(v)
+
+        return make
+
+    cache.get_or_create("a", factory(1.0))
+    cache.get_or_create("b", factory(2.0))
+    cache.get_or_create("a", factory(1.0))  # hit, "b" becomes least recently used
+    cache.get_or_create("c", factory(3.0))  # evicts "b"
+    cache.get_or_create("b", factory(2.0))  # miss again
+
+    assert calls == [1.0, 2.0, 3.0, 2.0]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+    assert stats["entries"] == 2
+
+
+def test_voice_cache_disk_roundtrip(tmp_path):
+    first = VoicePromptCache(max_entries=4, cache_dir=str(tmp_path))
+    first.get_or_create("k", lambda: _prompt(0.5))
+
+    second = VoicePromptCache(max_entries=4, cache_dir=str(tmp_path))
+
+    def fail():
+        raise AssertionError("should have been loaded from disk")
+
+    entry = second.get_or_create("k", fail)
+    assert second.stats()["disk_hits"] == 1
+    assert np.array_equal(entry.waveform, np.full(16, 0.5, dtype=np.float32))
+    assert torch.equal(entry.speech_embeds, torch.full((2, 8), 0.5))
+
+
+def test_voice_cache_key_tracks_content_and_model(tmp_path):
+    wav = tmp_path / "voice.wav"
+    wav.write_bytes(b"RIFF-one")
+    key = voice_cache_key(str(wav), "model-a", "rev1", torch.float32)
+
+    assert key == voice_cache_key(str(wav), "model-a", "rev1", torch.float32)
+    assert key != voice_cache_key(str(wav), "model-a", "rev2", torch.float32)
+    assert key != voice_cache_key(str(wav), "model-a", "rev1", torch.bfloat16)
+
+    copy = tmp_path / "renamed.wav"
+    copy.write_bytes(b"RIFF-one")
+    assert key == voice_cache_key(str(copy), "model-a", "rev1", torch.float32)
+
+    copy.write_bytes(b"RIFF-two-changed")
+    assert key != voice_cache_key(str(copy), "model-a", "rev1", torch.float32)
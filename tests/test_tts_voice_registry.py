@@ -0,0 +1,182 @@
+import io
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.tts.audio_cache import synthesis_cache_key
+from src.tts.voice import VoiceRegistry
+
+
+class _Preprocess:
+    """Stands in for decode + resample + normalize: the file's bytes as a waveform."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(os.path.basename(path))
+        with open(path, "rb") as f:
+            data = f.read()
+        if data.startswith(b"broken"):
+            raise RuntimeError("not audio")
+        return np.frombuffer(data, dtype=np.uint8).astype(np.float32)
+
+
+def _registry(tmp_path, preprocess=None, **kwargs):
+    voices_dir = tmp_path / "voices"
+    voices_dir.mkdir(exist_ok=True)
+    kwargs.setdefault("default_voice_path", str(voices_dir / "anna.wav"))
+    if preprocess is not None:
+        kwargs.setdefault("prepared_dir", str(tmp_path / "prepared"))
+    return VoiceRegistry(str(voices_dir), preprocess=preprocess, sample_rate=8, **kwargs)
+
+
+def _touch(path, data=b"audio"):
+    path.write_bytes(data)
+    # a distinct mtime even on filesystems with coarse timestamps
+    stamp = time.time_ns() + 10**9
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_scan_indexes_voices_with_prompt_text_and_default(tmp_path):
+    voices = tmp_path / "voices"
+    voices.mkdir()
+    _touch(voices / "anna.wav")
+    _touch(voices / "ben.flac", b"other")
+    (voices / "ben.prompt.txt").write_text(" Hello there.\n")
+    (voices / "notes.txt").write_text("ignored")
+
+    registry = _registry(tmp_path).scan()
+    assert [v.name for v in registry.list()] == ["anna", "ben"]
+    ben = registry.get("ben")
+    assert ben.prompt_text == "Hello there." and ben.path == ben.source and not ben.preprocessed
+    # unknown names and "default" resolve to the default voice
+    assert registry.get("nobody").name == "anna" and registry.get().name == "anna"
+    assert registry.get("anna").digest != ben.digest
+
+    with pytest.raises(RuntimeError):
+        VoiceRegistry(str(tmp_path / "missing"), default_voice_path=None).scan().get()
+
+
+def test_voices_are_preprocessed_once_and_reused_across_starts(tmp_path):
+    (tmp_path / "voices").mkdir()
+    _touch(tmp_path / "voices" / "anna.wav", b"abcdefgh")
+    preprocess = _Preprocess()
+
+    voice = _registry(tmp_path, preprocess).scan().get("anna")
+    assert voice.preprocessed and voice.path == str(tmp_path / "prepared" / "anna.npy")
+    assert np.array_equal(np.load(voice.path), np.frombuffer(b"abcdefgh", dtype=np.uint8).astype(np.float32))
+    assert voice.duration_s == 1.0
+
+    # a restart decodes nothing; the digest (and so every cache key) is unchanged
+    again = _registry(tmp_path, preprocess).scan().get("anna")
+    assert preprocess.calls == ["anna.wav"] and again == voice
+    assert synthesis_cache_key("hi", again) == synthesis_cache_key("hi", voice)
+
+    # a changed file is preprocessed again, a removed one drops its prepared copy
+    _touch(tmp_path / "voices" / "anna.wav", b"changed!")
+    changed = _registry(tmp_path, preprocess).scan().get("anna")
+    assert preprocess.calls == ["anna.wav", "anna.wav"] and changed.digest != voice.digest
+    os.remove(tmp_path / "voices" / "anna.wav")
+    assert _registry(tmp_path, preprocess).scan().list() == []
+    assert not os.path.exists(voice.path)
+
+
+def test_undecodable_voice_is_skipped(tmp_path):
+    (tmp_path / "voices").mkdir()
+    _touch(tmp_path / "voices" / "anna.wav")
+    _touch(tmp_path / "voices" / "bad.wav", b"broken")
+    registry = _registry(tmp_path, _Preprocess()).scan()
+    assert [v.name for v in registry.list()] == ["anna"]
+
+
+def test_register_stores_and_preprocesses_an_upload(tmp_path):
+    preprocess = _Preprocess()
+    registry = _registry(tmp_path, preprocess).scan()
+
+    voice = registry.register("carla", b"uploaded", filename="take1.WAV", prompt_text="Guten Tag.")
+    assert voice.name == "carla" and voice.prompt_text == "Guten Tag." and voice.preprocessed
+    assert (tmp_path / "voices" / "carla.wav").read_bytes() == b"uploaded"
+    assert registry.get("carla") == voice
+    # the upload was decoded once, under a hidden name; the rescan reused it
+    assert len(preprocess.calls) == 1 and preprocess.calls[0].startswith(".upload.")
+    assert [p for p in os.listdir(tmp_path / "voices") if p.startswith(".")] == []
+
+    with pytest.raises(FileExistsError):
+        registry.register("carla", b"again")
+    replaced = registry.register("carla", b"new take", filename="carla.flac", replace=True)
+    assert replaced.source.endswith("carla.flac") and replaced.digest != voice.digest
+    assert replaced.prompt_text is None
+    assert sorted(os.listdir(tmp_path / "voices")) == ["carla.flac"]
+
+
+def test_scans_and_uploads_of_workers_sharing_the_directories_are_serialized(tmp_path):
+    # two registries on the same directories, as in two pre-forked workers (flock locks are per open file)
+    worker_a = _registry(tmp_path, _Preprocess()).scan()
+    worker_b = _registry(tmp_path, _Preprocess()).scan()
+    holding, release = threading.Event(), threading.Event()
+
+    def upload():
+        with worker_a._locked():
+            holding.set()
+            release.wait(5)
+            worker_a.register("erik", b"uploaded")
+
+    thread = threading.Thread(target=upload)
+    thread.start()
+    holding.wait(5)
+    scan = threading.Thread(target=worker_b.scan)
+    scan.start()
+    time.sleep(0.2)
+    assert scan.is_alive()  # waits for the upload instead of reading a half-written index
+    release.set()
+    thread.join(5)
+    scan.join(5)
+
+    voice = worker_b.scan().get("erik")
+    assert voice.name == "erik" and os.path.exists(voice.path)
+    assert worker_a.get("erik") == voice
+
+
+@pytest.mark.parametrize(
+    "name, filename, data",
+    [("../evil", "a.wav", b"x"), ("default", "a.wav", b"x"), ("ok", "a.exe", b"x"), ("ok", "a.wav", b"")],
+)
+def test_register_rejects_bad_uploads(tmp_path, name, filename, data):
+    registry = _registry(tmp_path, _Preprocess()).scan()
+    with pytest.raises(ValueError):
+        registry.register(name, data, filename=filename)
+    with pytest.raises(ValueError):
+        registry.register("fine", b"broken audio")
+    assert os.listdir(tmp_path / "voices") == []
+
+
+def test_register_decodes_uploads_even_without_preprocessing(tmp_path):
+    sf = pytest.importorskip("soundfile")
+    registry = _registry(tmp_path).scan()
+    with pytest.raises(ValueError):
+        registry.register("junk", b"not audio at all", filename="junk.wav")
+    assert os.listdir(tmp_path / "voices") == []
+
+    buf = io.BytesIO()
+    sf.write(buf, np.zeros(1600, dtype=np.float32), 16000, format="WAV")
+    voice = registry.register("quiet", buf.getvalue())
+    assert voice.name == "quiet" and not voice.preprocessed
+
+
+def test_watch_picks_up_new_voices(tmp_path):
+    registry = _registry(tmp_path).scan()
+    assert not registry.changed()
+    registry.watch(0.05)
+    try:
+        _touch(tmp_path / "voices" / "dora.wav")
+        deadline = time.monotonic() + 5
+        while registry.stats()["default"] != "dora" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert registry.get().name == "dora"
+        assert registry.stats()["watching"] and registry.stats()["scans"] >= 2
+    finally:
+        registry.stop()
@@ -0,0 +1,75 @@
+import pytest
+import torch
+
+from vibevoice.schedule.dpm_solver import DPMSolverMultistepScheduler
+from vibevoice.schedule.dpm_solver_plan import DPMSolverPlan
+
+
+@pytest.mark.parametrize("prediction_type", ["v_prediction", "epsilon"])
+@pytest.mark.parametrize("solver_type", ["midpoint", "heun"])
+@pytest.mark.parametrize("num_steps", [3, 10, 20])
+def test_plan_matches_scheduler_steps(prediction_type, solver_type, num_steps):
+    scheduler = DPMSolverMultistepScheduler(
+        num_train_timesteps=1000, beta_schedule="cosine", prediction_type=prediction_type, solver_type=solver_type
+    )
+    plan = DPMSolverPlan.from_scheduler(scheduler, num_steps)
+    scheduler.set_timesteps(num_steps)
+    assert torch.equal(plan.timesteps, scheduler.timesteps)
+
+    torch.manual_seed(0)
+    weight = torch.randn(16, 16) * 0.1
+    expected = torch.randn(4, 16)
+    actual, prev_x0 = expected.clone(), None
+    for i, t in enumerate(scheduler.timesteps):
+        expected = scheduler.step(torch.tanh(expected @ weight), t, expected).prev_sample
+        actual, prev_x0 = plan.step(i, torch.tanh(actual @ weight), actual, prev_x0)
+
+    torch.testing.assert_close(actual, expected, rtol=1e-5, atol=1e-5)
+
+
+def test_plan_rejects_unsupported_scheduler():
+    scheduler = DPMSolverMultistepScheduler(algorithm_type="sde-dpmsolver++")
+    assert DPMSolverPlan.from_scheduler(scheduler, 10) is None
+
+
+@pytest.fixture
+def tiny_vibevoice_head(tiny_vibevoice):
+    # the output layers of the head are zero-initialized, give it something to predict
+    torch.manual_seed(1)
+    for param in tiny_vibevoice.model.prediction_head.parameters():
+        torch.nn.init.normal_(param, std=0.2)
+    return tiny_vibevoice
+
+
+@pytest.mark.parametrize("cfg_scale", [1.0, 1.3])
+@pytest.mark.parametrize("num_steps", [5, 10])
+def test_fast_sampler_matches_reference(tiny_vibevoice_head, cfg_scale, num_steps):
+    model = tiny_vibevoice_head
+    # CPU randn fills in blocks of 16 values, at >= 16 values the first rows match a draw twice as large
+    condition = torch.randn(4, 32)
+    neg_condition = torch.randn(4, 32)
+
+    torch.manual_seed(2)
+    fast = model.sample_speech_tokens(condition, neg_condition, cfg_scale=cfg_scale, num_steps=num_steps)
+    torch.manual_seed(2)
+    reference = model._sample_speech_tokens_reference(condition, neg_condition, cfg_scale, num_steps)
+
+    assert fast.shape == (4, model.config.acoustic_vae_dim)
+    torch.testing.assert_close(fast, reference, rtol=1e-4, atol=1e-4)
+    # the schedule is unrolled and the timestep embeddings computed once per step count
+    assert set(model._sampler_plans) == {num_steps}
+    assert len(model._timestep_embeds) == 1
+
+
+def test_fast_sampler_can_be_disabled(tiny_vibevoice_head):
+    model = tiny_vibevoice_head
+    model.use_fast_sampler = False
+    condition, neg_condition = torch.randn(2, 32), torch.randn(2, 32)
+
+    torch.manual_seed(3)
+    out = model.sample_speech_tokens(condition, neg_condition, cfg_scale=1.3)
+    torch.manual_seed(3)
+    reference = model._sample_speech_tokens_reference(condition, neg_condition, 1.3)
+
+    assert torch.equal(out, reference)
+    assert not model._sampler_plans
@@ -0,0 +1,136 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from vibevoice.finetune.data_vibevoice import VibeVoiceCollator, VibeVoiceDataset
+from vibevoice.finetune.feature_store import FeatureStore, build_feature_store, open_or_build_feature_store
+from vibevoice.processor.vibevoice_processor import VibeVoiceProcessor
+
+from conftest import TINY_TOKENIZER, build_tiny_vibevoice
+
+SR = 24000
+
+
+class _TextTokenizer:
+    """Character-level stand-in for the Qwen tokenizer; regular ids start above the special ids of TINY_TOKENIZER."""
+
+    pad_token_id = TINY_TOKENIZER.pad_token_id
+    eos_token_id = TINY_TOKENIZER.eos_token_id
+    speech_diffusion_id = TINY_TOKENIZER.speech_diffusion_id
+    speech_start_id = TINY_TOKENIZER.speech_start_id
+    speech_end_id = TINY_TOKENIZER.speech_end_id
+
+    def encode(self, text, add_special_tokens=True):
+        return [5 + ord(c) % 50 for c in text]
+
+
+def _processor():
+    # the tiny tokenizers downsample by 2 * 2 samples per latent frame
+    return VibeVoiceProcessor(tokenizer=_TextTokenizer(), speech_tok_compress_ratio=4, db_normalize=False)
+
+
+def _wav(seconds, seed):
+    return np.random.default_rng(seed).uniform(-0.5, 0.5, int(seconds * SR)).astype(np.float32)
+
+
+def _rows(with_prompts):
+    rows = []
+    for i in range(3):
+        row = {"text": f"Speaker 0: Hallo {i}", "audio": {"array": _wav(0.25 + 0.05 * i, i), "sampling_rate": SR}}
+        if with_prompts:
+            row["voice_prompts"] = [_wav(0.02, 10 + i)]
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture(scope="module")
+def model():
+    return build_tiny_vibevoice()
+
+
+def test_store_rows_batch_like_the_audio_pipeline(tmp_path, model):
+    processor = _processor()
+    processor.semantic_tokenizer = model.model.semantic_tokenizer
+    dataset = VibeVoiceDataset(_rows(with_prompts=True))
+    store = build_feature_store(dataset, processor, model, str(tmp_path / "train"), shard_bytes=16 << 10)
+    assert len(store) == 3 and len(store.index["shards"]) > 1
+    assert [p for p in os.listdir(tmp_path)] == ["train"]
+
+    collator = VibeVoiceCollator(
+        processor=processor, speech_compress_ratio=4, semantic_vae_dim=8, compute_semantics=True
+    )
+    from_audio = collator([dataset[i] for i in range(3)])
+    reopened = FeatureStore(str(tmp_path / "train"))
+    assert isinstance(reopened[0]["target_latents"], np.memmap)
+    from_store = collator([reopened[i] for i in range(3)])
+
+    for key in ("input_ids", "attention_mask", "acoustic_input_mask", "acoustic_loss_mask", "speech_masks"):
+        assert torch.equal(from_store[key], from_audio[key]), key
+    assert torch.equal(from_store["speeches_loss_input"], from_audio["speeches_loss_input"])
+    assert from_store["speech_tensors"] is None
+
+    # the stored latents are what the trainer would encode from the padded waveforms in every step
+    masks = from_audio["speech_masks"]
+    speech = from_audio["speech_tensors"].unsqueeze(1)
+    acoustic = model.model.acoustic_tokenizer.encode(speech).mean
+    semantic = model.model.semantic_tokenizer.encode(speech).mean
+    assert torch.allclose(from_store["speech_latents"][masks], acoustic[masks], atol=1e-5)
+    assert torch.allclose(from_store["speech_semantic_tensors"][masks], semantic[masks], atol=1e-5)
+
+
+def test_auto_prompts_are_seeded_variants_and_can_be_dropped(tmp_path, model):
+    processor = _processor()
+    dataset = VibeVoiceDataset(_rows(with_prompts=False))
+    path = str(tmp_path / "train")
+    store = open_or_build_feature_store(dataset, processor, model, path, prompt_variants=3, metadata={"model": "a"})
+    variants = store[2]["voice_prompt_variants"]
+    assert len(variants) == 3 and len({v["latents"][0].shape[0] for v in variants}) > 1
+
+    # same inputs: reused as is; other inputs: rebuilt
+    index_mtime = os.path.getmtime(os.path.join(path, "index.json"))
+    again = open_or_build_feature_store(dataset, processor, model, path, prompt_variants=3, metadata={"model": "a"})
+    assert os.path.getmtime(os.path.join(path, "index.json")) == index_mtime
+    assert again.index["items"] == store.index["items"]
+    other = open_or_build_feature_store(dataset, processor, model, path, prompt_variants=3, metadata={"model": "b"})
+    assert other.index["model"] == "b" and other.index["items"] == store.index["items"]
+
+    collator = VibeVoiceCollator(processor=processor, speech_compress_ratio=4, voice_prompt_drop_rate=1.0)
+    batch = collator([other[i] for i in range(3)])
+    assert batch["speech_latents"].shape[0] == 3  # only the targets
+    assert torch.equal(batch["acoustic_input_mask"], batch["acoustic_loss_mask"])
+
+
+def test_failed_build_leaves_no_partial_store(tmp_path, model):
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        build_feature_store(VibeVoiceDataset(_rows(with_prompts=True)), broken, model, str(tmp_path / "train"))
+    assert os.listdir(tmp_path) == []
+
+
+def test_latent_inputs_match_encoding_the_audio():
+    from vibevoice.modular.modeling_vibevoice import VibeVoiceForConditionalGeneration
+
+    model = VibeVoiceForConditionalGeneration(build_tiny_vibevoice().config).eval()
+    model.model.speech_scaling_factor.fill_(1.0)
+    model.model.speech_bias_factor.fill_(0.0)
+    tokenizer = model.model.acoustic_tokenizer
+    encode = tokenizer.encode
+    speech = torch.randn(2, 40)
+    speech[1, 24:] = 0
+    masks = torch.zeros(2, 10, dtype=torch.bool)
+    masks[0] = True
+    masks[1, :6] = True
+    means = encode(speech.unsqueeze(1)).mean
+
+    # the training script wraps encode() to return [[output]]
+    tokenizer.encode = lambda *args, **kwargs: [[encode(*args, **kwargs)]]
+    torch.manual_seed(0)
+    from_audio = model.forward_speech_features(speech, masks)
+    torch.manual_seed(0)
+    from_latents = model.forward_speech_features(means, masks, speech_type="latents")
+    for a, b in zip(from_audio, from_latents):
+        assert torch.allclose(a, b)
@@ -0,0 +1,117 @@
+import torch
+
+import vibevoice.modular.modeling_vibevoice_inference as inference
+from vibevoice.modular.modeling_vibevoice_inference import _cache_kv_pairs
+
+from conftest import generate_tiny
+
+
+# Reference: the per-sample loops generate() used before the correction was vectorized.
+def _reference_reset_for_speech_start(negative_model_kwargs, negative_input_ids, sample_indices, speech_start_id):
+    for sample_idx in sample_indices.tolist():
+        negative_model_kwargs['attention_mask'][sample_idx, :] = 0
+        negative_model_kwargs['attention_mask'][sample_idx, -1] = 1
+    for k_cache, v_cache in _cache_kv_pairs(negative_model_kwargs['past_key_values']):
+        for sample_idx in sample_indices.tolist():
+            k_cache[sample_idx, :, -1, :] = k_cache[sample_idx, :, 0, :].clone()
+            v_cache[sample_idx, :, -1, :] = v_cache[sample_idx, :, 0, :].clone()
+    for sample_idx in sample_indices.tolist():
+        negative_input_ids[sample_idx, -1] = speech_start_id
+
+
+def _reference_drop_step(negative_model_kwargs, negative_input_ids, sample_indices, start_indices):
+    attention_mask = negative_model_kwargs['attention_mask']
+    seq_len = attention_mask.shape[1]
+    for sample_idx, start_idx in zip(sample_indices.tolist(), start_indices.tolist()):
+        if start_idx + 1 < seq_len - 1:
+            attention_mask[sample_idx, start_idx + 1:] = attention_mask[sample_idx, start_idx:-1].clone()
+        attention_mask[sample_idx, start_idx] = 0
+    for k_cache, v_cache in _cache_kv_pairs(negative_model_kwargs['past_key_values']):
+        for sample_idx, start_idx in zip(sample_indices.tolist(), start_indices.tolist()):
+            if start_idx + 1 < k_cache.shape[2] - 1:
+                k_cache[sample_idx, :, start_idx + 1:, :] = k_cache[sample_idx, :, start_idx:-1, :].clone()
+                v_cache[sample_idx, :, start_idx + 1:, :] = v_cache[sample_idx, :, start_idx:-1, :].clone()
+    for sample_idx, start_idx in zip(sample_indices.tolist(), start_indices.tolist()):
+        if start_idx + 1 < negative_input_ids.shape[1] - 1:
+            negative_input_ids[sample_idx, start_idx + 1:] = negative_input_ids[sample_idx, start_idx:-1].clone()
+
+
+def _generate(model, tokenizer):
+    # a fourth row, and two rows whose voice segment starts one position earlier
+    input_ids = torch.tensor(
+        [
+            [0, 0, 5, 6, 2, 1, 1, 3, 9, 2],
+            [5, 6, 7, 2, 1, 1, 3, 8, 9, 2],
+            [0, 5, 7, 2, 1, 1, 3, 8, 9, 2],
+            [5, 9, 7, 2, 1, 1, 3, 6, 9, 2],
+        ]
+    )
+    speech_input_mask = torch.zeros_like(input_ids, dtype=torch.bool)
+    speech_input_mask[[0, 2], 5:7] = True
+    speech_input_mask[[1, 3], 4:6] = True
+    return generate_tiny(model, tokenizer, input_ids=input_ids, speech_input_mask=speech_input_mask)
+
+
+def test_vectorized_negative_cfg_correction_is_bit_exact(tiny_vibevoice, tiny_tokenizer, monkeypatch):
+    model = tiny_vibevoice
+    # untied head where only diffusion / speech_start / speech_end get random logits, so samples
+    # keep switching between diffusion and non-diffusion tokens at different steps
+    head = torch.zeros_like(model.lm_head.weight)
+    for token_id in (tiny_tokenizer.speech_diffusion_id, tiny_tokenizer.speech_start_id, tiny_tokenizer.speech_end_id):
+        head[token_id].normal_(std=1.0)
+    model.lm_head.weight = torch.nn.Parameter(head)
+
+    calls = {"reset": 0, "drop": 0}
+
+    def count(name, fn):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(inference, "_reset_negative_cache_for_speech_start", count("reset", inference._reset_negative_cache_for_speech_start))
+    monkeypatch.setattr(inference, "_drop_negative_step_for_samples", count("drop", inference._drop_negative_step_for_samples))
+    vectorized = _generate(model, tiny_tokenizer)
+    assert calls["reset"] > 0 and calls["drop"] > 0, "tiny model did not exercise the CFG correction paths"
+
+    monkeypatch.setattr(inference, "_reset_negative_cache_for_speech_start", _reference_reset_for_speech_start)
+    monkeypatch.setattr(inference, "_drop_negative_step_for_samples", _reference_drop_step)
+    reference = _generate(model, tiny_tokenizer)
+
+    assert torch.equal(vectorized.sequences, reference.sequences)
+    for v, r in zip(vectorized.speech_outputs, reference.speech_outputs):
+        assert (v is None) == (r is None)
+        if v is not None:
+            assert torch.equal(v, r)
+
+
+def test_drop_negative_step_matches_reference_on_edge_offsets():
+    from transformers import DynamicCache
+
+    torch.manual_seed(0)
+    batch, length = 5, 6
+
+    def state():
+        cache = DynamicCache()
+        for layer_idx in range(3):
+            cache.update(torch.randn(batch, 2, length, 4), torch.randn(batch, 2, length, 4), layer_idx)
+        return {"attention_mask": torch.randint(0, 2, (batch, length + 1)), "past_key_values": cache}, torch.randint(5, 60, (batch, length))
+
+    kwargs, ids = state()
+    ref_kwargs = {"attention_mask": kwargs["attention_mask"].clone(), "past_key_values": DynamicCache()}
+    for layer_idx, (k, v) in enumerate(_cache_kv_pairs(kwargs["past_key_values"])):
+        ref_kwargs["past_key_values"].update(k.clone(), v.clone(), layer_idx)
+    ref_ids = ids.clone()
+
+    # starts at 0, in the middle, and at/after the `start + 1 < length - 1` boundary
+    sample_indices = torch.tensor([0, 1, 3, 4])
+    start_indices = torch.tensor([0, 2, length - 2, length - 1])
+
+    inference._drop_negative_step_for_samples(kwargs, ids, sample_indices, start_indices)
+    _reference_drop_step(ref_kwargs, ref_ids, sample_indices, start_indices)
+
+    assert torch.equal(kwargs["attention_mask"], ref_kwargs["attention_mask"])
+    assert torch.equal(ids, ref_ids)
+    for (k, v), (rk, rv) in zip(_cache_kv_pairs(kwargs["past_key_values"]), _cache_kv_pairs(ref_kwargs["past_key_values"])):
+        assert torch.equal(k, rk) and torch.equal(v, rv)
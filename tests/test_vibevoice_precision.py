@@ -0,0 +1,47 @@
+import pytest
+import torch
+
+from vibevoice.modular.precision import FP32_MODULES, apply_precision, module_nbytes
+
+from conftest import generate_tiny, speech_only_head
+
+
+def _dtypes(module):
+    return {p.dtype for p in module.parameters()}
+
+
+def test_bf16_keeps_tokenizers_in_fp32(tiny_vibevoice):
+    plan = apply_precision(tiny_vibevoice, "bf16")
+    assert _dtypes(tiny_vibevoice.model.language_model) == {torch.bfloat16}
+    assert _dtypes(tiny_vibevoice.model.prediction_head) == {torch.bfloat16}
+    for name in FP32_MODULES:
+        assert _dtypes(tiny_vibevoice.get_submodule(name)) == {torch.float32}
+        assert plan.modules[name] == "fp32"
+    assert plan.modules["model.language_model"] == "bf16"
+
+
+def test_int8_quantizes_linears_and_shrinks_weights(tiny_vibevoice):
+    before = module_nbytes(tiny_vibevoice)
+    plan = apply_precision(tiny_vibevoice, "int8")
+    quantized = torch.ao.nn.quantized.dynamic.Linear
+    assert any(isinstance(m, quantized) for m in tiny_vibevoice.model.language_model.modules())
+    assert any(isinstance(m, quantized) for m in tiny_vibevoice.model.prediction_head.modules())
+    assert not any(isinstance(m, quantized) for m in tiny_vibevoice.model.acoustic_tokenizer.modules())
+    assert plan.modules["model.prediction_head"] == "int8"
+    assert module_nbytes(tiny_vibevoice) < before
+
+
+@pytest.mark.parametrize("mode", ["fp32", "bf16", "int8"])
+def test_generate_produces_audio_in_every_mode(tiny_vibevoice, tiny_tokenizer, mode):
+    speech_only_head(tiny_vibevoice, tiny_tokenizer)
+    plan = apply_precision(tiny_vibevoice, mode)
+    with torch.no_grad(), plan.autocast():
+        out = generate_tiny(tiny_vibevoice, tiny_tokenizer)
+    for audio in out.speech_outputs:
+        assert audio is not None and audio.shape[-1] > 0
+        assert torch.isfinite(audio.float()).all()
+
+
+def test_unknown_mode_is_rejected(tiny_vibevoice):
+    with pytest.raises(ValueError):
+        apply_precision(tiny_vibevoice, "fp8")
@@ -0,0 +1,49 @@
+import torch
+from transformers import DynamicCache
+
+from vibevoice.modular.prefix_cache import PrefixKVCache, _cache_kv_pairs
+
+
+def _kv(length: int) -> DynamicCache:
+    cache = DynamicCache()
+    for layer_idx in range(2):
+        cache.update(torch.randn(1, 2, length, 4), torch.randn(1, 2, length, 4), layer_idx)
+    return cache
+
+
+def test_prefix_cache_snapshot_is_cropped_and_isolated():
+    store = PrefixKVCache(max_entries=2)
+    prefix_ids = torch.arange(5)
+    full = _kv(8)
+    store.put("voice", prefix_ids, full)
+
+    assert full.get_seq_length() == 8  # the caller's cache is left untouched
+
+    entry = store.get("voice", prefix_ids)
+    assert entry is not None
+    for (key, value), (full_key, full_value) in zip(_cache_kv_pairs(entry.past_key_values), _cache_kv_pairs(full)):
+        assert torch.equal(key, full_key[..., :5, :]) and torch.equal(value, full_value[..., :5, :])
+        # only the prefix was copied, not the whole prefill
+        assert key.untyped_storage().nbytes() == key.numel() * key.element_size()
+    clone = entry.clone_past_key_values()
+    assert clone.get_seq_length() == 5
+    clone.update(torch.randn(1, 2, 1, 4), torch.randn(1, 2, 1, 4), 0)
+    assert entry.past_key_values.get_seq_length() == 5
+
+    stats = store.stats()
+    assert stats["hits"] == 1
+    assert stats["reused_tokens"] == 5
+
+
+def test_prefix_cache_rejects_mismatched_prompt_and_evicts():
+    store = PrefixKVCache(max_entries=1)
+    store.put("a", torch.arange(3), _kv(4))
+
+    assert store.get("a", torch.tensor([0, 1, 7])) is None  # same key, different prompt
+    assert store.get("a", torch.arange(3)) is None  # stale entry was dropped
+
+    store.put("a", torch.arange(3), _kv(4))
+    store.put("b", torch.arange(3), _kv(4))
+    assert store.get("a", torch.arange(3)) is None
+    assert store.get("b", torch.arange(3)) is not None
+    assert store.stats()["misses"] == 3
@@ -0,0 +1,28 @@
+
+from conftest import generate_tiny, speech_only_head
+
+
+def test_stopped_sample_is_dropped_and_others_continue(tiny_vibevoice, tiny_tokenizer):
+    speech_only_head(tiny_vibevoice, tiny_tokenizer)
+    full = generate_tiny(tiny_vibevoice, tiny_tokenizer)
+    assert all(audio is not None for audio in full.speech_outputs)
+
+    stopped = generate_tiny(tiny_vibevoice, tiny_tokenizer, sample_stop_fn=lambda: [1])
+    assert stopped.speech_outputs[1] is None
+    assert (stopped.sequences[1, 10:] == tiny_tokenizer.eos_token_id).all()
+    for row in (0, 2):
+        assert stopped.speech_outputs[row] is not None
+        assert stopped.speech_outputs[row].shape[-1] > 0
+
+
+def test_stopping_every_sample_ends_generation(tiny_vibevoice, tiny_tokenizer):
+    speech_only_head(tiny_vibevoice, tiny_tokenizer)
+    calls = []
+
+    def stop_after_three_steps():
+        calls.append(1)
+        return [0, 1, 2] if len(calls) > 3 else []
+
+    out = generate_tiny(tiny_vibevoice, tiny_tokenizer, sample_stop_fn=stop_after_three_steps)
+    assert out.sequences.shape[1] == 10 + 3
+    assert all(audio is None for audio in out.speech_outputs)
@@ -0,0 +1,59 @@
+import torch
+
+from vibevoice.modular.configuration_vibevoice import VibeVoiceAcousticTokenizerConfig
+from vibevoice.modular.modular_vibevoice_tokenizer import (
+    VibeVoiceAcousticTokenizerModel,
+    VibeVoiceTokenizerStreamingCache,
+    VibeVoiceTokenizerTensorCache,
+)
+
+
+def _tiny_acoustic_tokenizer():
+    torch.manual_seed(0)
+    cfg = VibeVoiceAcousticTokenizerConfig(
+        vae_dim=8, encoder_n_filters=4, decoder_n_filters=4, encoder_ratios=[2, 2], encoder_depths="1-1-1"
+    )
+    return VibeVoiceAcousticTokenizerModel(cfg).eval()
+
+
+@torch.no_grad()
+def _stream(tokenizer, cache, latents, sample_indices):
+    return [
+        tokenizer.decode(latents[:, t : t + 1], cache=cache, sample_indices=sample_indices, use_cache=True)
+        for t in range(latents.shape[1])
+    ]
+
+
+def test_tensor_cache_matches_dict_cache():
+    tokenizer = _tiny_acoustic_tokenizer()
+    latents = torch.randn(2, 6, 8)
+    indices = torch.arange(2)
+
+    expected = _stream(tokenizer, VibeVoiceTokenizerStreamingCache(), latents, indices)
+    actual = _stream(tokenizer, VibeVoiceTokenizerTensorCache(batch_size=2), latents, indices)
+    for e, a in zip(expected, actual):
+        torch.testing.assert_close(a, e, rtol=1e-5, atol=1e-6)
+
+
+@torch.no_grad()
+def test_tensor_cache_keeps_histories_independent():
+    tokenizer = _tiny_acoustic_tokenizer()
+    latents = torch.randn(2, 5, 8)
+    cache = VibeVoiceTokenizerTensorCache(batch_size=2)
+
+    # sample 0 runs alone for two tokens, then sample 1 joins
+    first = _stream(tokenizer, cache, latents[:1, :2], torch.tensor([0]))
+    joint = _stream(tokenizer, cache, latents[:, 2:], torch.tensor([0, 1]))
+
+    solo_0 = _stream(tokenizer, VibeVoiceTokenizerStreamingCache(), latents[:1], torch.tensor([0]))
+    solo_1 = _stream(tokenizer, VibeVoiceTokenizerStreamingCache(), latents[1:, 2:], torch.tensor([0]))
+    for a, e in zip(first + [j[:1] for j in joint], solo_0):
+        torch.testing.assert_close(a, e, rtol=1e-5, atol=1e-6)
+    for a, e in zip([j[1:] for j in joint], solo_1):
+        torch.testing.assert_close(a, e, rtol=1e-5, atol=1e-6)
+
+    # resetting a sample makes it behave like a fresh stream again
+    cache.set_to_zero(torch.tensor([0]))
+    restarted = _stream(tokenizer, cache, latents[:1, :2], torch.tensor([0]))
+    for a, e in zip(restarted, solo_0[:2]):
+        torch.testing.assert_close(a, e, rtol=1e-5, atol=1e-6)